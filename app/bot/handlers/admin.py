@@ -6,62 +6,96 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import asyncio
+import html
 
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 
 from app.bot.keyboards.inline import (
     admin_menu_keyboard,
     admin_users_keyboard,
     user_management_keyboard
 )
-from app.bot.utils.texts import Messages
+from app.bot.utils.texts import Messages, compile_template
+from app.bot.utils.markup_cache import markup_cache
 from app.bot.middlewares.auth import AdminMiddleware
-from app.services.user_service import UserService
-from app.services.subscription_service import SubscriptionService
-from app.services.channel_service import ChannelService
-from app.services.notification_service import NotificationService
+from app.services.user_service import user_service
+from app.services.subscription_service import subscription_service
+from app.services.notification_service import notification_service
 from app.database.models.user import User
 from app.database.models.subscription import Subscription
 from app.database.models.payment import Payment
 from app.config.settings import get_settings
-from app.utils.logger import get_logger, log_admin_action
+from app.utils.logger import get_logger, log_admin_action, log_in_background
+from app.utils.tasks import spawn_background
 
 # Создаем роутер для админ-обработчиков
 admin_router = Router()
-admin_router.message.middleware(AdminMiddleware())
-admin_router.callback_query.middleware(AdminMiddleware())
-
-# Инициализируем сервисы
-user_service = UserService()
-subscription_service = SubscriptionService()
-channel_service = ChannelService()
-notification_service = NotificationService()
+admin_middleware = AdminMiddleware()
+admin_router.message.middleware(admin_middleware)
+admin_router.callback_query.middleware(admin_middleware)
 
 logger = get_logger("handlers.admin")
 settings = get_settings()
 
 
+class AdminStates(StatesGroup):
+    """Состояния для работы в админ-панели"""
+    finding_user = State()
+    broadcast_message = State()
+
+
+# Статические клавиатуры собираются один раз при импорте модуля
+_ADMIN_MENU_KB = admin_menu_keyboard()
+_ADMIN_USERS_KB = admin_users_keyboard()
+_STATS_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔄 Обновить", callback_data="admin_stats")],
+    [InlineKeyboardButton(text="⬅️ Назад в админку", callback_data="admin_menu")]
+])
+_CANCEL_TO_USERS_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_users")]
+])
+_BACK_TO_USERS_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_users")]
+])
+_CANCEL_TO_ADMIN_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_menu")]
+])
+_CONFIRM_BROADCAST_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="✅ Отправить", callback_data="confirm_broadcast"),
+        InlineKeyboardButton(text="❌ Отмена", callback_data="admin_menu")
+    ]
+])
+_BACK_TO_ADMIN_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⬅️ В админку", callback_data="admin_menu")]
+])
+
+# Шаблоны, разобранные при импорте модуля
+_render_admin_stats = compile_template(Messages.ADMIN_STATS)
+_render_broadcast_confirm = compile_template(Messages.ADMIN_BROADCAST_CONFIRM)
+
+
+def _format_datetime(value: Optional[datetime]) -> str:
+    """Форматирование даты и времени для карточки пользователя"""
+    return f"{value:%d.%m.%Y %H:%M}" if value else "Никогда"
+
+
 @admin_router.message(Command("admin"))
 async def cmd_admin_panel(message: Message):
     """Команда входа в админ-панель"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=message.from_user.id,
         action="access_admin_panel"
     )
     
-    text = """
-👑 <b>Панель администратора</b>
-
-Добро пожаловать в административную панель!
-Здесь вы можете управлять системой, просматривать статистику и настраивать бота.
-"""
-    
     await message.answer(
-        text,
-        reply_markup=admin_menu_keyboard(),
+        Messages.ADMIN_PANEL_WELCOME,
+        reply_markup=_ADMIN_MENU_KB,
         parse_mode="HTML"
     )
 
@@ -75,117 +109,103 @@ async def cb_admin_menu(callback: CallbackQuery):
 Выберите раздел для управления:
 """
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=admin_menu_keyboard(),
-        parse_mode="HTML"
+    await asyncio.gather(
+        callback.message.edit_text(
+            text,
+            reply_markup=_ADMIN_MENU_KB,
+            parse_mode="HTML"
+        ),
+        callback.answer()
     )
-    await callback.answer()
 
 
 @admin_router.callback_query(F.data == "admin_stats")
 async def cb_admin_stats(callback: CallbackQuery):
     """Показ статистики системы"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="view_stats"
     )
     
     try:
-        # Получаем статистику пользователей
-        total_users = await user_service.get_users_count()
-        active_users = await user_service.get_active_users_count(days=7)
-        new_users_today = await user_service.get_new_users_count(days=1)
-        
-        # Получаем статистику подписок
-        active_subscriptions = await subscription_service.get_active_subscriptions_count()
-        expired_subscriptions = await subscription_service.get_expired_subscriptions_count()
-        
-        # Получаем статистику платежей
-        payments_today = await subscription_service.get_payments_count(days=1)
-        revenue_today = await subscription_service.get_revenue(days=1)
-        payments_month = await subscription_service.get_payments_count(days=30)
-        revenue_month = await subscription_service.get_revenue(days=30)
+        # Все счетчики собираются одним запросом и кэшируются на короткое время
+        stats = await user_service.get_dashboard_stats_cached()
+        total_users = stats["total_users"]
+        active_subscriptions = stats["active_subscriptions"]
         
         # Вычисляем конверсию
         conversion_rate = 0
         if total_users > 0:
             conversion_rate = round((active_subscriptions / total_users) * 100, 1)
         
-        text = Messages.ADMIN_STATS.format(
-            total_users=total_users,
-            active_users=active_users,
-            new_users_today=new_users_today,
-            active_subscriptions=active_subscriptions,
-            expired_subscriptions=expired_subscriptions,
-            trial_subscriptions=0,  # TODO: Реализовать пробные подписки
-            payments_today=payments_today,
-            revenue_today=revenue_today,
-            payments_month=payments_month,
-            revenue_month=revenue_month,
-            failed_payments=0,  # TODO: Реализовать статистику неудачных платежей
-            conversion_rate=conversion_rate
-        )
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Обновить", callback_data="admin_stats")],
-            [InlineKeyboardButton(text="⬅️ Назад в админку", callback_data="admin_menu")]
-        ])
+        text = _render_admin_stats({
+            **stats,
+            "trial_subscriptions": 0,  # TODO: Реализовать пробные подписки
+            "failed_payments": 0,  # TODO: Реализовать статистику неудачных платежей
+            "conversion_rate": conversion_rate
+        })
         
-        await callback.message.edit_text(
-            text,
-            reply_markup=keyboard,
-            parse_mode="HTML"
+        await asyncio.gather(
+            callback.message.edit_text(
+                text,
+                reply_markup=_STATS_KB,
+                parse_mode="HTML"
+            ),
+            callback.answer()
         )
         
     except Exception as e:
         logger.error(f"Ошибка получения статистики: {e}")
         await callback.answer("❌ Ошибка получения статистики", show_alert=True)
-    
-    await callback.answer()
 
 
 @admin_router.callback_query(F.data == "admin_users")
 async def cb_admin_users(callback: CallbackQuery):
     """Управление пользователями"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="view_users"
     )
     
     try:
         # Получаем последних пользователей
-        users = await user_service.get_recent_users(limit=10)
+        users = await user_service.get_recent_users_summary(limit=10)
         
-        text = "👥 <b>Управление пользователями</b>\n\n"
+        lines = ["👥 <b>Управление пользователями</b>\n\n"]
         
         if users:
-            text += "<b>Последние пользователи:</b>\n"
-            for user in users:
-                status = "🟢" if user.is_active else "🔴"
-                text += f"{status} {user.first_name or 'Неизвестно'} (@{user.username or 'нет'})\n"
-                text += f"   ID: <code>{user.telegram_id}</code>\n"
-                text += f"   Создан: {user.created_at.strftime('%d.%m.%Y')}\n\n"
+            lines.append("<b>Последние пользователи:</b>\n")
+            lines.extend(
+                f"{'🟢' if is_active else '🔴'} {first_name or 'Неизвестно'} (@{username or 'нет'})\n"
+                f"   ID: <code>{telegram_id}</code>\n"
+                f"   Создан: {created_at:%d.%m.%Y}\n\n"
+                for first_name, username, telegram_id, created_at, is_active in users
+            )
         else:
-            text += "Пользователи не найдены."
+            lines.append("Пользователи не найдены.")
         
-        await callback.message.edit_text(
-            text,
-            reply_markup=admin_users_keyboard(),
-            parse_mode="HTML"
+        text = "".join(lines)
+        
+        await asyncio.gather(
+            callback.message.edit_text(
+                text,
+                reply_markup=_ADMIN_USERS_KB,
+                parse_mode="HTML"
+            ),
+            callback.answer()
         )
         
     except Exception as e:
         logger.error(f"Ошибка получения пользователей: {e}")
         await callback.answer("❌ Ошибка получения пользователей", show_alert=True)
-    
-    await callback.answer()
 
 
 @admin_router.callback_query(F.data == "admin_find_user")
 async def cb_admin_find_user(callback: CallbackQuery, state: FSMContext):
     """Поиск пользователя по ID или username"""
-    await state.set_state("finding_user")
+    await state.set_state(AdminStates.finding_user)
     
     text = """
 🔍 <b>Поиск пользователя</b>
@@ -198,68 +218,61 @@ async def cb_admin_find_user(callback: CallbackQuery, state: FSMContext):
 • <code>username</code>
 """
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_users")]
-    ])
-    
-    await callback.message.edit_text(
-        text,
-        reply_markup=keyboard,
-        parse_mode="HTML"
+    await asyncio.gather(
+        callback.message.edit_text(
+            text,
+            reply_markup=_CANCEL_TO_USERS_KB,
+            parse_mode="HTML"
+        ),
+        callback.answer()
     )
-    await callback.answer()
 
 
-@admin_router.message(F.text, lambda m, state: state and state.get_state() == "finding_user")
+@admin_router.message(AdminStates.finding_user, F.text)
 async def process_find_user(message: Message, state: FSMContext):
     """Обработка поиска пользователя"""
     search_query = message.text.strip()
     
     try:
-        user = None
-        
         # Поиск по ID
         if search_query.isdigit():
-            user = await user_service.get_user_by_telegram_id(int(search_query))
+            user = await user_service.get_user_by_telegram_id_cached(int(search_query))
         
         # Поиск по username
         else:
             username = search_query.replace("@", "")
-            user = await user_service.get_user_by_username(username)
+            user = await user_service.get_user_by_username_cached(username)
         
         if user:
-            # Получаем подписки пользователя
-            subscriptions = await subscription_service.get_user_subscriptions(user.id)
+            keyboard = user_management_keyboard(user.telegram_id, user.is_banned)
             
-            text = f"""
-👤 <b>Пользователь найден</b>
-
-<b>Имя:</b> {user.first_name or 'Не указано'}
-<b>Username:</b> @{user.username or 'не указан'}
-<b>ID:</b> <code>{user.telegram_id}</code>
-<b>Язык:</b> {user.language_code or 'не указан'}
-<b>Регистрация:</b> {user.created_at.strftime('%d.%m.%Y %H:%M')}
-<b>Последняя активность:</b> {user.last_activity.strftime('%d.%m.%Y %H:%M') if user.last_activity else 'Никогда'}
-<b>Статус:</b> {'🟢 Активен' if user.is_active else '🔴 Неактивен'}
-<b>Заблокирован:</b> {'🚫 Да' if user.is_banned else '✅ Нет'}
-
-<b>Подписки:</b> {len(subscriptions)}
-"""
+            # Для карточки нужно только количество подписок
+            # (Subscription.user_id ссылается на users.telegram_id)
+            subscriptions_count = await subscription_service.count_user_subscriptions(user.telegram_id)
             
-            keyboard = user_management_keyboard(user.telegram_id, user.is_banned)
+            text = Messages.ADMIN_USER_CARD.format(
+                first_name=user.first_name or 'Не указано',
+                username=user.username or 'не указан',
+                telegram_id=user.telegram_id,
+                language_code=user.language_code or 'не указан',
+                created_at=_format_datetime(user.created_at),
+                last_activity=_format_datetime(user.last_activity),
+                status='🟢 Активен' if user.is_active else '🔴 Неактивен',
+                banned='🚫 Да' if user.is_banned else '✅ Нет',
+                subscriptions_count=subscriptions_count
+            )
             
-            await message.answer(
+            sent = await message.answer(
                 text,
                 reply_markup=keyboard,
                 parse_mode="HTML"
             )
+            markup_cache.is_changed(sent.chat.id, sent.message_id, keyboard)
             
         else:
             await message.answer(
                 "❌ Пользователь не найден",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_users")]
-                ])
+                reply_markup=_BACK_TO_USERS_KB
             )
         
         await state.clear()
@@ -286,7 +299,8 @@ async def cb_toggle_user_ban(callback: CallbackQuery):
         await user_service.update_user_ban_status(user_id, new_status)
         
         action = "ban" if new_status else "unban"
-        log_admin_action(
+        log_in_background(
+            log_admin_action,
             admin_id=callback.from_user.id,
             action=f"{action}_user",
             target_user_id=user_id
@@ -295,9 +309,10 @@ async def cb_toggle_user_ban(callback: CallbackQuery):
         status_text = "заблокирован" if new_status else "разблокирован"
         await callback.answer(f"✅ Пользователь {status_text}")
         
-        # Обновляем клавиатуру
+        # Обновляем клавиатуру, только если она отличается от показанной
         keyboard = user_management_keyboard(user_id, new_status)
-        await callback.message.edit_reply_markup(reply_markup=keyboard)
+        if markup_cache.is_changed(callback.message.chat.id, callback.message.message_id, keyboard):
+            await callback.message.edit_reply_markup(reply_markup=keyboard)
         
     except Exception as e:
         logger.error(f"Ошибка изменения статуса пользователя: {e}")
@@ -307,12 +322,13 @@ async def cb_toggle_user_ban(callback: CallbackQuery):
 @admin_router.callback_query(F.data == "admin_broadcast")
 async def cb_admin_broadcast(callback: CallbackQuery, state: FSMContext):
     """Массовая рассылка"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="start_broadcast"
     )
     
-    await state.set_state("broadcast_message")
+    await state.set_state(AdminStates.broadcast_message)
     
     text = """
 📢 <b>Массовая рассылка</b>
@@ -321,61 +337,53 @@ async def cb_admin_broadcast(callback: CallbackQuery, state: FSMContext):
 
 ⚠️ <b>Внимание:</b>
 • Сообщение будет отправлено ВСЕМ пользователям
-• Поддерживается HTML-разметка
+• Форматирование Telegram (жирный, курсив, ссылки) сохраняется как есть
 • Можно отправлять текст, фото, видео
 """
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_menu")]
-    ])
-    
-    await callback.message.edit_text(
-        text,
-        reply_markup=keyboard,
-        parse_mode="HTML"
+    await asyncio.gather(
+        callback.message.edit_text(
+            text,
+            reply_markup=_CANCEL_TO_ADMIN_KB,
+            parse_mode="HTML"
+        ),
+        callback.answer()
     )
-    await callback.answer()
 
 
-@admin_router.message(F.text, lambda m, state: state and state.get_state() == "broadcast_message")
+@admin_router.message(AdminStates.broadcast_message)
 async def process_broadcast(message: Message, state: FSMContext):
     """Обработка массовой рассылки"""
-    broadcast_text = message.text
+    # У медиа-сообщений текст находится в подписи (ее может и не быть)
+    broadcast_text = message.text or message.caption or ""
     
     try:
-        # Получаем всех активных пользователей
-        users = await user_service.get_all_active_users()
+        # Для подтверждения достаточно количества получателей
+        users_count = await user_service.count_active_users()
         
-        if not users:
+        if not users_count:
             await message.answer("❌ Нет активных пользователей для рассылки")
             await state.clear()
             return
         
         # Подтверждение рассылки
-        text = f"""
-📢 <b>Подтверждение рассылки</b>
-
-<b>Получателей:</b> {len(users)}
-<b>Сообщение:</b>
-
-{broadcast_text[:200]}{'...' if len(broadcast_text) > 200 else ''}
-
-Подтвердите отправку:
-"""
+        text = _render_broadcast_confirm({
+            "users_count": users_count,
+            "preview": html.escape(broadcast_text[:200]) + ('...' if len(broadcast_text) > 200 else '')
+        })
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Отправить", callback_data="confirm_broadcast"),
-                InlineKeyboardButton(text="❌ Отмена", callback_data="admin_menu")
-            ]
-        ])
-        
-        # Сохраняем сообщение в состоянии
-        await state.update_data(broadcast_text=broadcast_text, users_count=len(users))
+        # Сохраняем ссылку на исходное сообщение: при рассылке оно
+        # копируется на стороне Telegram без повторной передачи содержимого
+        await state.update_data(
+            src_chat_id=message.chat.id,
+            src_message_id=message.message_id,
+            message_length=len(broadcast_text),
+            users_count=users_count
+        )
         
         await message.answer(
             text,
-            reply_markup=keyboard,
+            reply_markup=_CONFIRM_BROADCAST_KB,
             parse_mode="HTML"
         )
         
@@ -389,36 +397,44 @@ async def process_broadcast(message: Message, state: FSMContext):
 async def cb_confirm_broadcast(callback: CallbackQuery, state: FSMContext):
     """Подтверждение и выполнение рассылки"""
     data = await state.get_data()
-    broadcast_text = data.get("broadcast_text")
+    src_chat_id = data.get("src_chat_id")
+    src_message_id = data.get("src_message_id")
     
-    if not broadcast_text:
+    if not src_chat_id or not src_message_id:
         await callback.answer("❌ Сообщение для рассылки не найдено", show_alert=True)
         await state.clear()
         return
     
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="execute_broadcast",
-        message_length=len(broadcast_text)
+        message_length=data.get("message_length")
     )
     
-    await callback.message.edit_text(
-        "📤 <b>Выполняется рассылка...</b>\n\nПожалуйста, подождите.",
-        parse_mode="HTML"
+    await asyncio.gather(
+        callback.message.edit_text(
+            "📤 <b>Выполняется рассылка...</b>\n\nПожалуйста, подождите.",
+            parse_mode="HTML"
+        ),
+        callback.answer()
     )
     
     try:
-        # Запускаем рассылку в фоне
-        await notification_service.broadcast_message(
-            message=broadcast_text,
-            admin_id=callback.from_user.id
+        # Запускаем рассылку в фоне, отчет придет администратору по завершении
+        spawn_background(
+            notification_service.broadcast_copy(
+                from_chat_id=src_chat_id,
+                message_id=src_message_id,
+                admin_id=callback.from_user.id,
+                bot=callback.bot
+            ),
+            name="broadcast"
         )
         
         await callback.message.edit_text(
             "✅ <b>Рассылка запущена!</b>\n\nСтатистика будет отправлена по завершении.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⬅️ В админку", callback_data="admin_menu")]
-            ]),
+            reply_markup=_BACK_TO_ADMIN_KB,
             parse_mode="HTML"
         )
         
@@ -426,34 +442,39 @@ async def cb_confirm_broadcast(callback: CallbackQuery, state: FSMContext):
         logger.error(f"Ошибка выполнения рассылки: {e}")
         await callback.message.edit_text(
             "❌ <b>Ошибка рассылки</b>\n\nПопробуйте позже или обратитесь к разработчику.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⬅️ В админку", callback_data="admin_menu")]
-            ]),
+            reply_markup=_BACK_TO_ADMIN_KB,
             parse_mode="HTML"
         )
     
     await state.clear()
-    await callback.answer()
 
 
 @admin_router.callback_query(F.data == "admin_settings")
 async def cb_admin_settings(callback: CallbackQuery):
     """Настройки системы"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="view_settings"
     )
     
+    # Читаем настройки один раз
+    maintenance_mode = settings.maintenance_mode
+    price_monthly = settings.subscription_price_monthly
+    price_yearly = settings.subscription_price_yearly
+    rate_limit_enabled = settings.rate_limit_enabled
+    yoomoney_enabled = bool(settings.yoomoney_token)
+    
     text = f"""
 ⚙️ <b>Настройки системы</b>
 
-<b>Режим обслуживания:</b> {'🔧 Включен' if settings.maintenance_mode else '✅ Выключен'}
-<b>Цена подписки (месяц):</b> {settings.subscription_price_monthly} ₽
-<b>Цена подписки (год):</b> {settings.subscription_price_yearly} ₽
-<b>Ограничение запросов:</b> {'✅ Включено' if settings.rate_limit_enabled else '❌ Выключено'}
+<b>Режим обслуживания:</b> {'🔧 Включен' if maintenance_mode else '✅ Выключен'}
+<b>Цена подписки (месяц):</b> {price_monthly} ₽
+<b>Цена подписки (год):</b> {price_yearly} ₽
+<b>Ограничение запросов:</b> {'✅ Включено' if rate_limit_enabled else '❌ Выключено'}
 
 <b>Активные платежные системы:</b>
-• YooMoney: {'✅' if settings.yoomoney_wallet else '❌'}
+• YooMoney: {'✅' if yoomoney_enabled else '❌'}
 • Telegram Stars: ✅
 • СБП: ✅
 """
@@ -461,7 +482,7 @@ async def cb_admin_settings(callback: CallbackQuery):
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(
-                text="🔧 Включить обслуживание" if not settings.maintenance_mode else "✅ Выключить обслуживание",
+                text="🔧 Включить обслуживание" if not maintenance_mode else "✅ Выключить обслуживание",
                 callback_data="toggle_maintenance"
             )
         ],
@@ -474,18 +495,21 @@ async def cb_admin_settings(callback: CallbackQuery):
         ]
     ])
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=keyboard,
-        parse_mode="HTML"
+    await asyncio.gather(
+        callback.message.edit_text(
+            text,
+            reply_markup=keyboard,
+            parse_mode="HTML"
+        ),
+        callback.answer()
     )
-    await callback.answer()
 
 
 @admin_router.callback_query(F.data == "exit_admin")
 async def cb_exit_admin(callback: CallbackQuery):
     """Выход из админ-панели"""
-    log_admin_action(
+    log_in_background(
+        log_admin_action,
         admin_id=callback.from_user.id,
         action="exit_admin_panel"
     )
@@ -499,9 +523,11 @@ async def cb_exit_admin(callback: CallbackQuery):
 Для повторного входа используйте команду /admin
 """
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=main_menu_keyboard(),
-        parse_mode="HTML"
-    )
-    await callback.answer() 
\ No newline at end of file
+    await asyncio.gather(
+        callback.message.edit_text(
+            text,
+            reply_markup=main_menu_keyboard(),
+            parse_mode="HTML"
+        ),
+        callback.answer()
+    ) 
\ No newline at end of file
@@ -1,90 +1,168 @@
 import asyncio
+import re
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from app.bot.middlewares.auth import AdminMiddleware
+from app.bot.utils.input_file import StreamInputFile
 from app.bot.utils.texts import Messages
 from app.services.export_service import export_service
+from app.utils.cache import TTLCache
 from app.utils.logger import get_logger
+from app.utils.tasks import spawn_background
 
-logger = get_logger(__name__)
+# Постоянный контекст задается один раз, а не при каждом вызове
+logger = get_logger(__name__, handler="admin_export")
 
 # Создаем роутер для экспорта
 export_router = Router()
 export_router.message.middleware(AdminMiddleware())
 export_router.callback_query.middleware(AdminMiddleware())
 
+# Время жизни file_id отправленных экспортов
+EXPORT_FILE_ID_TTL = 600
+
+# file_id отправленных экспортов с версией данных, для которой они созданы
+_export_file_ids = TTLCache(ttl=EXPORT_FILE_ID_TTL, maxsize=128)
+
+# Период в формате ДД.ММ.ГГГГ-ДД.ММ.ГГГГ
+_PERIOD_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})\s*-\s*(\d{1,2})\.(\d{1,2})\.(\d{4})$")
+
+# Границы стандартных периодов экспорта относительно текущего времени
+_PERIOD_FUNCS = {
+    "today": lambda now: (now.replace(hour=0, minute=0, second=0, microsecond=0), now),
+    "week": lambda now: (now - timedelta(days=7), now),
+    "month": lambda now: (now - timedelta(days=30), now),
+    "year": lambda now: (now - timedelta(days=365), now),
+    "all": lambda now: (None, None),
+}
+
+# Значения кнопок по callback_data: обработчики выбираются точным
+# совпадением вместо проверки префиксов
+_EXPORT_TYPES = {
+    "export_users": "users",
+    "export_subscriptions": "subscriptions",
+    "export_payments": "payments",
+    "export_analytics": "analytics",
+}
+_FORMAT_TYPES = {
+    "format_csv": "csv",
+    "format_json": "json",
+    "format_excel": "excel",
+    "format_parquet": "parquet",
+    "format_feather": "feather",
+}
+_PERIODS = {f"period_{period}": period for period in (*_PERIOD_FUNCS, "custom")}
+
 class ExportStates(StatesGroup):
     """Состояния для экспорта данных"""
     waiting_for_period = State()
     waiting_for_format = State()
     waiting_for_filters = State()
 
+# Статические клавиатуры собираются один раз при импорте модуля
+_EXPORT_MAIN_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="👥 Пользователи", callback_data="export_users"),
+        InlineKeyboardButton(text="📋 Подписки", callback_data="export_subscriptions")
+    ],
+    [
+        InlineKeyboardButton(text="💳 Платежи", callback_data="export_payments"),
+        InlineKeyboardButton(text="📊 Аналитика", callback_data="export_analytics")
+    ],
+    [
+        InlineKeyboardButton(text="💾 Полный бэкап", callback_data="export_full_backup"),
+        InlineKeyboardButton(text="🔄 Авто-бэкап", callback_data="export_auto_backup")
+    ],
+    [
+        InlineKeyboardButton(text="🔙 Назад в админ", callback_data="admin_main")
+    ]
+])
+
 def get_export_main_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура главного меню экспорта"""
-    keyboard = [
-        [
-            InlineKeyboardButton(text="👥 Пользователи", callback_data="export_users"),
-            InlineKeyboardButton(text="📋 Подписки", callback_data="export_subscriptions")
-        ],
-        [
-            InlineKeyboardButton(text="💳 Платежи", callback_data="export_payments"),
-            InlineKeyboardButton(text="📊 Аналитика", callback_data="export_analytics")
-        ],
-        [
-            InlineKeyboardButton(text="💾 Полный бэкап", callback_data="export_full_backup"),
-            InlineKeyboardButton(text="🔄 Авто-бэкап", callback_data="export_auto_backup")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад в админ", callback_data="admin_main")
-        ]
+    return _EXPORT_MAIN_KB
+
+_FORMAT_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="📄 CSV", callback_data="format_csv"),
+        InlineKeyboardButton(text="📊 JSON", callback_data="format_json")
+    ],
+    [
+        InlineKeyboardButton(text="📈 Excel", callback_data="format_excel")
+    ],
+    [
+        InlineKeyboardButton(text="🪶 Parquet", callback_data="format_parquet"),
+        InlineKeyboardButton(text="🪶 Feather", callback_data="format_feather")
+    ],
+    [
+        InlineKeyboardButton(text="🔙 Назад", callback_data="export_menu")
     ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+])
 
 def get_format_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора формата экспорта"""
-    keyboard = [
-        [
-            InlineKeyboardButton(text="📄 CSV", callback_data="format_csv"),
-            InlineKeyboardButton(text="📊 JSON", callback_data="format_json")
-        ],
-        [
-            InlineKeyboardButton(text="📈 Excel", callback_data="format_excel")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="export_menu")
-        ]
+    return _FORMAT_KB
+
+_PERIOD_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="📅 За сегодня", callback_data="period_today"),
+        InlineKeyboardButton(text="📅 За неделю", callback_data="period_week")
+    ],
+    [
+        InlineKeyboardButton(text="📅 За месяц", callback_data="period_month"),
+        InlineKeyboardButton(text="📅 За год", callback_data="period_year")
+    ],
+    [
+        InlineKeyboardButton(text="📅 Всё время", callback_data="period_all"),
+        InlineKeyboardButton(text="📅 Свой период", callback_data="period_custom")
+    ],
+    [
+        InlineKeyboardButton(text="🔙 Назад", callback_data="export_menu")
     ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+])
 
 def get_period_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора периода экспорта"""
-    keyboard = [
-        [
-            InlineKeyboardButton(text="📅 За сегодня", callback_data="period_today"),
-            InlineKeyboardButton(text="📅 За неделю", callback_data="period_week")
-        ],
-        [
-            InlineKeyboardButton(text="📅 За месяц", callback_data="period_month"),
-            InlineKeyboardButton(text="📅 За год", callback_data="period_year")
-        ],
-        [
-            InlineKeyboardButton(text="📅 Всё время", callback_data="period_all"),
-            InlineKeyboardButton(text="📅 Свой период", callback_data="period_custom")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="export_menu")
-        ]
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+    return _PERIOD_KB
+
+_EXPORT_DONE_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Повторить экспорт", callback_data="export_menu"),
+    InlineKeyboardButton(text="🔙 В админ", callback_data="admin_main")
+]])
+_EXPORT_RETRY_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_menu")
+]])
+_FULL_BACKUP_DONE_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Создать еще", callback_data="export_full_backup"),
+    InlineKeyboardButton(text="🔙 В меню", callback_data="export_menu")
+]])
+_FULL_BACKUP_RETRY_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_full_backup")
+]])
+_AUTO_BACKUP_DONE_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Создать еще", callback_data="export_auto_backup"),
+    InlineKeyboardButton(text="🔙 В меню", callback_data="export_menu")
+]])
+_AUTO_BACKUP_RETRY_KB = InlineKeyboardMarkup(inline_keyboard=[[
+    InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_auto_backup")
+]])
 
-@export_router.callback_query(F.data == "admin_export")
+@lru_cache(maxsize=None)
+def get_custom_period_back_keyboard(export_type: str) -> InlineKeyboardMarkup:
+    """Клавиатура возврата из ввода своего периода (кэшируется по типу экспорта)"""
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="🔙 Назад", callback_data="export_" + export_type)
+    ]])
+
+@export_router.callback_query(F.data.in_({"admin_export", "export_menu"}))
 async def admin_export_menu(callback: CallbackQuery, state: FSMContext):
     """Главное меню экспорта данных"""
     await state.clear()
@@ -95,91 +173,78 @@ async def admin_export_menu(callback: CallbackQuery, state: FSMContext):
         reply_markup=get_export_main_keyboard()
     )
 
-@export_router.callback_query(F.data.startswith("export_"))
+@export_router.callback_query(F.data == "export_full_backup")
+async def handle_full_backup(callback: CallbackQuery):
+    """Запуск создания полного бэкапа"""
+    spawn_background(create_full_backup(callback), name="full_backup")
+
+@export_router.callback_query(F.data == "export_auto_backup")
+async def handle_auto_backup(callback: CallbackQuery):
+    """Запуск автоматического бэкапа"""
+    spawn_background(schedule_auto_backup(callback), name="auto_backup")
+
+@export_router.callback_query(F.data.in_(_EXPORT_TYPES))
 async def handle_export_type(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора типа экспорта"""
-    export_type = callback.data.replace("export_", "")
-    
-    if export_type == "menu":
-        await admin_export_menu(callback, state)
-        return
-    
-    if export_type == "full_backup":
-        await create_full_backup(callback)
-        return
-    
-    if export_type == "auto_backup":
-        await schedule_auto_backup(callback)
-        return
+    export_type = _EXPORT_TYPES[callback.data]
     
     # Сохраняем тип экспорта в состоянии
     await state.update_data(export_type=export_type)
     
     # Предлагаем выбрать формат
-    text = f"📤 **Экспорт данных**\n\n"
-    text += f"Выбрано: {export_type.replace('_', ' ').title()}\n\n"
-    text += "Выберите формат экспорта:"
+    text = (
+        f"📤 **Экспорт данных**\n\n"
+        f"Выбрано: {export_type.replace('_', ' ').title()}\n\n"
+        "Выберите формат экспорта:"
+    )
     
     await callback.message.edit_text(
         text=text,
         reply_markup=get_format_keyboard()
     )
 
-@export_router.callback_query(F.data.startswith("format_"))
+@export_router.callback_query(F.data.in_(_FORMAT_TYPES))
 async def handle_format_choice(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора формата"""
-    format_type = callback.data.replace("format_", "")
-    data = await state.get_data()
-    
-    await state.update_data(format=format_type)
+    format_type = _FORMAT_TYPES[callback.data]
+    # update_data возвращает обновленные данные, отдельное чтение не нужно
+    data = await state.update_data(format=format_type)
     
     # Предлагаем выбрать период
-    text = f"📤 **Экспорт данных**\n\n"
-    text += f"Тип: {data['export_type'].replace('_', ' ').title()}\n"
-    text += f"Формат: {format_type.upper()}\n\n"
-    text += "Выберите период для экспорта:"
+    text = (
+        f"📤 **Экспорт данных**\n\n"
+        f"Тип: {data['export_type'].replace('_', ' ').title()}\n"
+        f"Формат: {format_type.upper()}\n\n"
+        "Выберите период для экспорта:"
+    )
     
     await callback.message.edit_text(
         text=text,
         reply_markup=get_period_keyboard()
     )
 
-@export_router.callback_query(F.data.startswith("period_"))
+@export_router.callback_query(F.data.in_(_PERIODS))
 async def handle_period_choice(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора периода"""
-    period = callback.data.replace("period_", "")
+    period = _PERIODS[callback.data]
     data = await state.get_data()
     
-    # Определяем даты
-    end_date = datetime.utcnow()
-    start_date = None
-    
-    if period == "today":
-        start_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        start_date = end_date - timedelta(days=7)
-    elif period == "month":
-        start_date = end_date - timedelta(days=30)
-    elif period == "year":
-        start_date = end_date - timedelta(days=365)
-    elif period == "all":
-        start_date = None
-        end_date = None
-    elif period == "custom":
+    if period == "custom":
         await callback.message.edit_text(
             "📅 Введите период в формате:\n"
             "`ДД.ММ.ГГГГ-ДД.ММ.ГГГГ`\n"
             "Например: `01.01.2024-31.01.2024`\n\n"
             "Или отправьте 'all' для экспорта всех данных",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔙 Назад", callback_data="export_" + data['export_type'])
-            ]])
+            reply_markup=get_custom_period_back_keyboard(data['export_type'])
         )
         await state.set_state(ExportStates.waiting_for_period)
         return
     
-    # Выполняем экспорт
-    await perform_export(callback, state, start_date, end_date)
+    # Определяем даты
+    start_date, end_date = _PERIOD_FUNCS[period](datetime.utcnow())
+    
+    # Выполняем экспорт (скользящие периоды меняются с каждым вызовом и не кэшируются)
+    await perform_export(callback, state, data, start_date, end_date, cache_file=period == "all")
 
 @export_router.message(ExportStates.waiting_for_period)
 async def handle_custom_period(message: Message, state: FSMContext):
@@ -187,22 +252,23 @@ async def handle_custom_period(message: Message, state: FSMContext):
     data = await state.get_data()
     
     try:
-        if message.text.lower() == "all":
+        text = (message.text or "").strip()
+        
+        if text.lower() == "all":
             start_date = None
             end_date = None
         else:
             # Парсим формат ДД.ММ.ГГГГ-ДД.ММ.ГГГГ
-            dates = message.text.split("-")
-            if len(dates) != 2:
+            match = _PERIOD_RE.match(text)
+            if not match:
                 raise ValueError("Неверный формат")
             
-            start_str, end_str = dates
-            start_date = datetime.strptime(start_str.strip(), "%d.%m.%Y")
-            end_date = datetime.strptime(end_str.strip(), "%d.%m.%Y")
-            end_date = end_date.replace(hour=23, minute=59, second=59)
+            start_day, start_month, start_year, end_day, end_month, end_year = map(int, match.groups())
+            start_date = datetime(start_year, start_month, start_day)
+            end_date = datetime(end_year, end_month, end_day, 23, 59, 59)
         
         # Выполняем экспорт
-        await perform_export(message, state, start_date, end_date)
+        await perform_export(message, state, data, start_date, end_date, cache_file=True)
         
     except Exception as e:
         await message.reply(
@@ -214,44 +280,91 @@ async def handle_custom_period(message: Message, state: FSMContext):
 async def perform_export(
     event, 
     state: FSMContext, 
+    data: Dict[str, Any],
     start_date: Optional[datetime], 
-    end_date: Optional[datetime]
+    end_date: Optional[datetime],
+    cache_file: bool = False
 ):
-    """Выполнение экспорта данных"""
-    data = await state.get_data()
+    """Запуск экспорта данных в фоне (data - уже прочитанные данные FSM)"""
     export_type = data['export_type']
     format_type = data['format']
+    await state.clear()
     
-    # Отправляем сообщение о начале экспорта
     if hasattr(event, 'message'):
         message = event.message
     else:
         message = event
     
-    status_message = await message.answer("⏳ Создание экспорта, пожалуйста подождите...")
+    # Экспорт может занимать минуты, поэтому обработчик не ждет его завершения
+    spawn_background(
+        _do_export(message, export_type, format_type, start_date, end_date, cache_file),
+        name="export"
+    )
+
+async def _delete_status_message(status_task: "asyncio.Task[Message]") -> None:
+    """Удаление сообщения о ходе операции после того, как оно отправлено"""
+    status_message = await status_task
+    await status_message.delete()
+
+async def _do_export(
+    message: Message,
+    export_type: str,
+    format_type: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    cache_file: bool = False
+):
+    """Выполнение экспорта данных и отправка файла"""
+    # Сообщение о начале экспорта отправляется параллельно с подготовкой данных
+    status_task = asyncio.create_task(
+        message.answer("⏳ Создание экспорта, пожалуйста подождите...")
+    )
+    export_file = None
     
     try:
+        # Повторный запрос тех же данных отправляется по file_id без загрузки файла.
+        # Кэшируются только фиксированные периоды: у скользящих (сегодня, неделя,
+        # месяц) граница - текущее время, и ключ не совпал бы ни разу
+        cache_key = (export_type, format_type, start_date, end_date)
+        version = await export_service.get_data_version(export_type) if cache_file else None
+        cached = _export_file_ids.get(cache_key) if version is not None else None
+        
+        if version is not None and cached and cached[0] == version:
+            _, file_id, file_size = cached
+            
+            await asyncio.gather(
+                message.answer_document(
+                    document=file_id,
+                    caption=_build_export_caption(export_type, format_type, start_date, end_date, file_size),
+                    reply_markup=_EXPORT_DONE_KB
+                ),
+                _delete_status_message(status_task)
+            )
+            
+            logger.info("Экспорт %s в формате %s отправлен из кэша", export_type, format_type)
+            return
+        
         # Выполняем экспорт в зависимости от типа
         if export_type == "users":
-            export_data = await export_service.export_users(
+            export_file = await export_service.export_users(
                 format_type=format_type,
                 start_date=start_date,
                 end_date=end_date
             )
         elif export_type == "subscriptions":
-            export_data = await export_service.export_subscriptions(
+            export_file = await export_service.export_subscriptions(
                 format_type=format_type,
                 start_date=start_date,
                 end_date=end_date
             )
         elif export_type == "payments":
-            export_data = await export_service.export_payments(
+            export_file = await export_service.export_payments(
                 format_type=format_type,
                 start_date=start_date,
                 end_date=end_date
             )
         elif export_type == "analytics":
-            export_data = await export_service.export_analytics(
+            export_file = await export_service.export_analytics(
                 format_type=format_type,
                 start_date=start_date,
                 end_date=end_date
@@ -262,129 +375,177 @@ async def perform_export(
         # Подготавливаем файл для отправки
         period_str = ""
         if start_date and end_date:
-            period_str = f"_{start_date.strftime('%Y%m%d')}-{end_date.strftime('%Y%m%d')}"
+            period_str = f"_{start_date:%Y%m%d}-{end_date:%Y%m%d}"
         elif start_date:
-            period_str = f"_from_{start_date.strftime('%Y%m%d')}"
+            period_str = f"_from_{start_date:%Y%m%d}"
         
         filename = f"{export_type}{period_str}.{format_type}"
         
-        if isinstance(export_data, str):
-            file_data = export_data.encode('utf-8')
-        else:
-            file_data = export_data
-        
-        # Отправляем файл
-        document = BufferedInputFile(file_data, filename)
-        
-        await status_message.delete()
-        
-        caption = f"📤 **Экспорт завершен**\n\n"
-        caption += f"**Тип:** {export_type.replace('_', ' ').title()}\n"
-        caption += f"**Формат:** {format_type.upper()}\n"
-        if start_date:
-            caption += f"**Период:** {start_date.strftime('%d.%m.%Y')}"
-            if end_date:
-                caption += f" - {end_date.strftime('%d.%m.%Y')}"
-            caption += "\n"
-        else:
-            caption += f"**Период:** Все время\n"
-        caption += f"**Размер:** {len(file_data)} байт"
+        # Отправляем файл частями прямо из временного файла экспорта
+        document = StreamInputFile(export_file, filename)
+        file_size = document.size
         
-        await message.answer_document(
-            document=document,
-            caption=caption,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Повторить экспорт", callback_data="export_menu"),
-                InlineKeyboardButton(text="🔙 В админ", callback_data="admin_main")
-            ]])
+        sent_message, _ = await asyncio.gather(
+            message.answer_document(
+                document=document,
+                caption=_build_export_caption(export_type, format_type, start_date, end_date, file_size),
+                reply_markup=_EXPORT_DONE_KB
+            ),
+            _delete_status_message(status_task)
         )
         
-        logger.info(f"Экспорт {export_type} в формате {format_type} выполнен")
+        if version is not None:
+            _export_file_ids.set(cache_key, (version, sent_message.document.file_id, file_size))
+        
+        logger.info("Экспорт %s в формате %s выполнен", export_type, format_type)
         
     except Exception as e:
-        await status_message.delete()
-        await message.answer(
-            f"❌ Ошибка при создании экспорта:\n{str(e)}",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_menu")
-            ]])
+        await asyncio.gather(
+            _delete_status_message(status_task),
+            message.answer(
+                f"❌ Ошибка при создании экспорта:\n{str(e)}",
+                reply_markup=_EXPORT_RETRY_KB
+            ),
+            return_exceptions=True
         )
-        logger.error(f"Ошибка экспорта {export_type}: {e}")
+        logger.error("Ошибка экспорта %s: %s", export_type, e)
+    finally:
+        if export_file is not None:
+            export_file.close()
+
+def _build_export_caption(
+    export_type: str,
+    format_type: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    file_size: int
+) -> str:
+    """Подпись к файлу экспорта"""
+    if start_date and end_date:
+        period = f"{start_date:%d.%m.%Y} - {end_date:%d.%m.%Y}"
+    elif start_date:
+        period = f"{start_date:%d.%m.%Y}"
+    else:
+        period = "Все время"
     
-    await state.clear()
+    return (
+        f"📤 **Экспорт завершен**\n\n"
+        f"**Тип:** {export_type.replace('_', ' ').title()}\n"
+        f"**Формат:** {format_type.upper()}\n"
+        f"**Период:** {period}\n"
+        f"**Размер:** {file_size} байт"
+    )
 
-async def create_full_backup(callback: CallbackQuery):
-    """Создание полного бэкапа"""
-    status_message = await callback.message.edit_text("⏳ Создание полного бэкапа...")
+async def _run_and_report(
+    callback: CallbackQuery,
+    status_text: str,
+    work: Callable[[], Awaitable[Tuple[Optional[StreamInputFile], str]]],
+    *,
+    success_kb: InlineKeyboardMarkup,
+    retry_kb: InlineKeyboardMarkup,
+    error_text: str
+):
+    """
+    Выполнение длительной операции с отчетом в чате
+    
+    Пока выполняется work, сообщение заменяется на status_text. work
+    возвращает файл для отправки (или None) и текст отчета: файл
+    отправляется документом с отчетом в подписи, иначе отчет заменяет
+    сообщение о статусе.
+    """
+    # Статус обновляется параллельно с выполнением операции
+    status_task = asyncio.create_task(callback.message.edit_text(status_text))
+    document = None
     
     try:
-        backup_data = await export_service.create_full_backup()
-        
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        filename = f"full_backup_{timestamp}.zip"
+        document, report = await work()
         
-        document = BufferedInputFile(backup_data, filename)
-        
-        caption = f"💾 **Полный бэкап создан**\n\n"
-        caption += f"**Дата:** {datetime.utcnow().strftime('%d.%m.%Y %H:%M')}\n"
-        caption += f"**Размер:** {len(backup_data)} байт\n"
-        caption += f"**Содержимое:** Пользователи, подписки, платежи, аналитика"
-        
-        await callback.message.answer_document(
-            document=document,
-            caption=caption,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Создать еще", callback_data="export_full_backup"),
-                InlineKeyboardButton(text="🔙 В меню", callback_data="export_menu")
-            ]])
-        )
-        
-        await status_message.delete()
-        logger.info("Полный бэкап создан")
+        if document is not None:
+            await asyncio.gather(
+                callback.message.answer_document(
+                    document=document,
+                    caption=report,
+                    reply_markup=success_kb
+                ),
+                _delete_status_message(status_task)
+            )
+        else:
+            await status_task
+            await callback.message.edit_text(report, reply_markup=success_kb)
         
     except Exception as e:
-        await status_message.edit_text(
-            f"❌ Ошибка создания бэкапа:\n{str(e)}",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_full_backup")
-            ]])
+        # Текст ошибки должен заменить статус, а не наоборот
+        await asyncio.gather(status_task, return_exceptions=True)
+        await callback.message.edit_text(
+            f"❌ {error_text}:\n{str(e)}",
+            reply_markup=retry_kb
         )
-        logger.error(f"Ошибка создания бэкапа: {e}")
+        logger.error("%s: %s", error_text, e)
+    finally:
+        if document is not None:
+            document.file.close()
+
+async def create_full_backup(callback: CallbackQuery):
+    """Создание полного бэкапа"""
+    await _run_and_report(
+        callback,
+        "⏳ Создание полного бэкапа...",
+        _build_full_backup,
+        success_kb=_FULL_BACKUP_DONE_KB,
+        retry_kb=_FULL_BACKUP_RETRY_KB,
+        error_text="Ошибка создания бэкапа"
+    )
+
+async def _build_full_backup() -> Tuple[StreamInputFile, str]:
+    """Создание файла полного бэкапа и подписи к нему"""
+    backup_file = await export_service.create_full_backup()
+    
+    # Время берется один раз, чтобы имя файла и подпись совпадали
+    now = datetime.utcnow()
+    document = StreamInputFile(backup_file, f"full_backup_{now:%Y%m%d_%H%M%S}.zip")
+    
+    caption = (
+        f"💾 **Полный бэкап создан**\n\n"
+        f"**Дата:** {now:%d.%m.%Y %H:%M}\n"
+        f"**Размер:** {document.size} байт\n"
+        "**Содержимое:** Пользователи, подписки, платежи, аналитика"
+    )
+    
+    logger.info("Полный бэкап создан")
+    
+    return document, caption
 
 async def schedule_auto_backup(callback: CallbackQuery):
     """Запуск автоматического бэкапа"""
-    status_message = await callback.message.edit_text("⏳ Создание автоматического бэкапа...")
+    await _run_and_report(
+        callback,
+        "⏳ Создание автоматического бэкапа...",
+        _build_auto_backup,
+        success_kb=_AUTO_BACKUP_DONE_KB,
+        retry_kb=_AUTO_BACKUP_RETRY_KB,
+        error_text="Ошибка создания автоматического бэкапа"
+    )
+
+async def _build_auto_backup() -> Tuple[None, str]:
+    """Создание автоматического бэкапа на диске и текста отчета"""
+    result = await export_service.schedule_automatic_backup()
     
-    try:
-        result = await export_service.schedule_automatic_backup()
-        
-        if result["success"]:
-            text = f"✅ **Автоматический бэкап создан**\n\n"
-            text += f"**Файл:** {result['backup_path']}\n"
-            text += f"**Размер:** {result['backup_size']} байт\n"
-            text += f"**Время:** {datetime.fromisoformat(result['created_at']).strftime('%d.%m.%Y %H:%M')}"
-        else:
-            text = f"❌ **Ошибка создания бэкапа**\n\n"
-            text += f"**Ошибка:** {result['error']}"
-        
-        await status_message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Создать еще", callback_data="export_auto_backup"),
-                InlineKeyboardButton(text="🔙 В меню", callback_data="export_menu")
-            ]])
+    logger.info("Автоматический бэкап: %s", result)
+    
+    if result["success"]:
+        text = (
+            f"✅ **Автоматический бэкап создан**\n\n"
+            f"**Файл:** {result['backup_path']}\n"
+            f"**Размер:** {result['backup_size']} байт\n"
+            f"**Время:** {datetime.fromisoformat(result['created_at']):%d.%m.%Y %H:%M}"
         )
-        
-        logger.info(f"Автоматический бэкап: {result}")
-        
-    except Exception as e:
-        await status_message.edit_text(
-            f"❌ Ошибка создания автоматического бэкапа:\n{str(e)}",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="export_auto_backup")
-            ]])
+    else:
+        text = (
+            f"❌ **Ошибка создания бэкапа**\n\n"
+            f"**Ошибка:** {result['error']}"
         )
-        logger.error(f"Ошибка автоматического бэкапа: {e}")
+    
+    return None, text
 
 # Команда для быстрого доступа к экспорту
 @export_router.message(Command("export"))
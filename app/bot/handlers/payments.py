@@ -3,6 +3,7 @@
 Обрабатывают создание платежей, выбор способов оплаты и успешные платежи.
 """
 
+import re
 from decimal import Decimal
 from typing import Optional
 
@@ -11,7 +12,7 @@ from aiogram.types import CallbackQuery, Message, PreCheckoutQuery
 from aiogram.filters import Command
 
 from app.bot.keyboards.inline import (
-    get_payment_methods_keyboard,
+    get_payment_methods_keyboard_for_plan,
     get_subscription_plans_keyboard,
     get_main_menu_keyboard
 )
@@ -30,6 +31,27 @@ from app.utils.logger import get_logger
 router = Router()
 logger = get_logger("bot.payments")
 
+# Цены тарифных планов
+_PRICES = {
+    "basic": 199,
+    "premium": 499,
+    "vip": 999
+}
+
+# Суммы тарифов в Decimal (значения неизменяемы, поэтому их можно переиспользовать)
+_PRICE_DECIMALS = {price: Decimal(price) for price in _PRICES.values()}
+
+# Данные кнопки оплаты: pay_method_subscription_price
+_PAY_RE = re.compile(r"^pay_(yoomoney|stars|sbp|card)_([a-z]+)_(\d+)$")
+
+# Методы оплаты по ключу из callback_data
+_METHODS = {
+    "yoomoney": PaymentMethod.YOOMONEY,
+    "stars": PaymentMethod.TELEGRAM_STARS,
+    "sbp": PaymentMethod.SBP,
+    "card": PaymentMethod.BANK_CARD
+}
+
 
 @router.message(Command("pay", "payment", "subscribe"))
 async def cmd_payment(message: Message):
@@ -67,20 +89,14 @@ async def process_subscription_selection(callback: CallbackQuery):
         subscription_type = callback.data.split("_")[1]
         
         # Определяем цену в зависимости от типа
-        prices = {
-            "basic": 199,
-            "premium": 499,
-            "vip": 999
-        }
-        
-        price = prices.get(subscription_type, 199)
+        price = _PRICES.get(subscription_type, 199)
         
         # Сохраняем выбор пользователя (в реальном приложении - в базе данных)
         # Здесь используем простое хранение в callback_data
         
         # Показываем способы оплаты
         available_methods = payment_manager.get_available_methods()
-        keyboard = get_payment_methods_keyboard(available_methods, subscription_type, price)
+        keyboard = get_payment_methods_keyboard_for_plan(available_methods, subscription_type, price)
         
         await callback.message.edit_text(
             PAYMENT_METHODS_TEXT.format(
@@ -113,24 +129,17 @@ async def process_payment_method_selection(callback: CallbackQuery):
         await callback.answer()
         
         # Парсим данные: pay_method_subscription_price
-        parts = callback.data.split("_")
-        method_str = parts[1]
-        subscription_type = parts[2]
-        price = int(parts[3])
-        
-        # Получаем метод оплаты
-        method_mapping = {
-            "yoomoney": PaymentMethod.YOOMONEY,
-            "stars": PaymentMethod.TELEGRAM_STARS,
-            "sbp": PaymentMethod.SBP,
-            "card": PaymentMethod.BANK_CARD
-        }
-        
-        payment_method = method_mapping.get(method_str)
-        if not payment_method:
+        match = _PAY_RE.match(callback.data)
+        if not match:
             await callback.answer("❌ Неизвестный способ оплаты", show_alert=True)
             return
         
+        method_str, subscription_type, price = match.groups()
+        price = int(price)
+        
+        # Получаем метод оплаты
+        payment_method = _METHODS[method_str]
+        
         # Проверяем доступность метода
         if not payment_manager.is_method_available(payment_method):
             await callback.answer("❌ Этот способ оплаты временно недоступен", show_alert=True)
@@ -138,7 +147,7 @@ async def process_payment_method_selection(callback: CallbackQuery):
         
         # Создаем платеж
         payment_request = PaymentRequest(
-            amount=Decimal(str(price)),
+            amount=_PRICE_DECIMALS[price] if price in _PRICE_DECIMALS else Decimal(price),
             currency="RUB",
             description=f"Подписка {subscription_type.title()}",
             user_id=callback.from_user.id,
@@ -155,7 +164,7 @@ async def process_payment_method_selection(callback: CallbackQuery):
             # Обрабатываем ответ в зависимости от метода оплаты
             if payment_method == PaymentMethod.TELEGRAM_STARS:
                 # Для Telegram Stars отправляем инвойс
-                provider = payment_manager.get_provider(payment_method)
+                provider = payment_manager.providers_by_method.get(payment_method)
                 if provider and hasattr(provider, 'send_invoice_to_user'):
                     success = await provider.send_invoice_to_user(
                         callback.from_user.id,
@@ -196,7 +205,7 @@ async def process_payment_method_selection(callback: CallbackQuery):
             else:
                 # Для других методов показываем ссылку на оплату
                 text = PAYMENT_CREATED_TEXT.format(
-                    method=payment_manager.get_provider(payment_method).name,
+                    method=payment_manager.providers_by_method[payment_method].name,
                     amount=price,
                     payment_id=payment_response.payment_id[:8]
                 )
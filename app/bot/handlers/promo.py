@@ -3,6 +3,8 @@
 Включает создание, применение и управление промокодами.
 """
 
+import asyncio
+import re
 from typing import Optional
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -13,20 +15,18 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from app.services.promo_service import PromoService
-from app.services.user_service import UserService
-from app.database.models.promo import PromoCodeType
+from app.bot.utils.markup_cache import markup_cache
+from app.services.promo_service import promo_service
 from app.utils.logger import get_logger
 
 # Создаем роутер для промокод-обработчиков
 promo_router = Router()
 
-# Инициализируем сервисы
-promo_service = PromoService()
-user_service = UserService()
-
 logger = get_logger("handlers.promo")
 
+# Допустимый формат промокода (проверяется после upper())
+_PROMO_RE = re.compile(r"^[A-Z0-9]{3,50}$")
+
 
 class PromoStates(StatesGroup):
     """Состояния для работы с промокодами"""
@@ -35,55 +35,75 @@ class PromoStates(StatesGroup):
     entering_amount_to_check = State()
 
 
+_PROMO_MENU_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="🎟️ Ввести промокод", callback_data="promo_enter"),
+        InlineKeyboardButton(text="📋 Мои промокоды", callback_data="promo_my_codes")
+    ],
+    [
+        InlineKeyboardButton(text="💰 Проверить скидку", callback_data="promo_check_discount"),
+        InlineKeyboardButton(text="ℹ️ О промокодах", callback_data="promo_info")
+    ],
+    [
+        InlineKeyboardButton(text="⬅️ Назад в меню", callback_data="main_menu")
+    ]
+])
+
+
 def create_promo_menu_keyboard() -> InlineKeyboardMarkup:
     """Создание клавиатуры промокодов"""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎟️ Ввести промокод", callback_data="promo_enter"),
-            InlineKeyboardButton(text="📋 Мои промокоды", callback_data="promo_my_codes")
-        ],
-        [
-            InlineKeyboardButton(text="💰 Проверить скидку", callback_data="promo_check_discount"),
-            InlineKeyboardButton(text="ℹ️ О промокодах", callback_data="promo_info")
-        ],
-        [
-            InlineKeyboardButton(text="⬅️ Назад в меню", callback_data="main_menu")
-        ]
-    ])
-    return keyboard
+    return _PROMO_MENU_KB
+
+
+_ADMIN_PROMO_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="➕ Создать промокод", callback_data="admin_promo_create"),
+        InlineKeyboardButton(text="📊 Статистика", callback_data="admin_promo_stats")
+    ],
+    [
+        InlineKeyboardButton(text="📋 Все промокоды", callback_data="admin_promo_list"),
+        InlineKeyboardButton(text="⚙️ Настройки", callback_data="admin_promo_settings")
+    ],
+    [
+        InlineKeyboardButton(text="⬅️ Админ-панель", callback_data="admin_menu")
+    ]
+])
 
 
 def create_admin_promo_keyboard() -> InlineKeyboardMarkup:
     """Создание админской клавиатуры промокодов"""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="➕ Создать промокод", callback_data="admin_promo_create"),
-            InlineKeyboardButton(text="📊 Статистика", callback_data="admin_promo_stats")
-        ],
-        [
-            InlineKeyboardButton(text="📋 Все промокоды", callback_data="admin_promo_list"),
-            InlineKeyboardButton(text="⚙️ Настройки", callback_data="admin_promo_settings")
-        ],
-        [
-            InlineKeyboardButton(text="⬅️ Админ-панель", callback_data="admin_menu")
-        ]
-    ])
-    return keyboard
+    return _ADMIN_PROMO_KB
 
 
-@promo_router.message(Command("promo"))
-async def cmd_promo_menu(message: Message):
-    """Команда входа в меню промокодов"""
-    user_id = message.from_user.id
+# Клавиатуры из одной кнопки возврата в меню промокодов
+_CANCEL_TO_PROMO_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="❌ Отмена", callback_data="promo_menu")]
+])
+
+_BACK_TO_PROMO_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="promo_menu")]
+])
+
+
+async def _render_promo_menu(user_id: int) -> str:
+    """
+    Текст меню промокодов для пользователя.
     
+    Args:
+        user_id: Telegram ID пользователя
+    
+    Returns:
+        str: HTML-текст меню
+    """
     # Получаем доступные промокоды пользователя
     promo_codes = await promo_service.get_promo_codes(
         active_only=True,
         user_telegram_id=str(user_id),
-        limit=5
+        limit=5,
+        include_user_usage=False
     )
     
-    text = f"""
+    return f"""
 🎟️ <b>Промокоды и скидки</b>
 
 Здесь вы можете ввести промокод для получения скидки или посмотреть доступные предложения.
@@ -99,6 +119,12 @@ async def cmd_promo_menu(message: Message):
 • Фиксированная сумма (₽)
 • Процентная скидка (%)
 """
+
+
+@promo_router.message(Command("promo"))
+async def cmd_promo_menu(message: Message):
+    """Команда входа в меню промокодов"""
+    text = await _render_promo_menu(message.from_user.id)
     
     await message.answer(
         text,
@@ -110,38 +136,17 @@ async def cmd_promo_menu(message: Message):
 @promo_router.callback_query(F.data == "promo_menu")
 async def cb_promo_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат к меню промокодов"""
+    # Запрос промокодов выполняется, пока сбрасывается состояние
+    render_task = asyncio.create_task(_render_promo_menu(callback.from_user.id))
     await state.clear()
-    user_id = callback.from_user.id
-    
-    # Получаем доступные промокоды пользователя
-    promo_codes = await promo_service.get_promo_codes(
-        active_only=True,
-        user_telegram_id=str(user_id),
-        limit=5
-    )
-    
-    text = f"""
-🎟️ <b>Промокоды и скидки</b>
-
-Здесь вы можете ввести промокод для получения скидки или посмотреть доступные предложения.
-
-💡 <b>Доступно промокодов:</b> {len(promo_codes)}
-
-💰 <b>Как использовать:</b>
-1. Введите промокод
-2. Выберите подписку для оплаты
-3. Скидка применится автоматически
-
-🎁 <b>Виды скидок:</b>
-• Фиксированная сумма (₽)
-• Процентная скидка (%)
-"""
+    text = await render_task
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=create_promo_menu_keyboard(),
-        parse_mode="HTML"
-    )
+    if markup_cache.is_message_changed(callback.message, text, _PROMO_MENU_KB):
+        await callback.message.edit_text(
+            text,
+            reply_markup=_PROMO_MENU_KB,
+            parse_mode="HTML"
+        )
     await callback.answer()
 
 
@@ -158,13 +163,9 @@ async def cb_promo_enter(callback: CallbackQuery, state: FSMContext):
 Промокод может содержать буквы и цифры.
 """
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="promo_menu")]
-    ])
-    
     await callback.message.edit_text(
         text,
-        reply_markup=keyboard,
+        reply_markup=_CANCEL_TO_PROMO_KB,
         parse_mode="HTML"
     )
     
@@ -178,12 +179,10 @@ async def process_promo_code_input(message: Message, state: FSMContext):
     code = message.text.strip().upper()
     user_id = message.from_user.id
     
-    if len(code) < 3 or len(code) > 50:
+    if not _PROMO_RE.match(code):
         await message.answer(
-            "❌ Неверный формат промокода. Длина должна быть от 3 до 50 символов.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⬅️ Назад", callback_data="promo_menu")]
-            ])
+            "❌ Неверный формат промокода. Допустимы латинские буквы и цифры, длина от 3 до 50 символов.",
+            reply_markup=_BACK_TO_PROMO_KB
         )
         return
     
@@ -196,11 +195,6 @@ async def process_promo_code_input(message: Message, state: FSMContext):
         discount = validation["discount"]
         
         # Информация о промокоде
-        if promo_code.type == PromoCodeType.PERCENTAGE:
-            discount_text = f"{float(promo_code.value)}%"
-        else:
-            discount_text = f"{float(promo_code.value)} ₽"
-        
         valid_until_text = ""
         if promo_code.valid_until:
             valid_until_text = f"\n⏰ Действует до: {promo_code.valid_until.strftime('%d.%m.%Y %H:%M')}"
@@ -214,9 +208,9 @@ async def process_promo_code_input(message: Message, state: FSMContext):
 
 🎟️ <b>Код:</b> {code}
 📝 <b>Название:</b> {promo_code.title}
-💰 <b>Скидка:</b> {discount_text}
+💰 <b>Скидка:</b> {promo_code.discount_text}
 📊 <b>Использований:</b> {promo_code.current_uses}/{promo_code.max_uses or '∞'}
-🔄 <b>Осталось для вас:</b> {promo_code.max_uses_per_user - await promo_service.get_user_promo_usage_count(promo_code.id, user_id)}{valid_until_text}{min_amount_text}
+🔄 <b>Осталось для вас:</b> {promo_code.max_uses_per_user - validation['user_usage_count']}{valid_until_text}{min_amount_text}
 
 💡 <b>Описание:</b> {promo_code.description or 'Нет описания'}
 
@@ -278,31 +272,24 @@ async def cb_promo_my_codes(callback: CallbackQuery):
     # Фильтруем только общие (не персональные)
     general_codes = [code for code in general_codes if not code.user_telegram_id]
     
-    text = "🎟️ <b>Доступные промокоды</b>\n\n"
+    parts = ["🎟️ <b>Доступные промокоды</b>\n\n"]
     
     if personal_codes:
-        text += "👤 <b>Персональные:</b>\n"
+        parts.append("👤 <b>Персональные:</b>\n")
         for code in personal_codes:
-            if code.type == PromoCodeType.PERCENTAGE:
-                discount = f"{float(code.value)}%"
-            else:
-                discount = f"{float(code.value)} ₽"
-            
-            remaining = code.max_uses_per_user - await promo_service.get_user_promo_usage_count(code.id, user_id)
-            text += f"• <code>{code.code}</code> - {discount} (осталось: {remaining})\n"
-        text += "\n"
+            remaining = code.max_uses_per_user - code.user_usage_count
+            parts.append(f"• <code>{code.code}</code> - {code.discount_text} (осталось: {remaining})\n")
+        parts.append("\n")
     
     if general_codes:
-        text += "🌐 <b>Общие:</b>\n"
+        parts.append("🌐 <b>Общие:</b>\n")
         for code in general_codes[:3]:  # Показываем только первые 3
-            if code.type == PromoCodeType.PERCENTAGE:
-                discount = f"{float(code.value)}%"
-            else:
-                discount = f"{float(code.value)} ₽"
-            text += f"• <code>{code.code}</code> - {discount}\n"
+            parts.append(f"• <code>{code.code}</code> - {code.discount_text}\n")
     
     if not personal_codes and not general_codes:
-        text += "😔 У вас пока нет доступных промокодов.\n\nСледите за новостями и акциями!"
+        parts.append("😔 У вас пока нет доступных промокодов.\n\nСледите за новостями и акциями!")
+    
+    text = "".join(parts)
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -334,13 +321,9 @@ async def cb_promo_check_discount(callback: CallbackQuery, state: FSMContext):
 Это поможет вам выбрать наиболее выгодный промокод.
 """
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="promo_menu")]
-    ])
-    
     await callback.message.edit_text(
         text,
-        reply_markup=keyboard,
+        reply_markup=_CANCEL_TO_PROMO_KB,
         parse_mode="HTML"
     )
     
@@ -358,9 +341,7 @@ async def process_amount_check(message: Message, state: FSMContext):
     except (ValueError, TypeError):
         await message.answer(
             "❌ Неверный формат суммы. Введите число больше 0.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⬅️ Назад", callback_data="promo_menu")]
-            ])
+            reply_markup=_BACK_TO_PROMO_KB
         )
         return
     
@@ -373,41 +354,47 @@ async def process_amount_check(message: Message, state: FSMContext):
         limit=10
     )
     
-    text = f"💰 <b>Расчет скидки для суммы: {float(amount)} ₽</b>\n\n"
+    parts = [f"💰 <b>Расчет скидки для суммы: {float(amount)} ₽</b>\n\n"]
     
     best_discount = Decimal('0')
     best_code = None
     
     if promo_codes:
-        text += "🎟️ <b>Доступные промокоды:</b>\n"
+        parts.append("🎟️ <b>Доступные промокоды:</b>\n")
+        
+        # Проверяем все промокоды одним запросом
+        validations = await promo_service.validate_promo_codes_bulk(
+            [code.code for code in promo_codes], user_id, amount
+        )
         
         for code in promo_codes:
-            validation = await promo_service.validate_promo_code(code.code, user_id, amount)
+            validation = validations[code.code]
             
             if validation["valid"]:
                 discount = validation["discount"]
                 final_amount = amount - discount
                 
-                if code.type == PromoCodeType.PERCENTAGE:
-                    discount_text = f"{float(code.value)}%"
-                else:
-                    discount_text = f"{float(code.value)} ₽"
-                
-                text += f"• <code>{code.code}</code> ({discount_text})\n"
-                text += f"  💸 Скидка: {float(discount)} ₽\n"
-                text += f"  💳 К оплате: {float(final_amount)} ₽\n\n"
+                parts.append(
+                    f"• <code>{code.code}</code> ({code.discount_text})\n"
+                    f"  💸 Скидка: {float(discount)} ₽\n"
+                    f"  💳 К оплате: {float(final_amount)} ₽\n\n"
+                )
                 
                 if discount > best_discount:
                     best_discount = discount
                     best_code = code
             else:
-                text += f"• <code>{code.code}</code> - ❌ {validation['error']}\n\n"
+                parts.append(f"• <code>{code.code}</code> - ❌ {validation['error']}\n\n")
     
     if best_code:
-        text += f"🏆 <b>Лучший промокод:</b> <code>{best_code.code}</code>\n"
-        text += f"💰 <b>Максимальная экономия:</b> {float(best_discount)} ₽"
+        parts.append(
+            f"🏆 <b>Лучший промокод:</b> <code>{best_code.code}</code>\n"
+            f"💰 <b>Максимальная экономия:</b> {float(best_discount)} ₽"
+        )
     else:
-        text += "😔 Нет подходящих промокодов для данной суммы."
+        parts.append("😔 Нет подходящих промокодов для данной суммы.")
+    
+    text = "".join(parts)
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -425,10 +412,8 @@ async def process_amount_check(message: Message, state: FSMContext):
     await state.clear()
 
 
-@promo_router.callback_query(F.data == "promo_info")
-async def cb_promo_info(callback: CallbackQuery):
-    """Информация о промокодах"""
-    text = """
+# Статичный ответ на кнопку "О промокодах"
+_PROMO_INFO_TEXT = """
 ℹ️ <b>О промокодах и скидках</b>
 
 🎟️ <b>Что такое промокод?</b>
@@ -457,19 +442,23 @@ async def cb_promo_info(callback: CallbackQuery):
 
 💡 <b>Совет:</b> Подпишитесь на уведомления, чтобы не пропустить новые промокоды!
 """
-    
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎟️ Ввести промокод", callback_data="promo_enter")
-        ],
-        [
-            InlineKeyboardButton(text="⬅️ Назад", callback_data="promo_menu")
-        ]
-    ])
-    
+
+_PROMO_INFO_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="🎟️ Ввести промокод", callback_data="promo_enter")
+    ],
+    [
+        InlineKeyboardButton(text="⬅️ Назад", callback_data="promo_menu")
+    ]
+])
+
+
+@promo_router.callback_query(F.data == "promo_info")
+async def cb_promo_info(callback: CallbackQuery):
+    """Информация о промокодах"""
     await callback.message.edit_text(
-        text,
-        reply_markup=keyboard,
+        _PROMO_INFO_TEXT,
+        reply_markup=_PROMO_INFO_KB,
         parse_mode="HTML"
     )
     await callback.answer()
@@ -3,6 +3,7 @@
 Включает создание реферальных ссылок, просмотр статистики и управление рефералами.
 """
 
+from types import MappingProxyType
 from typing import Optional
 from decimal import Decimal
 
@@ -11,39 +12,37 @@ from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKe
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
+from app.bot.utils.markup_cache import markup_cache
 from app.bot.utils.texts import Messages
-from app.services.referral_service import ReferralService
-from app.services.user_service import UserService
+from app.services.referral_service import referral_service
 from app.utils.logger import get_logger
 from app.config.settings import get_settings
 
 # Создаем роутер для реферальных обработчиков
 referral_router = Router()
 
-# Инициализируем сервисы
-referral_service = ReferralService()
-user_service = UserService()
-
 logger = get_logger("handlers.referral")
 settings = get_settings()
 
 
+_REFERRAL_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="📊 Моя статистика", callback_data="referral_stats"),
+        InlineKeyboardButton(text="👥 Мои рефералы", callback_data="referral_list")
+    ],
+    [
+        InlineKeyboardButton(text="🔗 Получить ссылку", callback_data="referral_link"),
+        InlineKeyboardButton(text="ℹ️ Как это работает", callback_data="referral_info")
+    ],
+    [
+        InlineKeyboardButton(text="⬅️ Назад в меню", callback_data="main_menu")
+    ]
+])
+
+
 def create_referral_keyboard() -> InlineKeyboardMarkup:
     """Создание клавиатуры для реферальной системы"""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📊 Моя статистика", callback_data="referral_stats"),
-            InlineKeyboardButton(text="👥 Мои рефералы", callback_data="referral_list")
-        ],
-        [
-            InlineKeyboardButton(text="🔗 Получить ссылку", callback_data="referral_link"),
-            InlineKeyboardButton(text="ℹ️ Как это работает", callback_data="referral_info")
-        ],
-        [
-            InlineKeyboardButton(text="⬅️ Назад в меню", callback_data="main_menu")
-        ]
-    ])
-    return keyboard
+    return _REFERRAL_KB
 
 
 def create_referral_link_keyboard(referral_link: str) -> InlineKeyboardMarkup:
@@ -131,8 +130,8 @@ async def cb_referral_link(callback: CallbackQuery):
     user_id = callback.from_user.id
     
     try:
-        # Генерируем уникальный реферальный код
-        referral_code = referral_service.generate_referral_code()
+        # Получаем сохраненный реферальный код пользователя
+        referral_code = await referral_service.create_referral_code(user_id)
         
         # Создаем реферальную ссылку
         bot_username = settings.BOT_USERNAME or "your_bot"
@@ -167,6 +166,17 @@ async def cb_referral_link(callback: CallbackQuery):
     await callback.answer()
 
 
+_REFERRAL_STATS_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔄 Обновить", callback_data="referral_stats")],
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
+])
+
+_REFERRAL_LIST_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔄 Обновить", callback_data="referral_list")],
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
+])
+
+
 @referral_router.callback_query(F.data == "referral_stats")
 async def cb_referral_stats(callback: CallbackQuery):
     """Подробная статистика рефералов"""
@@ -197,14 +207,14 @@ async def cb_referral_stats(callback: CallbackQuery):
         else:
             text += "• Пока нет данных для расчета"
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Обновить", callback_data="referral_stats")],
-            [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
-        ])
+        # Повторное "Обновить" без изменений не требует запроса к Telegram
+        if not markup_cache.is_message_changed(callback.message, text, _REFERRAL_STATS_KB):
+            await callback.answer("✅ Данные актуальны")
+            return
         
         await callback.message.edit_text(
             text,
-            reply_markup=keyboard,
+            reply_markup=_REFERRAL_STATS_KB,
             parse_mode="HTML"
         )
         
@@ -215,6 +225,14 @@ async def cb_referral_stats(callback: CallbackQuery):
     await callback.answer()
 
 
+# Значки статусов реферала в списке
+_REFERRAL_STATUS_EMOJI = MappingProxyType({
+    "pending": "⏳",
+    "confirmed": "✅",
+    "rewarded": "💰"
+})
+
+
 @referral_router.callback_query(F.data == "referral_list")
 async def cb_referral_list(callback: CallbackQuery):
     """Список рефералов пользователя"""
@@ -223,38 +241,37 @@ async def cb_referral_list(callback: CallbackQuery):
     try:
         referrals = await referral_service.get_referrals_by_referrer(user_id, limit=10)
         
-        text = "👥 <b>Ваши рефералы</b>\n\n"
+        parts = ["👥 <b>Ваши рефералы</b>\n\n"]
         
         if referrals:
             for i, referral in enumerate(referrals, 1):
-                status_emoji = {
-                    "pending": "⏳",
-                    "confirmed": "✅",
-                    "rewarded": "💰"
-                }.get(referral.status, "❓")
+                status_emoji = _REFERRAL_STATUS_EMOJI.get(referral.status, "❓")
                 
                 referred_user = referral.referred
                 user_name = referred_user.full_name if referred_user else f"ID: {referral.referred_id}"
                 
-                text += f"{i}. {status_emoji} {user_name}\n"
-                text += f"   Статус: {referral.status}\n"
+                parts.append(f"{i}. {status_emoji} {user_name}\n   Статус: {referral.status}\n")
                 
                 if referral.reward_amount:
-                    text += f"   Вознаграждение: {referral.reward_amount} ₽\n"
+                    parts.append(f"   Вознаграждение: {referral.reward_amount} ₽\n")
                 
-                text += f"   Дата: {referral.created_at.strftime('%d.%m.%Y')}\n\n"
+                parts.append(f"   Дата: {referral.created_at.strftime('%d.%m.%Y')}\n\n")
         else:
-            text += "У вас пока нет рефералов.\n\n"
-            text += "💡 Получите реферальную ссылку и начните приглашать друзей!"
+            parts.append(
+                "У вас пока нет рефералов.\n\n"
+                "💡 Получите реферальную ссылку и начните приглашать друзей!"
+            )
+        
+        text = "".join(parts)
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Обновить", callback_data="referral_list")],
-            [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
-        ])
+        # Повторное "Обновить" без изменений не требует запроса к Telegram
+        if not markup_cache.is_message_changed(callback.message, text, _REFERRAL_LIST_KB):
+            await callback.answer("✅ Данные актуальны")
+            return
         
         await callback.message.edit_text(
             text,
-            reply_markup=keyboard,
+            reply_markup=_REFERRAL_LIST_KB,
             parse_mode="HTML"
         )
         
@@ -265,10 +282,8 @@ async def cb_referral_list(callback: CallbackQuery):
     await callback.answer()
 
 
-@referral_router.callback_query(F.data == "referral_info")
-async def cb_referral_info(callback: CallbackQuery):
-    """Информация о реферальной программе"""
-    text = """
+# Статичный ответ на кнопку "Как это работает"
+_REFERRAL_INFO_TEXT = """
 ℹ️ <b>Как работает реферальная программа</b>
 
 🎯 <b>Что нужно делать:</b>
@@ -293,15 +308,19 @@ async def cb_referral_info(callback: CallbackQuery):
 
 💡 Чем больше активных друзей вы приведете, тем больше заработаете!
 """
-    
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔗 Получить ссылку", callback_data="referral_link")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
-    ])
-    
+
+_REFERRAL_INFO_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔗 Получить ссылку", callback_data="referral_link")],
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="referral_menu")]
+])
+
+
+@referral_router.callback_query(F.data == "referral_info")
+async def cb_referral_info(callback: CallbackQuery):
+    """Информация о реферальной программе"""
     await callback.message.edit_text(
-        text,
-        reply_markup=keyboard,
+        _REFERRAL_INFO_TEXT,
+        reply_markup=_REFERRAL_INFO_KB,
         parse_mode="HTML"
     )
     await callback.answer()
@@ -314,15 +333,16 @@ async def process_referral_start(user_id: int, referral_code: str) -> bool:
         if referral_code.startswith("ref_"):
             code = referral_code[4:]  # Убираем префикс "ref_"
             
-            # Ищем реферера по коду (в данном случае код генерируется динамически)
-            # Для простоты будем искать по последним рефералам
-            # В реальной системе нужно сохранять соответствие код -> реферер
-            
-            # Пока что просто логируем
             logger.info(f"Получен реферальный код: {code} для пользователя {user_id}")
             
-            # TODO: Реализовать поиск реферера по коду и создание связи
-            return True
+            # Ищем реферера по сохраненному коду
+            referrer_id = await referral_service.resolve_referral_code(code)
+            if referrer_id is None or referrer_id == user_id:
+                logger.warning(f"Реферальный код {code} не найден или принадлежит пользователю {user_id}")
+                return False
+            
+            referral = await referral_service.create_referral(referrer_id, user_id, code)
+            return referral is not None
             
     except Exception as e:
         logger.error(f"Ошибка обработки реферального кода: {e}")
@@ -3,16 +3,21 @@
 Содержит основные команды взаимодействия с ботом.
 """
 
+from dataclasses import dataclass
+from typing import Callable
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 
 from app.bot.keyboards.inline import main_menu_keyboard, back_button
+from app.bot.utils.markup_cache import markup_cache
 from app.bot.utils.texts import Messages
 from app.config.settings import get_settings
-from app.utils.logger import get_logger, log_user_action
-from app.services.user_service import UserService
+from app.utils.logger import get_logger, log_in_background, log_user_action
+from app.utils.tasks import spawn_background
+from app.services.user_service import user_service
 from app.bot.handlers.referral import process_referral_start
 
 # Создаем роутер для обработчиков
@@ -20,9 +25,6 @@ router = Router()
 logger = get_logger("handlers.start")
 settings = get_settings()
 
-# Инициализируем сервисы
-user_service = UserService()
-
 
 @router.message(CommandStart())
 async def start_command(message: Message, state: FSMContext) -> None:
@@ -33,7 +35,8 @@ async def start_command(message: Message, state: FSMContext) -> None:
     user = message.from_user
     
     # Логируем действие пользователя
-    log_user_action(
+    log_in_background(
+        log_user_action,
         user_id=user.id,
         action="start_command",
         username=user.username,
@@ -55,7 +58,7 @@ async def start_command(message: Message, state: FSMContext) -> None:
             return
         
         # Создаем или обновляем пользователя в базе данных
-        await user_service.create_or_update_user(
+        _, is_new_user = await user_service.create_or_update_user(
             telegram_id=user.id,
             username=user.username,
             first_name=user.first_name,
@@ -63,11 +66,13 @@ async def start_command(message: Message, state: FSMContext) -> None:
             language_code=user.language_code
         )
         
-        # Обрабатываем реферальный код, если есть
-        command_args = message.text.split()[1:] if len(message.text.split()) > 1 else []
-        if command_args:
-            referral_code = command_args[0]
-            await process_referral_start(user.id, referral_code)
+        # Реферальный код учитывается только при первой регистрации,
+        # иначе существующий пользователь мог бы привязаться к любому рефереру
+        parts = message.text.split(maxsplit=1)
+        referral_code = parts[1].split(None, 1)[0] if len(parts) > 1 else None
+        if referral_code and is_new_user:
+            # Реферал оформляется параллельно с отправкой приветствия
+            spawn_background(process_referral_start(user.id, referral_code), name="referral_start")
         
         # Отправляем приветственное сообщение
         await message.answer(
@@ -100,7 +105,8 @@ async def help_command(message: Message) -> None:
     """
     user = message.from_user
     
-    log_user_action(
+    log_in_background(
+        log_user_action,
         user_id=user.id,
         action="help_command"
     )
@@ -130,7 +136,8 @@ async def support_command(message: Message) -> None:
     """
     user = message.from_user
     
-    log_user_action(
+    log_in_background(
+        log_user_action,
         user_id=user.id,
         action="support_command"
     )
@@ -152,126 +159,59 @@ async def support_command(message: Message) -> None:
         await message.answer(Messages.ERROR_GENERAL)
 
 
-@router.callback_query(F.data == "back_to_main")
-async def back_to_main_callback(callback: CallbackQuery, state: FSMContext) -> None:
-    """
-    Обработчик кнопки "Назад в главное меню".
-    """
-    user = callback.from_user
-    
-    log_user_action(
-        user_id=user.id,
-        action="back_to_main"
-    )
-    
-    # Очищаем состояние FSM
-    await state.clear()
-    
-    try:
-        await callback.message.edit_text(
-            Messages.START_MESSAGE,
-            reply_markup=main_menu_keyboard(),
-            parse_mode="HTML"
-        )
-        await callback.answer()
-        
-    except Exception as e:
-        logger.error(
-            "Ошибка в обработчике back_to_main",
-            user_id=user.id,
-            error=str(e),
-            exc_info=True
-        )
-        await callback.answer("Произошла ошибка")
-
-
-@router.callback_query(F.data == "help")
-async def help_callback(callback: CallbackQuery) -> None:
-    """
-    Обработчик кнопки "Справка".
-    """
-    user = callback.from_user
-    
-    log_user_action(
-        user_id=user.id,
-        action="help_button"
-    )
-    
-    try:
-        await callback.message.edit_text(
-            Messages.HELP_MESSAGE,
-            reply_markup=back_button("back_to_main"),
-            parse_mode="HTML"
-        )
-        await callback.answer()
-        
-    except Exception as e:
-        logger.error(
-            "Ошибка в обработчике help callback",
-            user_id=user.id,
-            error=str(e),
-            exc_info=True
-        )
-        await callback.answer("Произошла ошибка")
+@dataclass(frozen=True)
+class _MenuScreen:
+    """Экран меню, который показывается по нажатию кнопки"""
+    text: str
+    keyboard: Callable[[], InlineKeyboardMarkup]
+    action: str
+    clear_state: bool = False
 
 
-@router.callback_query(F.data == "support")
-async def support_callback(callback: CallbackQuery) -> None:
-    """
-    Обработчик кнопки "Поддержка".
-    """
-    user = callback.from_user
-    
-    log_user_action(
-        user_id=user.id,
-        action="support_button"
-    )
-    
-    try:
-        await callback.message.edit_text(
-            Messages.SUPPORT_MESSAGE,
-            reply_markup=back_button("back_to_main"),
-            parse_mode="HTML"
-        )
-        await callback.answer()
-        
-    except Exception as e:
-        logger.error(
-            "Ошибка в обработчике support callback",
-            user_id=user.id,
-            error=str(e),
-            exc_info=True
-        )
-        await callback.answer("Произошла ошибка")
+# Экраны меню по callback_data: один фильтр и поиск в словаре
+# вместо отдельных обработчиков с одинаковым телом
+_MENU_SCREENS = {
+    "back_to_main": _MenuScreen(Messages.START_MESSAGE, main_menu_keyboard, "back_to_main", clear_state=True),
+    "main_menu": _MenuScreen(Messages.START_MESSAGE, main_menu_keyboard, "main_menu", clear_state=True),
+    "help": _MenuScreen(Messages.HELP_MESSAGE, lambda: back_button("back_to_main"), "help_button"),
+    "support": _MenuScreen(Messages.SUPPORT_MESSAGE, lambda: back_button("back_to_main"), "support_button"),
+}
 
 
-@router.callback_query(F.data == "main_menu")
-async def main_menu_callback(callback: CallbackQuery, state: FSMContext) -> None:
+@router.callback_query(F.data.in_(frozenset(_MENU_SCREENS)))
+async def menu_callback(callback: CallbackQuery, state: FSMContext) -> None:
     """
-    Обработчик кнопки "Главное меню".
+    Обработчик кнопок главного меню, справки и поддержки.
     """
     user = callback.from_user
+    screen = _MENU_SCREENS[callback.data]
     
-    log_user_action(
+    log_in_background(
+        log_user_action,
         user_id=user.id,
-        action="main_menu"
+        action=screen.action
     )
     
-    # Очищаем состояние FSM
-    await state.clear()
+    if screen.clear_state:
+        # Очищаем состояние FSM
+        await state.clear()
     
     try:
-        await callback.message.edit_text(
-            Messages.START_MESSAGE,
-            reply_markup=main_menu_keyboard(),
-            parse_mode="HTML"
-        )
+        keyboard = screen.keyboard()
+        # Если экран уже показан, Telegram ответит "message is not modified"
+        if markup_cache.is_message_changed(callback.message, screen.text, keyboard):
+            await callback.message.edit_text(
+                screen.text,
+                reply_markup=keyboard,
+                parse_mode="HTML"
+            )
         await callback.answer()
         
     except Exception as e:
         logger.error(
-            "Ошибка в обработчике main_menu",
+            "Ошибка в обработчике кнопки меню",
             user_id=user.id,
+            callback_data=callback.data,
             error=str(e),
             exc_info=True
         )
@@ -288,6 +228,4 @@ async def _is_user_banned(user_id: int) -> bool:
     Returns:
         bool: True если пользователь заблокирован
     """
-    # TODO: Реализовать проверку в базе данных
-    # Пока возвращаем False
-    return False 
\ No newline at end of file
+    return await user_service.is_user_banned(user_id)
\ No newline at end of file
@@ -2,80 +2,129 @@
 Обработчики для управления подписками в PaidSubscribeBot.
 """
 
-from typing import Optional
+import asyncio
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import User as TelegramUser
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from app.bot.states.subscription import SubscriptionStates
 from app.bot.keyboards.inline import (
     get_subscription_menu_keyboard,
-    get_subscription_plans_keyboard,
+    get_channel_subscription_plans_keyboard,
     get_payment_methods_keyboard
 )
+from app.bot.utils.fsm import set_state_and_data
+from app.bot.utils.markup_cache import markup_cache
 from app.bot.utils.texts import MESSAGES
-from app.services.user_service import UserService
-from app.services.subscription_service import SubscriptionService
-from app.services.channel_service import ChannelService
-from app.services.notification_service import NotificationService
-from app.payments.manager import PaymentManager
+from app.services.user_service import user_service
+from app.services.subscription_service import subscription_service
+from app.services.channel_service import channel_service
+from app.services.notification_service import notification_service
+from app.payments.base import PaymentRequest
+from app.payments.manager import payment_manager
 from app.database.models.payment import PaymentMethod
 from app.utils.logger import get_logger
+from app.utils.tasks import spawn_background
 
 # Создаем роутер для обработчиков подписок
 subscription_router = Router()
 
-# Инициализируем сервисы
-user_service = UserService()
-subscription_service = SubscriptionService()
-channel_service = ChannelService()
-notification_service = NotificationService()
-payment_manager = PaymentManager()
-
 logger = get_logger("handlers.subscription")
 
+# Блокировки по чатам: платежи одного чата создаются по очереди
+_payment_locks: Dict[int, asyncio.Lock] = {}
+_payment_lock_users: Counter = Counter()
 
-@subscription_router.message(Command("subscription", "sub"))
-async def cmd_subscription(message: Message, state: FSMContext):
-    """Команда для управления подписками"""
-    await state.clear()
+
+# За сколько дней до окончания подписки показывать предупреждение
+_EXPIRY_WARNING_DAYS = 3
+
+
+def _render_active_subscription(sub, now: datetime, warn_threshold: datetime) -> str:
+    """
+    Блок текста с информацией об активной подписке.
+    
+    Args:
+        sub: Подписка
+        now: Текущее время (UTC)
+        warn_threshold: Момент, до которого истекающие подписки получают предупреждение
+    
+    Returns:
+        str: Отформатированный блок
+    """
+    # Информация о канале появится, когда будет добавлена связь с каналом
+    warning = ""
+    if sub.expires_at < warn_threshold:
+        # Количество дней считаем только для истекающих подписок
+        warning = f"⚠️ Осталось дней: <b>{(sub.expires_at - now).days}</b>\n"
+    return f"🔹 Подписка до: <b>{sub.expires_at.strftime('%d.%m.%Y')}</b>\n{warning}\n"
+
+
+async def _render_subscription_menu(from_user: TelegramUser) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Текст и клавиатура меню подписок пользователя.
+    
+    Args:
+        from_user: Пользователь Telegram
     
+    Returns:
+        Tuple[str, InlineKeyboardMarkup]: Текст сообщения и клавиатура
+    """
     # Получаем или создаем пользователя
     user = await user_service.get_or_create_user(
-        telegram_id=message.from_user.id,
-        username=message.from_user.username,
-        first_name=message.from_user.first_name,
-        last_name=message.from_user.last_name,
-        language_code=message.from_user.language_code
+        telegram_id=from_user.id,
+        username=from_user.username,
+        first_name=from_user.first_name,
+        last_name=from_user.last_name,
+        language_code=from_user.language_code
     )
     
-    # Обновляем активность
-    await user_service.update_user_activity(user.telegram_id)
-    
-    # Получаем активные подписки пользователя
-    subscriptions = await subscription_service.get_user_subscriptions(user.id, active_only=True)
+    # Обновляем активность и получаем активные подписки одновременно
+    activity_result, subscriptions = await asyncio.gather(
+        user_service.update_user_activity(user.telegram_id),
+        subscription_service.get_user_subscriptions(user.id, active_only=True),
+        return_exceptions=True
+    )
+    if isinstance(subscriptions, Exception):
+        raise subscriptions
+    if isinstance(activity_result, Exception):
+        # Ошибка обновления активности не должна мешать показу подписок
+        logger.warning(
+            "Не удалось обновить активность пользователя",
+            user_id=user.telegram_id,
+            error=str(activity_result)
+        )
     
     if subscriptions:
         # Показываем информацию об активных подписках
-        text = "📋 <b>Ваши активные подписки:</b>\n\n"
-        
-        for sub in subscriptions:
-            # Получаем информацию о канале (нужно будет добавить связь с каналом)
-            text += f"🔹 Подписка до: <b>{sub.expires_at.strftime('%d.%m.%Y')}</b>\n"
-            days_left = (sub.expires_at - datetime.utcnow()).days
-            if days_left <= 3:
-                text += f"⚠️ Осталось дней: <b>{days_left}</b>\n"
-            text += "\n"
+        now = datetime.utcnow()
+        # days <= N эквивалентно разнице меньше N + 1 суток
+        warn_threshold = now + timedelta(days=_EXPIRY_WARNING_DAYS + 1)
+        text = "📋 <b>Ваши активные подписки:</b>\n\n" + "".join(
+            _render_active_subscription(sub, now, warn_threshold) for sub in subscriptions
+        )
         
         keyboard = get_subscription_menu_keyboard(has_subscription=True)
     else:
         text = MESSAGES["no_subscription"]
         keyboard = get_subscription_menu_keyboard(has_subscription=False)
     
+    return text, keyboard
+
+
+@subscription_router.message(Command("subscription", "sub"))
+async def cmd_subscription(message: Message, state: FSMContext):
+    """Команда для управления подписками"""
+    await state.clear()
+    
+    text, keyboard = await _render_subscription_menu(message.from_user)
     await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
 
 
@@ -103,11 +152,10 @@ async def callback_new_subscription(callback: CallbackQuery, state: FSMContext):
         text += f"📝 {channel.description}\n"
     text += "\n<b>Доступные планы:</b>"
     
-    keyboard = get_subscription_plans_keyboard(channel)
+    keyboard = get_channel_subscription_plans_keyboard(channel)
     
     await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
-    await state.set_state(SubscriptionStates.selecting_plan)
-    await state.update_data(channel_id=channel.id)
+    await set_state_and_data(state, SubscriptionStates.selecting_plan, channel_id=channel.id)
 
 
 @subscription_router.callback_query(F.data.startswith("plan_"), SubscriptionStates.selecting_plan)
@@ -131,63 +179,66 @@ async def callback_select_plan(callback: CallbackQuery, state: FSMContext):
     
     # Определяем цену и длительность
     if plan_type == "monthly":
-        price = Decimal(str(channel.monthly_price or 199))
+        price = Decimal(channel.monthly_price or 199)
         duration_days = 30
         plan_name = "Месячная подписка"
     else:  # yearly
-        price = Decimal(str(channel.yearly_price or 1990))
+        price = Decimal(channel.yearly_price or 1990)
         duration_days = 365
         plan_name = "Годовая подписка"
     
-    # Сохраняем данные о выбранном плане
-    await state.update_data(
-        plan_type=plan_type,
-        price=float(price),
-        duration_days=duration_days,
-        plan_name=plan_name
-    )
-    
     # Показываем методы оплаты
-    text = f"💳 <b>Выберите способ оплаты</b>\n\n"
-    text += f"📦 План: <b>{plan_name}</b>\n"
-    text += f"💰 Стоимость: <b>{price} ₽</b>\n"
-    text += f"⏰ Длительность: <b>{duration_days} дней</b>\n\n"
-    text += "Выберите удобный способ оплаты:"
+    text = (
+        "💳 <b>Выберите способ оплаты</b>\n\n"
+        f"📦 План: <b>{plan_name}</b>\n"
+        f"💰 Стоимость: <b>{price} ₽</b>\n"
+        f"⏰ Длительность: <b>{duration_days} дней</b>\n\n"
+        "Выберите удобный способ оплаты:"
+    )
     
     # Получаем доступные методы оплаты
     available_methods = payment_manager.get_available_methods()
     keyboard = get_payment_methods_keyboard(available_methods)
     
     await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
-    await state.set_state(SubscriptionStates.selecting_payment)
+    
+    # Сохраняем данные о выбранном плане (цена строкой, чтобы не терять точность Decimal)
+    await set_state_and_data(
+        state,
+        SubscriptionStates.selecting_payment,
+        data,
+        plan_type=plan_type,
+        price=str(price),
+        duration_days=duration_days,
+        plan_name=plan_name
+    )
 
 
 @subscription_router.callback_query(F.data.startswith("pay_"), SubscriptionStates.selecting_payment)
 async def callback_select_payment(callback: CallbackQuery, state: FSMContext):
     """Выбор метода оплаты и создание платежа"""
-    await callback.answer()
-    
     method_name = callback.data.split("_", 1)[1]
-    data = await state.get_data()
     
     try:
         # Конвертируем название метода в enum
         payment_method = PaymentMethod(method_name)
     except ValueError:
+        await callback.answer()
         await callback.message.edit_text("❌ Неизвестный метод оплаты")
         return
     
+    await callback.answer("⏳ Создаем платеж...")
+    data = await state.get_data()
+    
     # Получаем пользователя
-    user = await user_service.get_user_by_telegram_id(callback.from_user.id)
+    user = await user_service.get_user_by_telegram_id_cached(callback.from_user.id)
     if not user:
         await callback.message.edit_text("❌ Ошибка: пользователь не найден")
         return
     
     # Создаем платежный запрос
-    from app.payments.base import PaymentRequest
-    
     payment_request = PaymentRequest(
-        amount=Decimal(str(data["price"])),
+        amount=Decimal(data["price"]),
         currency="RUB",
         description=f"Подписка: {data['plan_name']}",
         user_id=user.telegram_id,
@@ -200,53 +251,109 @@ async def callback_select_payment(callback: CallbackQuery, state: FSMContext):
         }
     )
     
+    # Запрос к платежной системе может занять несколько секунд, поэтому выполняется
+    # в фоновой задаче, чтобы не задерживать обработку остальных обновлений
+    spawn_background(
+        _create_payment_for_chat(callback, state, data, payment_method, payment_request, user.telegram_id),
+        name="create_payment"
+    )
+
+
+async def _create_payment_for_chat(
+    callback: CallbackQuery,
+    state: FSMContext,
+    data: Dict[str, Any],
+    payment_method: PaymentMethod,
+    payment_request: PaymentRequest,
+    user_telegram_id: int
+) -> None:
+    """
+    Создание платежа с сохранением порядка запросов внутри одного чата.
+    
+    Args:
+        callback: Callback выбора метода оплаты
+        state: Контекст FSM
+        data: Данные состояния
+        payment_method: Метод оплаты
+        payment_request: Платежный запрос
+        user_telegram_id: Telegram ID пользователя
+    """
+    chat_id = callback.message.chat.id
+    lock = _payment_locks.setdefault(chat_id, asyncio.Lock())
+    _payment_lock_users[chat_id] += 1
+    try:
+        async with lock:
+            await _create_payment(callback, state, data, payment_method, payment_request, user_telegram_id)
+    finally:
+        _payment_lock_users[chat_id] -= 1
+        if not _payment_lock_users[chat_id]:
+            del _payment_lock_users[chat_id]
+            _payment_locks.pop(chat_id, None)
+
+
+async def _create_payment(
+    callback: CallbackQuery,
+    state: FSMContext,
+    data: Dict[str, Any],
+    payment_method: PaymentMethod,
+    payment_request: PaymentRequest,
+    user_telegram_id: int
+) -> None:
+    """Создание платежа через менеджер и отправка ссылки на оплату"""
     try:
         # Создаем платеж через менеджер
         payment_response = await payment_manager.create_payment(payment_method, payment_request)
         
-        # Сохраняем ID платежа в состоянии
-        await state.update_data(payment_id=payment_response.payment_id)
-        
         # Отправляем информацию о платеже
-        text = f"💳 <b>Платеж создан</b>\n\n"
-        text += f"📦 План: <b>{data['plan_name']}</b>\n"
-        text += f"💰 Сумма: <b>{data['price']} ₽</b>\n"
-        text += f"💳 Метод: <b>{payment_method.value}</b>\n\n"
+        header = (
+            "💳 <b>Платеж создан</b>\n\n"
+            f"📦 План: <b>{data['plan_name']}</b>\n"
+            f"💰 Сумма: <b>{data['price']} ₽</b>\n"
+            f"💳 Метод: <b>{payment_method.value}</b>\n\n"
+        )
         
         if payment_response.payment_url:
-            text += "Для оплаты перейдите по ссылке:"
+            text = f"{header}Для оплаты перейдите по ссылке:"
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="💳 Оплатить", url=payment_response.payment_url)],
                 [InlineKeyboardButton(text="🔄 Проверить статус", callback_data=f"check_payment_{payment_response.payment_id}")],
                 [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_payment")]
             ])
         elif payment_response.qr_code:
-            text += "Отсканируйте QR-код для оплаты:"
+            text = f"{header}Отсканируйте QR-код для оплаты:"
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="🔄 Проверить статус", callback_data=f"check_payment_{payment_response.payment_id}")],
                 [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_payment")]
             ])
             # TODO: Отправить QR-код как изображение
         else:
-            text += f"ID платежа: <code>{payment_response.payment_id}</code>"
+            text = f"{header}ID платежа: <code>{payment_response.payment_id}</code>"
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="🔄 Проверить статус", callback_data=f"check_payment_{payment_response.payment_id}")],
                 [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_payment")]
             ])
         
         await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
-        await state.set_state(SubscriptionStates.waiting_payment)
+        
+        # Сохраняем ID и метод платежа в состоянии
+        await set_state_and_data(
+            state,
+            SubscriptionStates.waiting_payment,
+            data,
+            payment_id=payment_response.payment_id,
+            payment_method=payment_method.value
+        )
         
         logger.info(
             "Создан платеж для подписки",
-            user_id=user.telegram_id,
+            user_id=user_telegram_id,
             payment_id=payment_response.payment_id,
             amount=float(payment_request.amount),
             method=payment_method.value
         )
         
     except Exception as e:
-        logger.error("Ошибка создания платежа", error=str(e), user_id=user.telegram_id)
+        logger.error("Ошибка создания платежа", error=str(e), user_id=user_telegram_id)
         await callback.message.edit_text(
             f"❌ <b>Ошибка создания платежа</b>\n\n{str(e)}\n\nПопробуйте другой способ оплаты или обратитесь в поддержку.",
             parse_mode="HTML"
@@ -261,36 +368,29 @@ async def callback_check_payment(callback: CallbackQuery, state: FSMContext):
     payment_id = callback.data.split("_", 2)[2]
     data = await state.get_data()
     
-    # Получаем метод оплаты из данных состояния
-    # TODO: Нужно сохранять метод оплаты в состоянии
+    # Метод оплаты сохраняется в состоянии при создании платежа
+    method_name = data.get("payment_method")
+    if not method_name:
+        await callback.answer("❓ Не удалось проверить статус платежа", show_alert=True)
+        return
     
     try:
-        # Проверяем статус платежа через все доступные методы
-        # (в реальном проекте нужно знать конкретный метод)
-        for method in payment_manager.get_available_methods():
-            try:
-                status_data = await payment_manager.check_payment_status(method, payment_id)
-                
-                if status_data.status == "completed":
-                    # Платеж успешен - создаем подписку
-                    await process_successful_payment(callback, state, status_data, data)
-                    return
-                elif status_data.status == "failed":
-                    await callback.message.edit_text(
-                        f"❌ <b>Платеж отклонен</b>\n\n"
-                        f"Причина: {status_data.failure_reason or 'Неизвестная ошибка'}\n\n"
-                        "Попробуйте еще раз или выберите другой способ оплаты.",
-                        parse_mode="HTML"
-                    )
-                    return
-                elif status_data.status == "pending":
-                    await callback.answer("⏳ Платеж обрабатывается. Подождите немного.", show_alert=True)
-                    return
-                    
-            except Exception as e:
-                continue  # Пробуем следующий метод
+        status_data = await payment_manager.check_payment_status(PaymentMethod(method_name), payment_id)
         
-        await callback.answer("❓ Не удалось проверить статус платежа", show_alert=True)
+        if status_data.status == "completed":
+            # Платеж успешен - создаем подписку
+            await process_successful_payment(callback, state, status_data, data)
+        elif status_data.status == "failed":
+            await callback.message.edit_text(
+                f"❌ <b>Платеж отклонен</b>\n\n"
+                f"Причина: {status_data.failure_reason or 'Неизвестная ошибка'}\n\n"
+                "Попробуйте еще раз или выберите другой способ оплаты.",
+                parse_mode="HTML"
+            )
+        elif status_data.status == "pending":
+            await callback.answer("⏳ Платеж обрабатывается. Подождите немного.", show_alert=True)
+        else:
+            await callback.answer("❓ Не удалось проверить статус платежа", show_alert=True)
         
     except Exception as e:
         logger.error("Ошибка проверки платежа", error=str(e), payment_id=payment_id)
@@ -299,47 +399,48 @@ async def callback_check_payment(callback: CallbackQuery, state: FSMContext):
 
 async def process_successful_payment(callback: CallbackQuery, state: FSMContext, status_data, subscription_data):
     """Обработка успешного платежа"""
-    user = await user_service.get_user_by_telegram_id(callback.from_user.id)
+    user = await user_service.get_user_by_telegram_id_cached(callback.from_user.id)
     if not user:
         await callback.message.edit_text("❌ Ошибка: пользователь не найден")
         return
     
     try:
-        # Создаем подписку
-        subscription = await subscription_service.create_subscription(
-            user_id=user.id,
-            channel_id=subscription_data["channel_id"],
-            duration_days=subscription_data["duration_days"],
-            price=Decimal(str(subscription_data["price"]))
+        # Создаем сразу активную подписку одним INSERT и параллельно получаем информацию о канале
+        subscription, channel = await asyncio.gather(
+            subscription_service.create_subscription(
+                user_id=user.id,
+                channel_id=subscription_data["channel_id"],
+                duration_days=subscription_data["duration_days"],
+                price=Decimal(subscription_data["price"]),
+                activate=True
+            ),
+            channel_service.get_channel_by_id(subscription_data["channel_id"])
         )
         
-        # Активируем подписку
-        await subscription_service.activate_subscription(subscription.id)
-        
-        # Получаем информацию о канале
-        channel = await channel_service.get_channel_by_id(subscription_data["channel_id"])
-        
-        # Добавляем пользователя в канал
+        # Уведомление об успешной оплате и добавление в канал не зависят друг от друга
+        pending = [
+            notification_service.send_payment_success_notification(
+                user=user,
+                payment=status_data,  # Нужно будет адаптировать под модель Payment
+                subscription=subscription
+            )
+        ]
         if channel:
-            await channel_service.add_user_to_channel(
+            pending.append(channel_service.add_user_to_channel(
                 user_telegram_id=user.telegram_id,
                 channel_telegram_id=channel.telegram_id
-            )
-        
-        # Отправляем уведомление об успешной оплате
-        await notification_service.send_payment_success_notification(
-            user=user,
-            payment=status_data,  # Нужно будет адаптировать под модель Payment
-            subscription=subscription
-        )
+            ))
+        await asyncio.gather(*pending)
         
         # Очищаем состояние
         await state.clear()
         
-        text = f"✅ <b>Подписка успешно оформлена!</b>\n\n"
-        text += f"📦 План: <b>{subscription_data['plan_name']}</b>\n"
-        text += f"📅 Действует до: <b>{subscription.expires_at.strftime('%d.%m.%Y')}</b>\n\n"
-        text += "Добро пожаловать в канал! 🎉"
+        text = (
+            "✅ <b>Подписка успешно оформлена!</b>\n\n"
+            f"📦 План: <b>{subscription_data['plan_name']}</b>\n"
+            f"📅 Действует до: <b>{subscription.expires_at.strftime('%d.%m.%Y')}</b>\n\n"
+            "Добро пожаловать в канал! 🎉"
+        )
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="📱 Перейти в канал", url=f"https://t.me/{channel.username}" if channel and channel.username else "https://t.me/your_channel")],
@@ -368,7 +469,7 @@ async def callback_my_subscriptions(callback: CallbackQuery):
     """Просмотр моих подписок"""
     await callback.answer()
     
-    user = await user_service.get_user_by_telegram_id(callback.from_user.id)
+    user = await user_service.get_user_by_telegram_id_cached(callback.from_user.id)
     if not user:
         await callback.message.edit_text("❌ Ошибка: пользователь не найден")
         return
@@ -382,9 +483,10 @@ async def callback_my_subscriptions(callback: CallbackQuery):
         ])
     else:
         text = "📋 <b>Ваши подписки:</b>\n\n"
+        now = datetime.utcnow()
         
         for i, sub in enumerate(subscriptions, 1):
-            status = "🟢 Активна" if sub.is_active and sub.expires_at > datetime.utcnow() else "🔴 Неактивна"
+            status = "🟢 Активна" if sub.is_active and sub.expires_at > now else "🔴 Неактивна"
             text += f"{i}. {status}\n"
             text += f"   📅 До: {sub.expires_at.strftime('%d.%m.%Y')}\n"
             text += f"   💰 Цена: {sub.price} ₽\n\n"
@@ -417,5 +519,9 @@ async def callback_subscription_menu(callback: CallbackQuery, state: FSMContext)
     await callback.answer()
     await state.clear()
     
-    # Переадресация на основную команду
-    await cmd_subscription(callback.message, state) 
\ No newline at end of file
+    text, keyboard = await _render_subscription_menu(callback.from_user)
+    
+    # Повторное нажатие на уже открытом меню не отправляет запрос в Telegram
+    if markup_cache.is_message_changed(callback.message, text, keyboard):
+        await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+ 
\ No newline at end of file
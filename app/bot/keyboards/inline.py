@@ -1,16 +1,23 @@
 """
 Inline клавиатуры для PaidSubscribeBot.
 Содержит все inline клавиатуры, используемые ботом.
+
+Клавиатуры, зависящие только от статичных подписей, создаются один раз
+через lru_cache - возвращаемые объекты общие и не должны изменяться.
+Клавиатуры с небольшим набором хешируемых параметров (страница, ID,
+флаги) кэшируются по значениям аргументов так же.
 """
 
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List, Optional
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from typing import List, Optional, Sequence, Tuple
 
 from app.database.models.subscription import SubscriptionDuration
 from app.database.models.payment import PaymentMethod
 
 
+@lru_cache(maxsize=1)
 def main_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню бота"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -32,6 +39,7 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=512)
 def subscription_plans_keyboard(
     monthly_price: int,
     yearly_price: int,
@@ -83,10 +91,36 @@ def subscription_plans_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+# Подписи кнопок способов оплаты
+_METHOD_LABELS = {
+    PaymentMethod.YOOMONEY: "💰 YooMoney",
+    PaymentMethod.TELEGRAM_STARS: "⭐ Telegram Stars",
+    PaymentMethod.SBP: "🚀 СБП",
+    PaymentMethod.BANK_CARD: "💳 Банковская карта",
+    PaymentMethod.CRYPTO: "₿ Криптовалюта",
+}
+
+# Подписи и ключи callback_data для get_payment_methods_keyboard_for_plan
+_PLAN_METHOD_BUTTONS = {
+    PaymentMethod.YOOMONEY: ("💳 YooMoney", "yoomoney"),
+    PaymentMethod.TELEGRAM_STARS: ("⭐ Telegram Stars", "stars"),
+    PaymentMethod.SBP: ("📱 СБП", "sbp"),
+    PaymentMethod.BANK_CARD: ("💳 Банковская карта", "card"),
+}
+
+# Способы оплаты по умолчанию для payment_methods_keyboard
+_DEFAULT_PAYMENT_METHODS: Tuple[PaymentMethod, ...] = (
+    PaymentMethod.YOOMONEY,
+    PaymentMethod.TELEGRAM_STARS,
+    PaymentMethod.SBP,
+    PaymentMethod.BANK_CARD,
+)
+
+
 def payment_methods_keyboard(
     plan: str,
     amount: int,
-    available_methods: Optional[List[PaymentMethod]] = None
+    available_methods: Optional[Sequence[PaymentMethod]] = None
 ) -> InlineKeyboardMarkup:
     """
     Клавиатура выбора способа оплаты.
@@ -97,36 +131,30 @@ def payment_methods_keyboard(
         available_methods: Доступные способы оплаты
     """
     if available_methods is None:
-        available_methods = [
-            PaymentMethod.YOOMONEY,
-            PaymentMethod.TELEGRAM_STARS,
-            PaymentMethod.SBP,
-            PaymentMethod.BANK_CARD,
-        ]
-    
-    keyboard = []
+        available_methods = _DEFAULT_PAYMENT_METHODS
     
+    # Список не хешируется, поэтому в кэш передается кортеж
+    return _payment_methods_keyboard(plan, amount, tuple(available_methods))
+
+
+@lru_cache(maxsize=256)
+def _payment_methods_keyboard(
+    plan: str,
+    amount: int,
+    available_methods: Tuple[PaymentMethod, ...]
+) -> InlineKeyboardMarkup:
+    """Построение клавиатуры выбора способа оплаты (результат кэшируется)"""
     # Кнопки способов оплаты
-    for method in available_methods:
-        if method == PaymentMethod.YOOMONEY:
-            text = "💰 YooMoney"
-        elif method == PaymentMethod.TELEGRAM_STARS:
-            text = "⭐ Telegram Stars"
-        elif method == PaymentMethod.SBP:
-            text = "🚀 СБП"
-        elif method == PaymentMethod.BANK_CARD:
-            text = "💳 Банковская карта"
-        elif method == PaymentMethod.CRYPTO:
-            text = "₿ Криптовалюта"
-        else:
-            continue
-            
-        keyboard.append([
+    keyboard = [
+        [
             InlineKeyboardButton(
-                text=text,
+                text=_METHOD_LABELS[method],
                 callback_data=f"payment_{method.value}_{plan}_{amount}"
             )
-        ])
+        ]
+        for method in available_methods
+        if method in _METHOD_LABELS
+    ]
     
     # Кнопки навигации
     keyboard.append([
@@ -137,6 +165,11 @@ def payment_methods_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+# Адрес страницы оплаты (заменить на реальный URL)
+_PAY_URL_PREFIX = "https://payment.example.com/pay/"
+
+
+@lru_cache(maxsize=512)
 def payment_confirmation_keyboard(payment_id: int) -> InlineKeyboardMarkup:
     """
     Клавиатура подтверждения платежа.
@@ -148,7 +181,7 @@ def payment_confirmation_keyboard(payment_id: int) -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton(
                 text="💳 Перейти к оплате",
-                url=f"https://payment.example.com/pay/{payment_id}"  # Заменить на реальный URL
+                url=f"{_PAY_URL_PREFIX}{payment_id}"
             )
         ],
         [
@@ -165,6 +198,7 @@ def payment_confirmation_keyboard(payment_id: int) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=512)
 def subscription_info_keyboard(subscription_id: int, is_active: bool) -> InlineKeyboardMarkup:
     """
     Клавиатура для информации о подписке.
@@ -173,28 +207,30 @@ def subscription_info_keyboard(subscription_id: int, is_active: bool) -> InlineK
         subscription_id: ID подписки
         is_active: Активна ли подписка
     """
-    keyboard = []
-    
     if is_active:
-        keyboard.append([
-            InlineKeyboardButton(
-                text="📢 Перейти в канал",
-                url="https://t.me/your_channel"  # Заменить на реальную ссылку
-            )
-        ])
-        keyboard.append([
-            InlineKeyboardButton(
-                text="🔄 Продлить подписку",
-                callback_data="pay_subscription"
-            )
-        ])
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    text="📢 Перейти в канал",
+                    url="https://t.me/your_channel"  # Заменить на реальную ссылку
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text="🔄 Продлить подписку",
+                    callback_data="pay_subscription"
+                )
+            ]
+        ]
     else:
-        keyboard.append([
-            InlineKeyboardButton(
-                text="💳 Оплатить подписку",
-                callback_data="pay_subscription"
-            )
-        ])
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    text="💳 Оплатить подписку",
+                    callback_data="pay_subscription"
+                )
+            ]
+        ]
     
     keyboard.append([
         InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
@@ -203,6 +239,7 @@ def subscription_info_keyboard(subscription_id: int, is_active: bool) -> InlineK
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=1)
 def admin_menu_keyboard() -> InlineKeyboardMarkup:
     """Главное меню администратора"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -230,6 +267,7 @@ def admin_menu_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=512)
 def admin_users_keyboard(page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
     """
     Клавиатура управления пользователями.
@@ -238,13 +276,13 @@ def admin_users_keyboard(page: int = 1, total_pages: int = 1) -> InlineKeyboardM
         page: Текущая страница
         total_pages: Общее количество страниц
     """
-    keyboard = []
-    
     # Кнопки управления пользователем
-    keyboard.append([
-        InlineKeyboardButton(text="🔍 Найти пользователя", callback_data="admin_find_user"),
-        InlineKeyboardButton(text="📊 Экспорт данных", callback_data="admin_export_users"),
-    ])
+    keyboard = [
+        [
+            InlineKeyboardButton(text="🔍 Найти пользователя", callback_data="admin_find_user"),
+            InlineKeyboardButton(text="📊 Экспорт данных", callback_data="admin_export_users"),
+        ]
+    ]
     
     # Пагинация
     if total_pages > 1:
@@ -273,6 +311,11 @@ def admin_users_keyboard(page: int = 1, total_pages: int = 1) -> InlineKeyboardM
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+# Подпись кнопки блокировки по текущему статусу (индекс - is_banned)
+_BAN_LABELS = ("🚫 Заблокировать", "🔓 Разблокировать")
+
+
+@lru_cache(maxsize=512)
 def user_management_keyboard(user_id: int, is_banned: bool = False) -> InlineKeyboardMarkup:
     """
     Клавиатура управления конкретным пользователем.
@@ -299,10 +342,9 @@ def user_management_keyboard(user_id: int, is_banned: bool = False) -> InlineKey
     ])
     
     # Управление пользователем
-    ban_text = "🔓 Разблокировать" if is_banned else "🚫 Заблокировать"
     keyboard.append([
         InlineKeyboardButton(
-            text=ban_text,
+            text=_BAN_LABELS[is_banned],
             callback_data=f"admin_toggle_ban_{user_id}"
         ),
         InlineKeyboardButton(
@@ -320,6 +362,7 @@ def user_management_keyboard(user_id: int, is_banned: bool = False) -> InlineKey
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=512)
 def confirmation_keyboard(action: str, item_id: int) -> InlineKeyboardMarkup:
     """
     Клавиатура подтверждения действия.
@@ -343,6 +386,7 @@ def confirmation_keyboard(action: str, item_id: int) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=32)
 def back_button(callback_data: str = "back_to_main") -> InlineKeyboardMarkup:
     """
     Простая клавиатура с кнопкой "Назад".
@@ -370,72 +414,56 @@ def url_button(text: str, url: str) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=1)
 def get_subscription_plans_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора тарифных планов"""
-    keyboard = InlineKeyboardBuilder()
-    
-    keyboard.row(
-        InlineKeyboardButton(text="🔹 Базовый - 199₽", callback_data="subscription_basic")
-    )
-    keyboard.row(
-        InlineKeyboardButton(text="💎 Премиум - 499₽", callback_data="subscription_premium")
-    )
-    keyboard.row(
-        InlineKeyboardButton(text="👑 VIP - 999₽", callback_data="subscription_vip")
-    )
-    keyboard.row(
-        InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
-    )
-    
-    return keyboard.as_markup()
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔹 Базовый - 199₽", callback_data="subscription_basic")],
+        [InlineKeyboardButton(text="💎 Премиум - 499₽", callback_data="subscription_premium")],
+        [InlineKeyboardButton(text="👑 VIP - 999₽", callback_data="subscription_vip")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")]
+    ])
+    return keyboard
 
 
-def get_payment_methods_keyboard(available_methods: list, subscription_type: str, price: int) -> InlineKeyboardMarkup:
+def get_payment_methods_keyboard_for_plan(available_methods: list, subscription_type: str, price: int) -> InlineKeyboardMarkup:
     """Клавиатура выбора способов оплаты"""
-    from app.database.models.payment import PaymentMethod
-    
-    keyboard = InlineKeyboardBuilder()
-    
-    # Маппинг методов на кнопки
-    method_buttons = {
-        PaymentMethod.YOOMONEY: ("💳 YooMoney", "yoomoney"),
-        PaymentMethod.TELEGRAM_STARS: ("⭐ Telegram Stars", "stars"),
-        PaymentMethod.SBP: ("📱 СБП", "sbp"),
-        PaymentMethod.BANK_CARD: ("💳 Банковская карта", "card")
-    }
-    
     # Добавляем доступные методы
-    for method in available_methods:
-        if method in method_buttons:
-            text, callback_key = method_buttons[method]
-            callback_data = f"pay_{callback_key}_{subscription_type}_{price}"
-            keyboard.row(
-                InlineKeyboardButton(text=text, callback_data=callback_data)
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=_PLAN_METHOD_BUTTONS[method][0],
+                callback_data=f"pay_{_PLAN_METHOD_BUTTONS[method][1]}_{subscription_type}_{price}"
             )
+        ]
+        for method in available_methods
+        if method in _PLAN_METHOD_BUTTONS
+    ]
     
     # Кнопка "Назад"
-    keyboard.row(
+    keyboard.append([
         InlineKeyboardButton(text="🔙 Назад к тарифам", callback_data="main_menu")
-    )
+    ])
     
-    return keyboard.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=1)
 def get_main_menu_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура главного меню"""
-    keyboard = InlineKeyboardBuilder()
-    
-    keyboard.row(
-        InlineKeyboardButton(text="💳 Оплатить подписку", callback_data="subscription_plans")
-    )
-    keyboard.row(
-        InlineKeyboardButton(text="ℹ️ Информация", callback_data="info"),
-        InlineKeyboardButton(text="🆘 Поддержка", callback_data="support")
-    )
-    
-    return keyboard.as_markup()
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="💳 Оплатить подписку", callback_data="subscription_plans")
+        ],
+        [
+            InlineKeyboardButton(text="ℹ️ Информация", callback_data="info"),
+            InlineKeyboardButton(text="🆘 Поддержка", callback_data="support")
+        ]
+    ])
+    return keyboard
 
 
+@lru_cache(maxsize=2)
 def get_subscription_menu_keyboard(has_subscription: bool = False) -> InlineKeyboardMarkup:
     """
     Клавиатура меню подписок.
@@ -443,22 +471,16 @@ def get_subscription_menu_keyboard(has_subscription: bool = False) -> InlineKeyb
     Args:
         has_subscription: Есть ли у пользователя активная подписка
     """
-    keyboard = []
-    
     if has_subscription:
-        keyboard.append([
-            InlineKeyboardButton(text="📋 Мои подписки", callback_data="my_subscriptions")
-        ])
-        keyboard.append([
-            InlineKeyboardButton(text="🔄 Продлить подписку", callback_data="new_subscription")
-        ])
-        keyboard.append([
-            InlineKeyboardButton(text="📱 Перейти в канал", url="https://t.me/your_channel")
-        ])
+        keyboard = [
+            [InlineKeyboardButton(text="📋 Мои подписки", callback_data="my_subscriptions")],
+            [InlineKeyboardButton(text="🔄 Продлить подписку", callback_data="new_subscription")],
+            [InlineKeyboardButton(text="📱 Перейти в канал", url="https://t.me/your_channel")]
+        ]
     else:
-        keyboard.append([
-            InlineKeyboardButton(text="💳 Оформить подписку", callback_data="new_subscription")
-        ])
+        keyboard = [
+            [InlineKeyboardButton(text="💳 Оформить подписку", callback_data="new_subscription")]
+        ]
     
     keyboard.append([
         InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
@@ -467,31 +489,41 @@ def get_subscription_menu_keyboard(has_subscription: bool = False) -> InlineKeyb
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def get_subscription_plans_keyboard(channel) -> InlineKeyboardMarkup:
+def get_channel_subscription_plans_keyboard(channel) -> InlineKeyboardMarkup:
     """
     Клавиатура планов подписки для канала.
     
     Args:
         channel: Объект канала с ценами
     """
+    # Клавиатура зависит только от цен, поэтому кэшируется по ним, а не по объекту канала
+    return _channel_subscription_plans_keyboard(channel.monthly_price, channel.yearly_price)
+
+
+@lru_cache(maxsize=64)
+def _channel_subscription_plans_keyboard(
+    monthly_price: Optional[int],
+    yearly_price: Optional[int]
+) -> InlineKeyboardMarkup:
+    """Построение клавиатуры планов подписки по ценам (результат кэшируется)"""
     keyboard = []
     
     # Месячная подписка
-    if channel.monthly_price:
+    if monthly_price:
         keyboard.append([
             InlineKeyboardButton(
-                text=f"📅 Месячная подписка - {channel.monthly_price} ₽",
+                text=f"📅 Месячная подписка - {monthly_price} ₽",
                 callback_data="plan_monthly"
             )
         ])
     
     # Годовая подписка
-    if channel.yearly_price:
+    if yearly_price:
         discount = 0
-        if channel.monthly_price:
-            discount = round((1 - (channel.yearly_price / (channel.monthly_price * 12))) * 100)
+        if monthly_price:
+            discount = round((1 - (yearly_price / (monthly_price * 12))) * 100)
         
-        text = f"📆 Годовая подписка - {channel.yearly_price} ₽"
+        text = f"📆 Годовая подписка - {yearly_price} ₽"
         if discount > 0:
             text += f" (-{discount}%)"
         
@@ -513,24 +545,16 @@ def get_payment_methods_keyboard(available_methods: List[PaymentMethod]) -> Inli
     Args:
         available_methods: Список доступных методов оплаты
     """
-    keyboard = []
-    
-    method_names = {
-        PaymentMethod.YOOMONEY: "💰 YooMoney",
-        PaymentMethod.TELEGRAM_STARS: "⭐ Telegram Stars", 
-        PaymentMethod.SBP: "🚀 СБП",
-        PaymentMethod.BANK_CARD: "💳 Банковская карта",
-        PaymentMethod.CRYPTO: "₿ Криптовалюта"
-    }
-    
-    for method in available_methods:
-        if method in method_names:
-            keyboard.append([
-                InlineKeyboardButton(
-                    text=method_names[method],
-                    callback_data=f"pay_{method.value}"
-                )
-            ])
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=_METHOD_LABELS[method],
+                callback_data=f"pay_{method.value}"
+            )
+        ]
+        for method in available_methods
+        if method in _METHOD_LABELS
+    ]
     
     keyboard.append([
         InlineKeyboardButton(text="⬅️ Назад", callback_data="subscription_menu")
@@ -546,15 +570,15 @@ def get_channels_list_keyboard(channels: list) -> InlineKeyboardMarkup:
     Args:
         channels: Список каналов
     """
-    keyboard = []
-    
-    for channel in channels:
-        keyboard.append([
+    keyboard = [
+        [
             InlineKeyboardButton(
                 text=f"📺 {channel.title}",
                 callback_data=f"select_channel_{channel.id}"
             )
-        ])
+        ]
+        for channel in channels
+    ]
     
     keyboard.append([
         InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")
@@ -563,6 +587,7 @@ def get_channels_list_keyboard(channels: list) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=1)
 def get_admin_subscription_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура администрирования подписок"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -585,6 +610,7 @@ def get_admin_subscription_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=512)
 def get_notification_actions_keyboard(subscription_id: int) -> InlineKeyboardMarkup:
     """
     Клавиатура действий для уведомлений о подписке.
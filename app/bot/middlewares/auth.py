@@ -7,7 +7,7 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery, TelegramObject
 
 from app.config.settings import get_settings
-from app.utils.logger import get_logger, log_user_action
+from app.utils.logger import get_logger, log_in_background, log_user_action
 
 
 class AuthMiddleware(BaseMiddleware):
@@ -94,7 +94,8 @@ class AuthMiddleware(BaseMiddleware):
         # TODO: Реализовать работу с базой данных
         # Пока возвращаем базовые данные
         
-        log_user_action(
+        log_in_background(
+            log_user_action,
             user_id=user.id,
             action="middleware_auth",
             username=user.username,
@@ -167,7 +168,8 @@ class AdminMiddleware(BaseMiddleware):
         else:
             command = "unknown"
         
-        log_user_action(
+        log_in_background(
+            log_user_action,
             user_id=user.id,
             action="admin_action",
             command=command,
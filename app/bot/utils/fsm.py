@@ -0,0 +1,39 @@
+"""
+Вспомогательные функции для работы с FSM в PaidSubscribeBot.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+
+
+async def set_state_and_data(
+    state: FSMContext,
+    new_state: Optional[State],
+    current_data: Optional[Dict[str, Any]] = None,
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Переход в новое состояние с обновлением данных.
+    
+    В отличие от пары update_data() + set_state() не перечитывает данные,
+    если они уже получены обработчиком, а запись состояния и данных
+    отправляет в хранилище одновременно.
+    
+    Args:
+        state: Контекст FSM
+        new_state: Новое состояние
+        current_data: Уже полученные данные состояния (если не указаны, читаются из хранилища)
+        **kwargs: Обновляемые значения
+    
+    Returns:
+        Dict[str, Any]: Новые данные состояния
+    """
+    if current_data is None:
+        current_data = await state.get_data()
+    
+    data = {**current_data, **kwargs}
+    await asyncio.gather(state.set_data(data), state.set_state(new_state))
+    return data
@@ -0,0 +1,43 @@
+"""
+Файлы для отправки в Telegram из файловых объектов.
+Позволяют загружать экспорты и бэкапы частями, не собирая их в один bytes.
+"""
+
+import os
+from typing import AsyncGenerator, BinaryIO
+
+from aiogram import Bot
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+
+class StreamInputFile(InputFile):
+    """
+    Файл для загрузки из открытого бинарного файлового объекта.
+    
+    Подходит для tempfile.SpooledTemporaryFile: пока данные помещаются
+    в память, они читаются из буфера, после переполнения - с диска.
+    Файл читается с текущей позиции блоками по chunk_size байт.
+    """
+    
+    def __init__(self, file: BinaryIO, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            file: Бинарный файловый объект
+            filename: Имя файла для Telegram
+            chunk_size: Размер блока при загрузке
+        """
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+    
+    @property
+    def size(self) -> int:
+        """Размер файла в байтах (позиция чтения не меняется)"""
+        position = self.file.tell()
+        self.file.seek(0, os.SEEK_END)
+        size = self.file.tell()
+        self.file.seek(position)
+        return size
+    
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
@@ -0,0 +1,102 @@
+"""
+Кэш последних отправленных клавиатур для PaidSubscribeBot.
+Позволяет не вызывать edit_reply_markup/edit_text, если сообщение не изменилось.
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup, Message
+
+
+class MarkupCache:
+    """
+    LRU-кэш хэшей клавиатур, показанных в сообщениях.
+    
+    Ключом служит пара (chat_id, message_id), значением - хэш
+    сериализованной клавиатуры (или текста вместе с клавиатурой).
+    Размер кэша ограничен capacity записями.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: Максимальное количество сообщений в кэше
+        """
+        self.capacity = capacity
+        self._hashes: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+    
+    @staticmethod
+    def _hash(markup: Optional[InlineKeyboardMarkup]) -> int:
+        """Хэш клавиатуры по ее JSON-представлению"""
+        if markup is None:
+            return hash(None)
+        return hash(markup.model_dump_json())
+    
+    def is_changed(
+        self,
+        chat_id: int,
+        message_id: int,
+        markup: Optional[InlineKeyboardMarkup]
+    ) -> bool:
+        """
+        Проверка, отличается ли клавиатура от последней показанной.
+        
+        Если клавиатура изменилась, новый хэш сохраняется в кэш.
+        
+        Args:
+            chat_id: ID чата
+            message_id: ID сообщения
+            markup: Новая клавиатура
+        
+        Returns:
+            bool: True если клавиатуру нужно отправить в Telegram
+        """
+        return self._update((chat_id, message_id), self._hash(markup))
+    
+    def is_message_changed(
+        self,
+        message: Message,
+        text: str,
+        markup: Optional[InlineKeyboardMarkup]
+    ) -> bool:
+        """
+        Проверка, отличается ли новый текст с клавиатурой от показанных.
+        
+        Если текущая клавиатура сообщения не совпадает с новой, сообщение
+        показывает другой экран (например, его отредактировал другой
+        обработчик) и считается измененным независимо от кэша.
+        
+        Args:
+            message: Сообщение, которое планируется отредактировать
+            text: Новый текст
+            markup: Новая клавиатура
+        
+        Returns:
+            bool: True если сообщение нужно отредактировать в Telegram
+        """
+        key = (message.chat.id, message.message_id)
+        markup_hash = self._hash(markup)
+        content_hash = hash((text, markup_hash))
+        
+        if self._hash(message.reply_markup) != markup_hash:
+            self._hashes.pop(key, None)
+        
+        return self._update(key, content_hash)
+    
+    def _update(self, key: Tuple[int, int], value_hash: int) -> bool:
+        """Сравнение хэша с сохраненным и сохранение нового значения"""
+        if self._hashes.get(key) == value_hash:
+            self._hashes.move_to_end(key)
+            return False
+        
+        self._hashes[key] = value_hash
+        self._hashes.move_to_end(key)
+        if len(self._hashes) > self.capacity:
+            self._hashes.popitem(last=False)
+        
+        return True
+
+
+# Глобальный кэш клавиатур
+markup_cache = MarkupCache()
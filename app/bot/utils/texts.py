@@ -3,7 +3,8 @@
 Содержит все тексты, которые отправляет бот пользователям.
 """
 
-from typing import Dict, Any
+import string
+from typing import Dict, Any, Callable
 from datetime import datetime
 
 
@@ -223,6 +224,39 @@ class Messages:
 
 <b>📈 Конверсия:</b>
 • Подписка → Оплата: {conversion_rate}%
+"""
+    
+    ADMIN_PANEL_WELCOME = """
+👑 <b>Панель администратора</b>
+
+Добро пожаловать в административную панель!
+Здесь вы можете управлять системой, просматривать статистику и настраивать бота.
+"""
+    
+    ADMIN_USER_CARD = """
+👤 <b>Пользователь найден</b>
+
+<b>Имя:</b> {first_name}
+<b>Username:</b> @{username}
+<b>ID:</b> <code>{telegram_id}</code>
+<b>Язык:</b> {language_code}
+<b>Регистрация:</b> {created_at}
+<b>Последняя активность:</b> {last_activity}
+<b>Статус:</b> {status}
+<b>Заблокирован:</b> {banned}
+
+<b>Подписки:</b> {subscriptions_count}
+"""
+    
+    ADMIN_BROADCAST_CONFIRM = """
+📢 <b>Подтверждение рассылки</b>
+
+<b>Получателей:</b> {users_count}
+<b>Сообщение:</b>
+
+{preview}
+
+Подтвердите отправку:
 """
     
     # Ошибки
@@ -367,6 +401,39 @@ def format_payment_method(method: str) -> str:
     return method_map.get(method, method)
 
 
+def compile_template(template: str) -> Callable[[Dict[str, Any]], str]:
+    """
+    Предварительный разбор шаблона str.format.
+    
+    Шаблон разбирается один раз, а возвращаемая функция только
+    подставляет значения, не разбирая строку формата при каждом вызове.
+    Поддерживаются простые имена полей со спецификаторами формата.
+    
+    Args:
+        template: Шаблон в синтаксисе str.format
+        
+    Returns:
+        Callable[[Dict[str, Any]], str]: Функция рендеринга по словарю значений
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (not field.isidentifier() or conversion):
+            raise ValueError(f"Неподдерживаемое поле шаблона: {field!r}")
+        parts.append((literal, field, spec))
+    parts = tuple(parts)
+    
+    def render(values: Dict[str, Any]) -> str:
+        chunks = []
+        for literal, field, spec in parts:
+            chunks.append(literal)
+            if field is not None:
+                value = values[field]
+                chunks.append(format(value, spec) if spec else str(value))
+        return "".join(chunks)
+    
+    return render
+
+
 # Тексты для платежей
 SUBSCRIPTION_PLANS_TEXT = """
 💎 **Выберите тарифный план:**
@@ -514,16 +581,17 @@ def format_channel_info(channel) -> str:
     
     return text
 
+# Иконки статусов платежа (собираются один раз при импорте)
+_PAYMENT_STATUS_ICONS = {
+    "pending": "⏳",
+    "completed": "✅", 
+    "failed": "❌",
+    "cancelled": "🚫"
+}
+
 def format_payment_info(payment) -> str:
     """Форматирование информации о платеже"""
-    status_icons = {
-        "pending": "⏳",
-        "completed": "✅", 
-        "failed": "❌",
-        "cancelled": "🚫"
-    }
-    
-    icon = status_icons.get(payment.status, "❓")
+    icon = _PAYMENT_STATUS_ICONS.get(payment.status, "❓")
     
     return f"""
 💳 <b>Платеж #{payment.external_id}</b>
@@ -7,6 +7,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex
 from typing import AsyncGenerator
 
 from app.config.settings import get_settings
@@ -131,6 +132,22 @@ async def init_database():
         
         # Создаем все таблицы
         await conn.run_sync(Base.metadata.create_all)
+        
+        # create_all пропускает существующие таблицы вместе с их индексами,
+        # поэтому индексы, добавленные в модели позже, создаются отдельно
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _create_missing_indexes(connection) -> None:
+    """
+    Создание индексов моделей, которых еще нет в базе данных.
+    
+    Args:
+        connection: Синхронное соединение с базой данных
+    """
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
 
 
 async def close_database():
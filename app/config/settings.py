@@ -4,9 +4,10 @@
 """
 
 import os
-from typing import List, Optional
+from functools import lru_cache
+from typing import FrozenSet, Optional
 from pydantic_settings import BaseSettings
-from pydantic import field_validator
+from pydantic import PrivateAttr, field_validator
 from pathlib import Path
 
 
@@ -16,6 +17,7 @@ class Settings(BaseSettings):
     # Telegram Bot Configuration
     telegram_bot_token: str
     telegram_channel_id: str
+    # Строка вида "123,456"; множество ID доступно через admin_ids
     telegram_admin_ids: str
     
     # Database Configuration
@@ -86,13 +88,23 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
         case_sensitive = False
         
+    # Множество ID администраторов, разобранное один раз при создании настроек
+    _admin_ids: FrozenSet[int] = PrivateAttr(default=frozenset())
+    
     @field_validator("telegram_admin_ids")
-    def parse_admin_ids(cls, v):
-        """Парсинг ID администраторов из строки в список"""
-        if isinstance(v, str):
-            return [int(admin_id.strip()) for admin_id in v.split(",") if admin_id.strip()]
+    def validate_admin_ids(cls, v):
+        """Проверка, что ID администраторов - целые числа через запятую"""
+        for admin_id in v.split(","):
+            if admin_id.strip() and not admin_id.strip().lstrip("-").isdigit():
+                raise ValueError(f"Некорректный ID администратора: {admin_id.strip()}")
         return v
     
+    def model_post_init(self, __context) -> None:
+        """Разбор ID администраторов из строки в множество"""
+        self._admin_ids = frozenset(
+            int(admin_id.strip()) for admin_id in self.telegram_admin_ids.split(",") if admin_id.strip()
+        )
+    
     @field_validator("encrypt_key")
     def validate_encrypt_key(cls, v):
         """Проверка длины ключа шифрования"""
@@ -108,11 +120,9 @@ class Settings(BaseSettings):
         return v
     
     @property
-    def admin_ids(self) -> List[int]:
-        """Получение списка ID администраторов"""
-        if isinstance(self.telegram_admin_ids, list):
-            return self.telegram_admin_ids
-        return [int(admin_id.strip()) for admin_id in self.telegram_admin_ids.split(",") if admin_id.strip()]
+    def admin_ids(self) -> FrozenSet[int]:
+        """Множество ID администраторов (проверка вхождения за O(1))"""
+        return self._admin_ids
     
     @property
     def webhook_url(self) -> Optional[str]:
@@ -148,13 +158,7 @@ class Settings(BaseSettings):
         return prices.get(duration, self.subscription_price_monthly)
 
 
-# Создание глобального экземпляра настроек
-_settings = None
-
-
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Получение настроек приложения"""
-    global _settings
-    if _settings is None:
-        _settings = Settings()
-    return _settings 
\ No newline at end of file
+    """Получение настроек приложения (экземпляр создается один раз)"""
+    return Settings() 
\ No newline at end of file
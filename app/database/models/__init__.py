@@ -7,7 +7,7 @@ from app.database.models.user import User
 from app.database.models.subscription import Subscription, SubscriptionStatus, SubscriptionDuration
 from app.database.models.payment import Payment, PaymentStatus, PaymentMethod
 from app.database.models.channel import Channel
-from app.database.models.referral import Referral, ReferralSettings
+from app.database.models.referral import Referral, ReferralCode, ReferralSettings
 from app.database.models.promo import PromoCode, PromoCodeUsage, PromoCodeSettings, PromoCodeType
 from app.database.models.notification import (
     Notification, NotificationTemplate, NotificationSettings, BroadcastCampaign,
@@ -24,6 +24,7 @@ __all__ = [
     "PaymentMethod",
     "Channel",
     "Referral",
+    "ReferralCode",
     "ReferralSettings",
     "PromoCode",
     "PromoCodeUsage", 
@@ -6,7 +6,7 @@
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Numeric, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Numeric, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.config.database import Base
@@ -84,6 +84,11 @@ class Payment(Base):
     failure_reason = Column(String(500), nullable=True)
     webhook_data = Column(Text, nullable=True)  # Данные от webhook'а
     
+    __table_args__ = (
+        # Выборки за период и суммы выручки читаются из индекса без обращения к таблице
+        Index("ix_payments_created_at_status_amount", created_at, status, amount),
+    )
+    
     # Связи с другими таблицами
     user = relationship("User", back_populates="payments")
     subscription = relationship("Subscription", back_populates="payment")
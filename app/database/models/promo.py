@@ -103,6 +103,14 @@ class PromoCode(Base):
             return None
         return max(0, self.max_uses - self.current_uses)
 
+    @property
+    def discount_text(self) -> str:
+        """Размер скидки для отображения (проценты или рубли)"""
+        if self.type == PromoCodeType.PERCENTAGE:
+            # normalize() убирает незначащие нули: 10.00 -> 10, 12.50 -> 12.5
+            return f"{self.value.normalize():f}%"
+        return f"{self.value:.2f} ₽"
+
     def calculate_discount(self, amount: Decimal) -> Decimal:
         """
         Рассчитывает размер скидки для указанной суммы.
@@ -83,6 +83,23 @@ class Referral(Base):
         self.status = "rewarded"
 
 
+class ReferralCode(Base):
+    """Реферальный код пользователя (код из ссылки ref_<код>)"""
+    __tablename__ = "referral_codes"
+    
+    # Код (первичный ключ - уникальный индекс для поиска при /start)
+    code: Mapped[str] = Column(String(50), primary_key=True)
+    
+    # Владелец кода (реферер) - у пользователя ровно один код
+    referrer_id: Mapped[int] = Column(Integer, ForeignKey("users.telegram_id"), nullable=False, unique=True)
+    
+    # Дата создания кода
+    created_at: Mapped[datetime] = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ReferralCode(code={self.code}, referrer_id={self.referrer_id})>"
+
+
 class ReferralSettings(Base):
     """Настройки реферальной системы"""
     __tablename__ = "referral_settings"
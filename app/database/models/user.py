@@ -4,7 +4,7 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index, func
 from sqlalchemy.orm import relationship
 
 from app.config.database import Base
@@ -44,7 +44,7 @@ class User(Base):
     is_banned = Column(Boolean, default=False)
     
     # Временные метки
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_activity_at = Column(DateTime, default=datetime.utcnow)
     
@@ -54,6 +54,11 @@ class User(Base):
     # Дополнительная информация
     notes = Column(Text, nullable=True)
     
+    __table_args__ = (
+        # Индекс для поиска по username без учета регистра
+        Index("ix_users_username_lower", func.lower(username)),
+    )
+    
     # Связи с другими таблицами
     subscriptions = relationship(
         "Subscription", 
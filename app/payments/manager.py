@@ -3,7 +3,8 @@
 Управляет всеми платежными провайдерами и обеспечивает единый интерфейс.
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+from types import MappingProxyType
+from typing import Dict, Optional, Any, Tuple, Mapping, FrozenSet
 from decimal import Decimal
 
 from app.payments.base import (
@@ -42,6 +43,14 @@ class PaymentManager:
         self.settings = get_settings()
         self._providers: Dict[PaymentMethod, BasePaymentProvider] = {}
         self._initialize_providers()
+        
+        # Набор провайдеров не меняется после инициализации,
+        # поэтому производные коллекции вычисляются один раз
+        self.providers_by_method: Mapping[PaymentMethod, BasePaymentProvider] = MappingProxyType(self._providers)
+        self._available_methods: Tuple[PaymentMethod, ...] = tuple(self._providers)
+        self._enabled_methods: FrozenSet[PaymentMethod] = frozenset(
+            method for method, provider in self._providers.items() if provider.is_enabled
+        )
     
     def _initialize_providers(self):
         """Инициализация всех доступных платежных провайдеров"""
@@ -114,14 +123,14 @@ class PaymentManager:
             # Для тестирования не выбрасываем исключение
             self.logger.warning("Продолжаем работу без платежных провайдеров")
     
-    def get_available_methods(self) -> List[PaymentMethod]:
+    def get_available_methods(self) -> Tuple[PaymentMethod, ...]:
         """
         Получение списка доступных методов оплаты.
         
         Returns:
-            List[PaymentMethod]: Список доступных методов
+            Tuple[PaymentMethod, ...]: Доступные методы в порядке инициализации
         """
-        return list(self._providers.keys())
+        return self._available_methods
     
     def get_provider(self, method: PaymentMethod) -> Optional[BasePaymentProvider]:
         """
@@ -145,8 +154,7 @@ class PaymentManager:
         Returns:
             bool: True если метод доступен
         """
-        provider = self._providers.get(method)
-        return provider is not None and provider.is_enabled
+        return method in self._enabled_methods
     
     async def create_payment(self, method: PaymentMethod, request: PaymentRequest) -> PaymentResponse:
         """
@@ -16,9 +16,22 @@ from app.database.models.user import User
 from app.database.models.subscription import Subscription
 from app.config.database import AsyncSessionLocal
 from app.config.settings import get_settings
+from app.utils.cache import TTLCache
 from app.utils.logger import get_logger
 
 
+# Кэш каналов: данные читаются на каждом шаге оформления подписки, а меняются редко
+CHANNEL_CACHE_TTL = 30
+_channel_cache = TTLCache(ttl=CHANNEL_CACHE_TTL, maxsize=256)
+_channel_list_cache = TTLCache(ttl=CHANNEL_CACHE_TTL, maxsize=2)
+
+
+def _invalidate_channel_caches() -> None:
+    """Сброс кэшей после изменения каналов"""
+    _channel_cache.invalidate()
+    _channel_list_cache.invalidate()
+
+
 class ChannelService:
     """
     Сервис для работы с каналами.
@@ -45,6 +58,12 @@ class ChannelService:
         Returns:
             Optional[Channel]: Канал или None
         """
+        return await _channel_cache.get_or_set(
+            channel_id, lambda: self._load_channel_by_id(channel_id)
+        )
+    
+    async def _load_channel_by_id(self, channel_id: int) -> Optional[Channel]:
+        """Чтение канала по ID из базы данных"""
         async with AsyncSessionLocal() as session:
             stmt = select(Channel).where(Channel.id == channel_id)
             result = await session.execute(stmt)
@@ -113,6 +132,7 @@ class ChannelService:
             session.add(channel)
             await session.commit()
             await session.refresh(channel)
+            _invalidate_channel_caches()
             
             self.logger.info(
                 "Создан новый канал",
@@ -181,6 +201,7 @@ class ChannelService:
             if updated:
                 channel.updated_at = datetime.utcnow()
                 await session.commit()
+                _invalidate_channel_caches()
                 
                 self.logger.info(
                     "Канал обновлен",
@@ -381,6 +402,12 @@ class ChannelService:
         Returns:
             List[Channel]: Список каналов
         """
+        return await _channel_list_cache.get_or_set(
+            active_only, lambda: self._load_all_channels(active_only)
+        )
+    
+    async def _load_all_channels(self, active_only: bool) -> List[Channel]:
+        """Чтение списка каналов из базы данных"""
         async with AsyncSessionLocal() as session:
             stmt = select(Channel)
             
@@ -413,6 +440,7 @@ class ChannelService:
             )
             result = await session.execute(stmt)
             await session.commit()
+            _invalidate_channel_caches()
             
             if result.rowcount > 0:
                 self.logger.info("Канал деактивирован", channel_id=channel_id)
@@ -472,4 +500,8 @@ class ChannelService:
                 "yearly_price": channel.yearly_price,
                 "is_active": channel.is_active,
                 "created_at": channel.created_at.isoformat() if channel.created_at else None
-            } 
\ No newline at end of file
+            }
+
+
+# Глобальный экземпляр сервиса каналов
+channel_service = ChannelService()
@@ -1,12 +1,15 @@
 import asyncio
+import codecs
 import csv
-import json
 import logging
+import shutil
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, Any
-from io import StringIO, BytesIO
+from decimal import Decimal
+from typing import Dict, List, Optional, Union, Any, BinaryIO, Callable, Iterable, Iterator, Tuple
+from tempfile import SpooledTemporaryFile
 import zipfile
 
+import orjson
 from sqlalchemy import select, and_, or_, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -16,13 +19,104 @@ from app.config.database import AsyncSessionLocal
 from app.utils.logger import get_logger
 
 try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
 except ImportError:
-    PANDAS_AVAILABLE = False
+    XLSXWRITER_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 logger = get_logger(__name__)
 
+# Порог, после которого файл экспорта переносится из памяти на диск
+EXPORT_SPOOL_MAX_SIZE = 8 << 20
+
+# Уровень сжатия deflate для бэкапов: JSON сжимается в разы уже на
+# среднем уровне, а более высокие заметно медленнее при малом выигрыше
+BACKUP_COMPRESSLEVEL = 6
+
+def _json_default(value: Any) -> Any:
+    """Сериализация типов, которые orjson не поддерживает сам (Decimal и др.)"""
+    return str(value)
+
+def _isoformat_column(values: Iterable[Optional[datetime]]) -> List[Optional[str]]:
+    """Преобразование колонки дат в ISO-строки"""
+    return [value.isoformat() if value else None for value in values]
+
+class ExportTable:
+    """
+    Табличные данные экспорта в колоночном виде
+    
+    Каждая колонка - список значений одного поля. Преобразования значений
+    выполняются один раз для всей колонки, а форматы записи (CSV, Excel,
+    Parquet) получают строки через zip без промежуточных словарей.
+    """
+    
+    def __init__(self, columns: Dict[str, List[Any]]):
+        """
+        Args:
+            columns: Названия колонок и их значения (списки одной длины)
+        """
+        self.columns = columns
+    
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "ExportTable":
+        """
+        Создание таблицы из списка строк-словарей
+        
+        Args:
+            records: Строки таблицы
+            
+        Returns:
+            Таблица с колонками из ключей первой строки
+        """
+        fieldnames = list(records[0].keys()) if records else []
+        return cls({name: [record.get(name) for record in records] for name in fieldnames})
+    
+    @property
+    def fieldnames(self) -> List[str]:
+        """Названия колонок"""
+        return list(self.columns)
+    
+    def rows(self) -> Iterator[Tuple]:
+        """Строки таблицы в виде кортежей"""
+        return zip(*self.columns.values())
+    
+    def records(self) -> List[Dict]:
+        """Строки таблицы в виде словарей"""
+        fieldnames = self.fieldnames
+        return [dict(zip(fieldnames, row)) for row in self.rows()]
+    
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+
+# Таблицы и столбцы времени изменения, по которым определяется версия
+# данных экспорта. Экспорт пользователей не кэшируется: он читает рефералов,
+# у которых нет времени изменения, и смена их статуса не была бы замечена
+_EXPORT_VERSION_SOURCES = {
+    "subscriptions": (
+        (Subscription, Subscription.updated_at),
+        (User, User.updated_at),
+        (Channel, Channel.updated_at),
+        (Payment, Payment.updated_at),
+    ),
+    "payments": (
+        (Payment, Payment.updated_at),
+        (User, User.updated_at),
+        (Subscription, Subscription.updated_at),
+        # Из промокода в экспорт попадает только неизменяемый код
+        (PromoCode, PromoCode.created_at),
+    ),
+}
+
+
 class ExportService:
     """Сервис для экспорта данных в различных форматах"""
     
@@ -35,18 +129,18 @@ class ExportService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         include_inactive: bool = True
-    ) -> Union[str, bytes]:
+    ) -> BinaryIO:
         """
         Экспорт пользователей
         
         Args:
-            format_type: Формат экспорта (csv, json, excel)
+            format_type: Формат экспорта (csv, json, excel, parquet, feather)
             start_date: Начальная дата для фильтрации
             end_date: Конечная дата для фильтрации
             include_inactive: Включать неактивных пользователей
             
         Returns:
-            Экспортированные данные в указанном формате
+            Файл с данными в указанном формате (позиция в начале)
         """
         async with AsyncSessionLocal() as session:
             query = select(User).options(
@@ -67,34 +161,46 @@ class ExportService:
             result = await session.execute(query)
             users = result.scalars().all()
             
-            # Подготавливаем данные для экспорта
-            export_data = []
-            for user in users:
-                active_subscription = next(
-                    (sub for sub in user.subscriptions if sub.is_active), None
-                )
-                
-                user_data = {
-                    "id": user.id,
-                    "telegram_id": user.telegram_id,
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "is_active": user.is_active,
-                    "is_admin": user.is_admin,
-                    "created_at": user.created_at.isoformat() if user.created_at else None,
-                    "last_activity": user.last_activity.isoformat() if user.last_activity else None,
-                    "total_payments": len(user.payments),
-                    "total_spent": sum(p.amount for p in user.payments if p.status == "completed"),
-                    "active_subscription": active_subscription.channel.name if active_subscription and active_subscription.channel else None,
-                    "subscription_expires": active_subscription.expires_at.isoformat() if active_subscription and active_subscription.expires_at else None,
-                    "referrals_created": len(user.referral_codes_created),
-                    "referrals_used": len([r for r in user.referral_codes_created if r.used_count > 0]),
-                    "referral_earnings": sum(r.earnings for r in user.referral_codes_created)
-                }
-                export_data.append(user_data)
+            # Подготавливаем данные для экспорта по колонкам
+            active_subscriptions = [
+                next((sub for sub in user.subscriptions if sub.is_active), None)
+                for user in users
+            ]
             
-            return await self._format_export_data(export_data, format_type, "users")
+            table = ExportTable({
+                "id": [user.id for user in users],
+                "telegram_id": [user.telegram_id for user in users],
+                "username": [user.username for user in users],
+                "first_name": [user.first_name for user in users],
+                "last_name": [user.last_name for user in users],
+                "is_active": [user.is_active for user in users],
+                "is_admin": [user.is_admin for user in users],
+                "created_at": _isoformat_column(user.created_at for user in users),
+                "last_activity": _isoformat_column(user.last_activity for user in users),
+                "total_payments": [len(user.payments) for user in users],
+                "total_spent": [
+                    sum(p.amount for p in user.payments if p.status == "completed")
+                    for user in users
+                ],
+                "active_subscription": [
+                    sub.channel.name if sub and sub.channel else None
+                    for sub in active_subscriptions
+                ],
+                "subscription_expires": _isoformat_column(
+                    sub.expires_at if sub else None for sub in active_subscriptions
+                ),
+                "referrals_created": [len(user.referral_codes_created) for user in users],
+                "referrals_used": [
+                    len([r for r in user.referral_codes_created if r.used_count > 0])
+                    for user in users
+                ],
+                "referral_earnings": [
+                    sum(r.earnings for r in user.referral_codes_created)
+                    for user in users
+                ]
+            })
+            
+            return await self._export_to_file(table, format_type, "users")
     
     async def export_subscriptions(
         self,
@@ -103,7 +209,7 @@ class ExportService:
         end_date: Optional[datetime] = None,
         channel_id: Optional[int] = None,
         status: Optional[str] = None
-    ) -> Union[str, bytes]:
+    ) -> BinaryIO:
         """
         Экспорт подписок
         
@@ -115,7 +221,7 @@ class ExportService:
             status: Статус подписки (active, expired, cancelled)
             
         Returns:
-            Экспортированные данные
+            Файл с экспортированными данными (позиция в начале)
         """
         async with AsyncSessionLocal() as session:
             query = select(Subscription).options(
@@ -148,29 +254,29 @@ class ExportService:
             result = await session.execute(query)
             subscriptions = result.scalars().all()
             
-            # Подготавливаем данные
-            export_data = []
-            for sub in subscriptions:
-                sub_data = {
-                    "id": sub.id,
-                    "user_id": sub.user_id,
-                    "user_username": sub.user.username if sub.user else None,
-                    "user_name": f"{sub.user.first_name or ''} {sub.user.last_name or ''}".strip() if sub.user else None,
-                    "channel_id": sub.channel_id,
-                    "channel_name": sub.channel.name if sub.channel else None,
-                    "payment_id": sub.payment_id,
-                    "payment_amount": sub.payment.amount if sub.payment else None,
-                    "payment_method": sub.payment.method if sub.payment else None,
-                    "is_active": sub.is_active,
-                    "duration_days": sub.duration_days,
-                    "created_at": sub.created_at.isoformat() if sub.created_at else None,
-                    "expires_at": sub.expires_at.isoformat() if sub.expires_at else None,
-                    "cancelled_at": sub.cancelled_at.isoformat() if sub.cancelled_at else None,
-                    "auto_renewal": sub.auto_renewal
-                }
-                export_data.append(sub_data)
-            
-            return await self._format_export_data(export_data, format_type, "subscriptions")
+            # Подготавливаем данные по колонкам
+            table = ExportTable({
+                "id": [sub.id for sub in subscriptions],
+                "user_id": [sub.user_id for sub in subscriptions],
+                "user_username": [sub.user.username if sub.user else None for sub in subscriptions],
+                "user_name": [
+                    f"{sub.user.first_name or ''} {sub.user.last_name or ''}".strip() if sub.user else None
+                    for sub in subscriptions
+                ],
+                "channel_id": [sub.channel_id for sub in subscriptions],
+                "channel_name": [sub.channel.name if sub.channel else None for sub in subscriptions],
+                "payment_id": [sub.payment_id for sub in subscriptions],
+                "payment_amount": [sub.payment.amount if sub.payment else None for sub in subscriptions],
+                "payment_method": [sub.payment.method if sub.payment else None for sub in subscriptions],
+                "is_active": [sub.is_active for sub in subscriptions],
+                "duration_days": [sub.duration_days for sub in subscriptions],
+                "created_at": _isoformat_column(sub.created_at for sub in subscriptions),
+                "expires_at": _isoformat_column(sub.expires_at for sub in subscriptions),
+                "cancelled_at": _isoformat_column(sub.cancelled_at for sub in subscriptions),
+                "auto_renewal": [sub.auto_renewal for sub in subscriptions]
+            })
+            
+            return await self._export_to_file(table, format_type, "subscriptions")
     
     async def export_payments(
         self,
@@ -179,7 +285,7 @@ class ExportService:
         end_date: Optional[datetime] = None,
         status: Optional[str] = None,
         method: Optional[str] = None
-    ) -> Union[str, bytes]:
+    ) -> BinaryIO:
         """
         Экспорт платежей
         
@@ -191,7 +297,7 @@ class ExportService:
             method: Метод платежа
             
         Returns:
-            Экспортированные данные
+            Файл с экспортированными данными (позиция в начале)
         """
         async with AsyncSessionLocal() as session:
             query = select(Payment).options(
@@ -214,36 +320,36 @@ class ExportService:
             result = await session.execute(query)
             payments = result.scalars().all()
             
-            # Подготавливаем данные
-            export_data = []
-            for payment in payments:
-                payment_data = {
-                    "id": payment.id,
-                    "user_id": payment.user_id,
-                    "user_username": payment.user.username if payment.user else None,
-                    "subscription_id": payment.subscription_id,
-                    "amount": float(payment.amount),
-                    "currency": payment.currency,
-                    "method": payment.method,
-                    "status": payment.status,
-                    "provider_payment_id": payment.provider_payment_id,
-                    "promo_code": payment.promo_code.code if payment.promo_code else None,
-                    "discount_amount": float(payment.discount_amount) if payment.discount_amount else 0,
-                    "created_at": payment.created_at.isoformat() if payment.created_at else None,
-                    "updated_at": payment.updated_at.isoformat() if payment.updated_at else None,
-                    "completed_at": payment.completed_at.isoformat() if payment.completed_at else None,
-                    "error_message": payment.error_message
-                }
-                export_data.append(payment_data)
-            
-            return await self._format_export_data(export_data, format_type, "payments")
+            # Подготавливаем данные по колонкам
+            table = ExportTable({
+                "id": [payment.id for payment in payments],
+                "user_id": [payment.user_id for payment in payments],
+                "user_username": [payment.user.username if payment.user else None for payment in payments],
+                "subscription_id": [payment.subscription_id for payment in payments],
+                "amount": [float(payment.amount) for payment in payments],
+                "currency": [payment.currency for payment in payments],
+                "method": [payment.method for payment in payments],
+                "status": [payment.status for payment in payments],
+                "provider_payment_id": [payment.provider_payment_id for payment in payments],
+                "promo_code": [payment.promo_code.code if payment.promo_code else None for payment in payments],
+                "discount_amount": [
+                    float(payment.discount_amount) if payment.discount_amount else 0
+                    for payment in payments
+                ],
+                "created_at": _isoformat_column(payment.created_at for payment in payments),
+                "updated_at": _isoformat_column(payment.updated_at for payment in payments),
+                "completed_at": _isoformat_column(payment.completed_at for payment in payments),
+                "error_message": [payment.error_message for payment in payments]
+            })
+            
+            return await self._export_to_file(table, format_type, "payments")
     
     async def export_analytics(
         self,
         format_type: str = "json",
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
-    ) -> Union[str, bytes]:
+    ) -> BinaryIO:
         """
         Экспорт аналитики
         
@@ -253,7 +359,7 @@ class ExportService:
             end_date: Конечная дата
             
         Returns:
-            Экспортированные данные аналитики
+            Файл с данными аналитики (позиция в начале)
         """
         if not start_date:
             start_date = datetime.utcnow() - timedelta(days=30)
@@ -361,112 +467,264 @@ class ExportService:
                 "generated_at": datetime.utcnow().isoformat()
             }
             
-            return await self._format_export_data(analytics_data, format_type, "analytics")
+            return await self._export_to_file(analytics_data, format_type, "analytics")
     
-    async def create_full_backup(self) -> bytes:
+    async def get_data_version(self, export_type: str) -> Optional[Tuple]:
+        """
+        Версия данных для экспорта указанного типа
+        
+        Версия меняется при добавлении, изменении или удалении записей
+        во всех таблицах, из которых читает экспорт, поэтому по ней можно
+        понять, актуален ли ранее созданный экспорт.
+        
+        Args:
+            export_type: Тип экспорта (subscriptions, payments)
+            
+        Returns:
+            Количество записей и время последнего изменения по каждой
+            таблице или None, если для типа экспорта версия не отслеживается
+        """
+        sources = _EXPORT_VERSION_SOURCES.get(export_type)
+        if sources is None:
+            return None
+        
+        # Одна выборка из скалярных подзапросов вместо запроса на каждую таблицу
+        columns = []
+        for model, changed_at in sources:
+            columns.append(select(func.count()).select_from(model).scalar_subquery())
+            columns.append(select(func.max(changed_at)).scalar_subquery())
+        
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(*columns))
+            return tuple(result.one())
+    
+    async def create_full_backup(self, output: Optional[BinaryIO] = None) -> BinaryIO:
         """
         Создание полного бэкапа всех данных в ZIP архиве
         
+        Args:
+            output: Файл для записи архива (по умолчанию временный файл)
+        
         Returns:
-            ZIP архив с данными
+            Файл с ZIP архивом (позиция в начале)
         """
-        zip_buffer = BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Экспортируем пользователей
-            users_data = await self.export_users("json")
-            zip_file.writestr("users.json", users_data)
-            
-            # Экспортируем подписки
-            subscriptions_data = await self.export_subscriptions("json")
-            zip_file.writestr("subscriptions.json", subscriptions_data)
-            
-            # Экспортируем платежи
-            payments_data = await self.export_payments("json")
-            zip_file.writestr("payments.json", payments_data)
-            
-            # Экспортируем аналитику
-            analytics_data = await self.export_analytics("json")
-            zip_file.writestr("analytics.json", analytics_data)
-            
-            # Добавляем метаданные
-            metadata = {
-                "backup_created_at": datetime.utcnow().isoformat(),
-                "version": "1.0",
-                "description": "Полный бэкап данных PaidBot"
-            }
-            zip_file.writestr("metadata.json", json.dumps(metadata, indent=2, ensure_ascii=False))
+        if output is None:
+            output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, mode="w+b")
         
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
+        entries = {
+            "users.json": await self.export_users("json"),
+            "subscriptions.json": await self.export_subscriptions("json"),
+            "payments.json": await self.export_payments("json"),
+            "analytics.json": await self.export_analytics("json")
+        }
+        
+        # Сжатие выполняется в пуле потоков, чтобы не блокировать event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_backup_archive, entries, output)
+        
+        output.seek(0)
+        return output
     
-    async def _format_export_data(
+    def _write_backup_archive(self, entries: Dict[str, BinaryIO], output: BinaryIO) -> None:
+        """
+        Запись файлов экспорта в ZIP архив
+        
+        Args:
+            entries: Имена файлов в архиве и файлы с их содержимым
+            output: Файл для записи архива
+        """
+        try:
+            with zipfile.ZipFile(
+                output, 'w', zipfile.ZIP_DEFLATED, compresslevel=BACKUP_COMPRESSLEVEL
+            ) as zip_file:
+                for name, source in entries.items():
+                    with zip_file.open(name, 'w') as entry:
+                        shutil.copyfileobj(source, entry)
+                
+                # Добавляем метаданные
+                metadata = {
+                    "backup_created_at": datetime.utcnow().isoformat(),
+                    "version": "1.0",
+                    "description": "Полный бэкап данных PaidBot"
+                }
+                zip_file.writestr("metadata.json", orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        finally:
+            for source in entries.values():
+                source.close()
+    
+    async def _export_to_file(
         self,
-        data: Union[List[Dict], Dict],
+        data: Union[ExportTable, Dict],
         format_type: str,
         data_type: str
-    ) -> Union[str, bytes]:
+    ) -> BinaryIO:
         """
-        Форматирование данных в указанный формат
+        Запись данных во временный файл в указанном формате
+        
+        Файл хранится в памяти до EXPORT_SPOOL_MAX_SIZE байт, затем
+        переносится на диск. Сериализация выполняется в пуле потоков.
         
         Args:
             data: Данные для экспорта
-            format_type: Тип формата (csv, json, excel)
-            data_type: Тип данных (для названия файла)
+            format_type: Тип формата (csv, json, excel, parquet, feather)
+            data_type: Тип данных (для названия листа)
             
         Returns:
-            Отформатированные данные
+            Файл с данными (позиция в начале)
+        """
+        output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, mode="w+b")
+        
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self._write_export_data, data, format_type, data_type, output
+            )
+        except Exception:
+            output.close()
+            raise
+        
+        output.seek(0)
+        return output
+    
+    def _write_export_data(
+        self,
+        data: Union[ExportTable, Dict],
+        format_type: str,
+        data_type: str,
+        output: BinaryIO
+    ) -> None:
+        """
+        Запись данных в файл в указанном формате
+        
+        Args:
+            data: Данные для экспорта
+            format_type: Тип формата (csv, json, excel, parquet, feather)
+            data_type: Тип данных (для названия листа)
+            output: Бинарный файл для записи
         """
         if format_type.lower() == "json":
-            return json.dumps(data, indent=2, ensure_ascii=False, default=str)
+            if isinstance(data, ExportTable):
+                data = data.records()
+            
+            # orjson сразу возвращает UTF-8 bytes без промежуточной строки
+            output.write(orjson.dumps(data, default=_json_default, option=orjson.OPT_INDENT_2))
         
         elif format_type.lower() == "csv":
             if isinstance(data, dict):
-                # Для аналитики преобразуем в плоскую структуру
-                flat_data = []
-                for key, value in data.items():
-                    if isinstance(value, dict):
-                        for sub_key, sub_value in value.items():
-                            flat_data.append({
-                                "category": key,
-                                "metric": sub_key,
-                                "value": sub_value
-                            })
-                    else:
-                        flat_data.append({
-                            "category": "general",
-                            "metric": key,
-                            "value": value
-                        })
-                data = flat_data
-            
-            if not data:
-                return ""
-            
-            output = StringIO()
-            fieldnames = list(data[0].keys()) if data else []
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
-            return output.getvalue()
-        
-        elif format_type.lower() == "excel" and PANDAS_AVAILABLE:
-            if isinstance(data, dict):
-                # Для словарей создаем DataFrame из ключей-значений
-                df = pd.DataFrame(list(data.items()), columns=['Key', 'Value'])
-            else:
-                df = pd.DataFrame(data)
+                data = ExportTable.from_records(self._flatten_dict_data(data))
             
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=data_type, index=False)
+            if not len(data):
+                return
             
-            output.seek(0)
-            return output.getvalue()
+            # Строки пишутся в файл по одной, без промежуточной строки со всем CSV
+            writer = csv.writer(codecs.getwriter("utf-8")(output))
+            writer.writerow(data.fieldnames)
+            writer.writerows(data.rows())
+        
+        elif format_type.lower() == "excel" and XLSXWRITER_AVAILABLE:
+            if isinstance(data, dict):
+                # Для словарей создаем таблицу из ключей-значений
+                data = ExportTable({"Key": list(data.keys()), "Value": list(data.values())})
+            
+            self._write_excel(data, data_type, output)
+        
+        elif format_type.lower() in ("parquet", "feather") and PYARROW_AVAILABLE:
+            if isinstance(data, dict):
+                data = ExportTable.from_records(self._flatten_dict_data(data))
+                # Значения метрик разнотипные, колонка должна иметь один тип
+                data.columns["value"] = [
+                    orjson.dumps(value, default=_json_default).decode("utf-8")
+                    for value in data.columns["value"]
+                ]
+            
+            # Колоночный формат со сжатием zstd заметно меньше CSV/Excel
+            table = pa.Table.from_pydict(data.columns)
+            if format_type.lower() == "parquet":
+                pq.write_table(table, output, compression="zstd")
+            else:
+                feather.write_feather(table, output, compression="zstd")
         
         else:
             raise ValueError(f"Неподдерживаемый формат: {format_type}")
     
+    def _write_excel(self, data: ExportTable, sheet_name: str, output: BinaryIO) -> None:
+        """
+        Запись таблицы в Excel через xlsxwriter в режиме constant_memory
+        
+        В режиме constant_memory каждая строка сбрасывается во временный
+        файл сразу после записи, поэтому память не растет с размером
+        таблицы. Способ записи ячеек выбирается один раз для колонки.
+        
+        Args:
+            data: Таблица для записи
+            sheet_name: Название листа
+            output: Бинарный файл для записи
+        """
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "use_zip64": True})
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        
+        if len(data):
+            worksheet.write_row(0, 0, data.fieldnames, workbook.add_format({"bold": True}))
+            
+            writers = [
+                self._get_excel_column_writer(worksheet, values)
+                for values in data.columns.values()
+            ]
+            
+            # constant_memory требует записи строго по строкам
+            for row_index, row in enumerate(data.rows(), start=1):
+                for col_index, value in enumerate(row):
+                    if value is not None:
+                        writers[col_index](row_index, col_index, value)
+        
+        workbook.close()
+    
+    def _get_excel_column_writer(self, worksheet, values: List[Any]) -> Callable[[int, int, Any], Any]:
+        """
+        Выбор способа записи ячеек колонки по типам ее значений
+        
+        Args:
+            worksheet: Лист xlsxwriter
+            values: Значения колонки
+            
+        Returns:
+            Функция записи одной ячейки (строка, колонка, значение)
+        """
+        kinds = {type(value) for value in values if value is not None}
+        
+        if kinds and kinds <= {bool}:
+            return worksheet.write_boolean
+        if kinds and all(issubclass(kind, (int, float, Decimal)) and kind is not bool for kind in kinds):
+            return lambda row, col, value: worksheet.write_number(row, col, float(value))
+        return lambda row, col, value: worksheet.write_string(row, col, str(value))
+    
+    def _flatten_dict_data(self, data: Dict) -> List[Dict]:
+        """
+        Преобразование вложенного словаря (аналитики) в плоскую таблицу
+        
+        Args:
+            data: Словарь с данными
+            
+        Returns:
+            Строки с колонками category, metric, value
+        """
+        flat_data = []
+        for key, value in data.items():
+            if isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    flat_data.append({
+                        "category": key,
+                        "metric": sub_key,
+                        "value": sub_value
+                    })
+            else:
+                flat_data.append({
+                    "category": "general",
+                    "metric": key,
+                    "value": value
+                })
+        return flat_data
+    
     async def schedule_automatic_backup(self) -> Dict[str, Any]:
         """
         Запланировать автоматический бэкап
@@ -475,8 +733,6 @@ class ExportService:
             Информация о созданном бэкапе
         """
         try:
-            backup_data = await self.create_full_backup()
-            
             # Сохраняем бэкап в data/backups/
             import os
             backup_dir = "data/backups"
@@ -486,15 +742,16 @@ class ExportService:
             backup_filename = f"backup_{timestamp}.zip"
             backup_path = os.path.join(backup_dir, backup_filename)
             
-            with open(backup_path, 'wb') as f:
-                f.write(backup_data)
+            # Архив пишется сразу в файл бэкапа, без копии в памяти
+            with open(backup_path, 'w+b') as f:
+                await self.create_full_backup(output=f)
             
             self.logger.info(f"Автоматический бэкап создан: {backup_path}")
             
             return {
                 "success": True,
                 "backup_path": backup_path,
-                "backup_size": len(backup_data),
+                "backup_size": os.path.getsize(backup_path),
                 "created_at": datetime.utcnow().isoformat()
             }
         
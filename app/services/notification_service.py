@@ -4,13 +4,13 @@
 """
 
 import asyncio
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Callable, Awaitable
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 from aiogram import Bot
 from aiogram.types import Message
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, desc, func, update
 from sqlalchemy.orm import selectinload
@@ -22,11 +22,20 @@ from app.database.models.notification import (
 )
 from app.database.models.user import User
 from app.database.models.subscription import Subscription
+from app.services.user_service import user_service
 from app.utils.logger import get_logger
+from app.utils.rate_limiter import RateLimiter
 from app.config.settings import get_settings
 
 logger = get_logger("services.notification")
 
+# Параметры массовой рассылки.
+# Telegram ограничивает бота ~30 сообщениями в секунду,
+# оставляем запас, чтобы не получать RetryAfter.
+BROADCAST_RATE_LIMIT = 25
+BROADCAST_WORKERS = 20
+BROADCAST_QUEUE_SIZE = 1000
+
 
 class NotificationService:
     """Сервис для работы с уведомлениями"""
@@ -35,6 +44,7 @@ class NotificationService:
         self.bot = bot
         self.logger = logger
         self.settings = get_settings()
+        self.user_service = user_service
 
     async def _get_session(self) -> AsyncSession:
         """Получение сессии базы данных"""
@@ -507,6 +517,145 @@ class NotificationService:
             result = await session.execute(query)
             return [row[0] for row in result.fetchall()]
 
+    async def broadcast_copy(
+        self,
+        from_chat_id: int,
+        message_id: int,
+        admin_id: Optional[int] = None,
+        bot: Optional[Bot] = None
+    ) -> Dict[str, int]:
+        """
+        Массовая рассылка копии существующего сообщения всем активным пользователям.
+        
+        Сообщение копируется через copy_message на стороне Telegram,
+        поэтому текст и медиа не передаются ботом заново для каждого получателя.
+        
+        Args:
+            from_chat_id: ID чата с исходным сообщением
+            message_id: ID исходного сообщения
+            admin_id: ID администратора для отчета о результатах
+            bot: Экземпляр бота (по умолчанию используется self.bot)
+            
+        Returns:
+            Dict[str, int]: Количество отправленных и неудачных сообщений
+        """
+        bot = bot or self.bot
+        if not bot:
+            self.logger.warning("Bot не инициализирован для рассылки")
+            return {"sent": 0, "failed": 0}
+        
+        return await self._run_broadcast(
+            bot,
+            lambda chat_id: bot.copy_message(
+                chat_id=chat_id,
+                from_chat_id=from_chat_id,
+                message_id=message_id
+            ),
+            admin_id
+        )
+
+    async def _run_broadcast(
+        self,
+        bot: Bot,
+        send: Callable[[int], Awaitable[Any]],
+        admin_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Выполнение рассылки всем активным пользователям.
+        
+        Получатели читаются из базы потоком и передаются через очередь
+        фиксированному пулу воркеров. Общая частота отправки ограничена
+        BROADCAST_RATE_LIMIT сообщениями в секунду.
+        
+        Args:
+            bot: Экземпляр бота
+            send: Функция отправки сообщения одному получателю по chat_id
+            admin_id: ID администратора для отчета о результатах
+            
+        Returns:
+            Dict[str, int]: Количество отправленных и неудачных сообщений
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+        limiter = RateLimiter(BROADCAST_RATE_LIMIT)
+        stats = {"sent": 0, "failed": 0}
+        
+        async def worker():
+            while True:
+                chat_id = await queue.get()
+                try:
+                    if await self._send_broadcast_message(limiter, send, chat_id):
+                        stats["sent"] += 1
+                    else:
+                        stats["failed"] += 1
+                finally:
+                    queue.task_done()
+        
+        workers = [asyncio.create_task(worker()) for _ in range(BROADCAST_WORKERS)]
+        
+        try:
+            async for user in self.user_service.iter_active_users():
+                await queue.put(user.telegram_id)
+            
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        self.logger.info(
+            "Рассылка завершена",
+            admin_id=admin_id,
+            sent=stats["sent"],
+            failed=stats["failed"]
+        )
+        
+        if admin_id:
+            try:
+                await bot.send_message(
+                    chat_id=admin_id,
+                    text=(
+                        "📊 <b>Рассылка завершена</b>\n\n"
+                        f"<b>Доставлено:</b> {stats['sent']}\n"
+                        f"<b>Не доставлено:</b> {stats['failed']}"
+                    ),
+                    parse_mode="HTML"
+                )
+            except Exception as e:
+                self.logger.warning(
+                    "Не удалось отправить отчет о рассылке",
+                    admin_id=admin_id,
+                    error=str(e)
+                )
+        
+        return stats
+
+    async def _send_broadcast_message(
+        self,
+        limiter: RateLimiter,
+        send: Callable[[int], Awaitable[Any]],
+        chat_id: int
+    ) -> bool:
+        """Отправка одного сообщения рассылки с учетом лимитов Telegram"""
+        for _ in range(2):
+            await limiter.acquire()
+            try:
+                await send(chat_id)
+                return True
+            except TelegramRetryAfter as e:
+                # Telegram просит подождать - повторяем один раз
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest):
+                return False
+            except Exception as e:
+                self.logger.error(
+                    "Ошибка отправки сообщения рассылки",
+                    user_id=chat_id,
+                    error=str(e)
+                )
+                return False
+        
+        return False
+
     # Специализированные уведомления
     async def notify_subscription_expiring(
         self,
@@ -635,4 +784,8 @@ class NotificationService:
                 type=NotificationType.PROMO_CODE_AVAILABLE,
                 message=message,
                 priority=NotificationPriority.NORMAL
-            ) 
\ No newline at end of file
+            )
+
+
+# Глобальный экземпляр сервиса уведомлений
+notification_service = NotificationService()
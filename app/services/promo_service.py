@@ -5,38 +5,56 @@
 
 import random
 import string
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy import select, and_, or_, desc, func
 from sqlalchemy.orm import selectinload
 
-from app.config.database import get_async_session
+from app.config.database import AsyncSessionLocal
 from app.database.models.promo import PromoCode, PromoCodeUsage, PromoCodeSettings, PromoCodeType
 from app.database.models.user import User
 from app.database.models.payment import Payment
+from app.utils.cache import TTLCache
 from app.utils.logger import get_logger
 
 logger = get_logger("services.promo")
 
+# Время жизни закэшированных для валидации промокодов (секунды)
+PROMO_VALIDATION_CACHE_TTL = 30
+
+# Промокод и количество его использований пользователем по ключу (код, пользователь).
+# Кэш общий для всех экземпляров сервиса, чтобы изменения сбрасывали его везде.
+_promo_lookup_cache = TTLCache(ttl=PROMO_VALIDATION_CACHE_TTL, maxsize=4096)
+
+# Общая статистика промокодов для админ-меню
+PROMO_STATS_CACHE_TTL = 30
+_promo_stats_cache = TTLCache(ttl=PROMO_STATS_CACHE_TTL, maxsize=1)
+
+
+def _invalidate_promo_caches() -> None:
+    """Сброс кэшей после изменения промокодов или их использований"""
+    _promo_lookup_cache.invalidate()
+    _promo_stats_cache.invalidate()
+
 
 class PromoService:
     """Сервис для работы с промокодами"""
 
-    def __init__(self):
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        """
+        Args:
+            session_factory: Фабрика сессий (по умолчанию общий пул приложения)
+        """
         self.logger = logger
-
-    async def _get_session(self) -> AsyncSession:
-        """Получение сессии базы данных"""
-        async for session in get_async_session():
-            return session
+        self.session_factory = session_factory
 
     # Управление настройками
     async def get_settings(self) -> Optional[PromoCodeSettings]:
         """Получение настроек промокодов"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             query = select(PromoCodeSettings)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -51,7 +69,7 @@ class PromoService:
         updated_by: int = None
     ) -> PromoCodeSettings:
         """Обновление настроек промокодов"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             # Получаем существующие настройки или создаем новые
             settings = await self.get_settings()
             
@@ -101,7 +119,7 @@ class PromoService:
         created_by: Optional[int] = None
     ) -> PromoCode:
         """Создание нового промокода"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             # Проверяем уникальность кода
             existing_query = select(PromoCode).where(PromoCode.code == code)
             existing = await session.execute(existing_query)
@@ -125,6 +143,7 @@ class PromoService:
             
             session.add(promo_code)
             await session.commit()
+            _invalidate_promo_caches()
             await session.refresh(promo_code)
             
             self.logger.info(
@@ -149,7 +168,7 @@ class PromoService:
         for _ in range(10):  # Максимум 10 попыток
             candidate = f"WELCOME{self.generate_promo_code(6)}"
             
-            async with await self._get_session() as session:
+            async with self.session_factory() as session:
                 existing_query = select(PromoCode).where(PromoCode.code == candidate)
                 existing = await session.execute(existing_query)
                 if not existing.scalar_one_or_none():
@@ -178,7 +197,7 @@ class PromoService:
     # Получение промокодов
     async def get_promo_code(self, code: str) -> Optional[PromoCode]:
         """Получение промокода по коду"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             query = select(PromoCode).where(PromoCode.code == code.upper())
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -188,11 +207,35 @@ class PromoService:
         active_only: bool = False,
         user_telegram_id: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        include_user_usage: bool = True
     ) -> List[PromoCode]:
-        """Получение списка промокодов"""
-        async with await self._get_session() as session:
-            query = select(PromoCode).options(
+        """
+        Получение списка промокодов.
+        
+        Если указан user_telegram_id и include_user_usage, у каждого
+        промокода заполняется атрибут user_usage_count - количество его
+        использований этим пользователем (считается в том же запросе).
+        """
+        with_user_usage = bool(user_telegram_id) and include_user_usage
+        
+        async with self.session_factory() as session:
+            columns = [PromoCode]
+            if with_user_usage:
+                columns.append(
+                    select(func.count(PromoCodeUsage.id))
+                    .where(
+                        and_(
+                            PromoCodeUsage.promo_code_id == PromoCode.id,
+                            PromoCodeUsage.user_telegram_id == str(user_telegram_id)
+                        )
+                    )
+                    .correlate(PromoCode)
+                    .scalar_subquery()
+                    .label("user_usage_count")
+                )
+            
+            query = select(*columns).options(
                 selectinload(PromoCode.usages)
             ).order_by(desc(PromoCode.created_at))
             
@@ -209,14 +252,23 @@ class PromoService:
             
             query = query.limit(limit).offset(offset)
             result = await session.execute(query)
-            return result.scalars().all()
+            
+            if not with_user_usage:
+                return result.scalars().all()
+            
+            promo_codes = []
+            for promo_code, user_usage_count in result.all():
+                promo_code.user_usage_count = user_usage_count or 0
+                promo_codes.append(promo_code)
+            return promo_codes
 
     # Валидация и применение
     async def validate_promo_code(
         self,
         code: str,
         user_telegram_id: int,
-        amount: Decimal
+        amount: Decimal,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Валидация промокода для использования.
@@ -224,8 +276,109 @@ class PromoService:
         Returns:
             Dict с результатом валидации и размером скидки
         """
-        promo_code = await self.get_promo_code(code)
+        results = await self.validate_promo_codes_bulk([code], user_telegram_id, amount, use_cache)
+        return results[code]
+
+    async def validate_promo_codes_bulk(
+        self,
+        codes: List[str],
+        user_telegram_id: int,
+        amount: Decimal,
+        use_cache: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Валидация нескольких промокодов одним запросом к базе.
+        
+        Промокоды загружаются вместе с количеством их использований
+        пользователем, проверки и расчет скидки выполняются в Python.
+        Загруженные данные кэшируются на PROMO_VALIDATION_CACHE_TTL секунд,
+        поэтому повторные проверки тех же кодов не обращаются к базе.
+        
+        Args:
+            codes: Список кодов
+            user_telegram_id: Telegram ID пользователя
+            amount: Сумма заказа
+            use_cache: Использовать кэш (False - всегда читать из базы)
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Результат валидации для каждого кода из codes
+        """
+        found = {}
+        missing = set()
+        for code in {code.upper() for code in codes}:
+            cached = _promo_lookup_cache.get((code, user_telegram_id)) if use_cache else None
+            if cached is None:
+                missing.add(code)
+            else:
+                found[code] = cached
+        
+        if missing:
+            found.update(await self._load_promo_codes_with_usage(missing, user_telegram_id))
+        
+        results = {}
+        for code in codes:
+            promo_code, usages = found[code.upper()]
+            results[code] = self._check_promo_code(promo_code, usages, user_telegram_id, amount)
+        return results
+
+    async def _load_promo_codes_with_usage(
+        self,
+        codes: Set[str],
+        user_telegram_id: int
+    ) -> Dict[str, Tuple[Optional[PromoCode], int]]:
+        """
+        Загрузка промокодов с количеством использований пользователем.
         
+        Args:
+            codes: Коды в верхнем регистре
+            user_telegram_id: Telegram ID пользователя
+        
+        Returns:
+            Dict[str, Tuple[Optional[PromoCode], int]]: (промокод или None, количество использований) по коду
+        """
+        user_usages = (
+            select(func.count(PromoCodeUsage.id))
+            .where(
+                and_(
+                    PromoCodeUsage.promo_code_id == PromoCode.id,
+                    PromoCodeUsage.user_telegram_id == str(user_telegram_id)
+                )
+            )
+            .correlate(PromoCode)
+            .scalar_subquery()
+        )
+        
+        async with self.session_factory() as session:
+            query = select(PromoCode, user_usages).where(PromoCode.code.in_(codes))
+            result = await session.execute(query)
+            rows = {promo_code.code: (promo_code, usages or 0) for promo_code, usages in result.all()}
+        
+        # Несуществующие коды тоже кэшируем, чтобы не искать их повторно
+        found = {}
+        for code in codes:
+            found[code] = rows.get(code, (None, 0))
+            _promo_lookup_cache.set((code, user_telegram_id), found[code])
+        return found
+
+    def _check_promo_code(
+        self,
+        promo_code: Optional[PromoCode],
+        user_usages: int,
+        user_telegram_id: int,
+        amount: Decimal
+    ) -> Dict[str, Any]:
+        """
+        Проверка загруженного промокода и расчет скидки.
+        
+        Args:
+            promo_code: Промокод или None, если он не найден
+            user_usages: Количество использований промокода пользователем
+            user_telegram_id: Telegram ID пользователя
+            amount: Сумма заказа
+        
+        Returns:
+            Dict с результатом валидации и размером скидки
+        """
         if not promo_code:
             return {
                 "valid": False,
@@ -259,7 +412,6 @@ class PromoService:
             }
         
         # Проверяем количество использований пользователем
-        user_usages = await self.get_user_promo_usage_count(promo_code.id, user_telegram_id)
         if user_usages >= promo_code.max_uses_per_user:
             return {
                 "valid": False,
@@ -285,7 +437,8 @@ class PromoService:
             "valid": True,
             "error": None,
             "discount": discount,
-            "promo_code": promo_code
+            "promo_code": promo_code,
+            "user_usage_count": user_usages
         }
 
     async def apply_promo_code(
@@ -296,7 +449,8 @@ class PromoService:
         payment_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Применение промокода к платежу"""
-        validation = await self.validate_promo_code(code, user_telegram_id, amount)
+        # Перед применением проверяем по актуальным данным, минуя кэш
+        validation = await self.validate_promo_code(code, user_telegram_id, amount, use_cache=False)
         
         if not validation["valid"]:
             return validation
@@ -305,7 +459,7 @@ class PromoService:
         discount = validation["discount"]
         final_amount = amount - discount
         
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             # Создаем запись об использовании
             usage = PromoCodeUsage(
                 promo_code_id=promo_code.id,
@@ -322,6 +476,7 @@ class PromoService:
             promo_code.current_uses += 1
             
             await session.commit()
+            _invalidate_promo_caches()
             await session.refresh(usage)
             
             self.logger.info(
@@ -343,7 +498,7 @@ class PromoService:
 
     async def get_user_promo_usage_count(self, promo_code_id: int, user_telegram_id: int) -> int:
         """Количество использований промокода пользователем"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             query = select(func.count(PromoCodeUsage.id)).where(
                 and_(
                     PromoCodeUsage.promo_code_id == promo_code_id,
@@ -356,7 +511,7 @@ class PromoService:
     # Управление промокодами
     async def deactivate_promo_code(self, code: str) -> bool:
         """Деактивация промокода"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             query = select(PromoCode).where(PromoCode.code == code)
             result = await session.execute(query)
             promo_code = result.scalar_one_or_none()
@@ -366,13 +521,14 @@ class PromoService:
             
             promo_code.is_active = False
             await session.commit()
+            _invalidate_promo_caches()
             
             self.logger.info("Промокод деактивирован", code=code)
             return True
 
     async def delete_promo_code(self, code: str) -> bool:
         """Удаление промокода"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             query = select(PromoCode).where(PromoCode.code == code)
             result = await session.execute(query)
             promo_code = result.scalar_one_or_none()
@@ -382,6 +538,7 @@ class PromoService:
             
             await session.delete(promo_code)
             await session.commit()
+            _invalidate_promo_caches()
             
             self.logger.info("Промокод удален", code=code)
             return True
@@ -389,7 +546,7 @@ class PromoService:
     # Статистика
     async def get_promo_stats(self, code: Optional[str] = None) -> Dict[str, Any]:
         """Получение статистики промокодов"""
-        async with await self._get_session() as session:
+        async with self.session_factory() as session:
             stats = {}
             
             if code:
@@ -422,23 +579,28 @@ class PromoService:
                 }
             else:
                 # Общая статистика
-                total_codes_query = select(func.count(PromoCode.id))
-                active_codes_query = select(func.count(PromoCode.id)).where(
-                    PromoCode.is_active == True
-                )
-                total_usages_query = select(func.count(PromoCodeUsage.id))
-                total_discount_query = select(func.sum(PromoCodeUsage.discount_amount))
-                
-                total_codes = await session.execute(total_codes_query)
-                active_codes = await session.execute(active_codes_query)
-                total_usages = await session.execute(total_usages_query)
-                total_discount = await session.execute(total_discount_query)
-                
-                stats = {
-                    "total_promo_codes": total_codes.scalar() or 0,
-                    "active_promo_codes": active_codes.scalar() or 0,
-                    "total_usages": total_usages.scalar() or 0,
-                    "total_discount_given": float(total_discount.scalar() or 0)
-                }
+                stats = await _promo_stats_cache.get_or_set("total", self._load_promo_totals)
+            
+            return stats 
+
+    async def _load_promo_totals(self) -> Dict[str, Any]:
+        """Подсчет общей статистики промокодов одним запросом"""
+        async with self.session_factory() as session:
+            query = select(
+                select(func.count(PromoCode.id)).scalar_subquery(),
+                select(func.count(PromoCode.id)).where(PromoCode.is_active == True).scalar_subquery(),
+                select(func.count(PromoCodeUsage.id)).scalar_subquery(),
+                select(func.sum(PromoCodeUsage.discount_amount)).scalar_subquery()
+            )
+            total_codes, active_codes, total_usages, total_discount = (await session.execute(query)).one()
             
-            return stats 
\ No newline at end of file
+            return {
+                "total_promo_codes": total_codes or 0,
+                "active_promo_codes": active_codes or 0,
+                "total_usages": total_usages or 0,
+                "total_discount_given": float(total_discount or 0)
+            }
+
+
+# Глобальный экземпляр сервиса промокодов
+promo_service = PromoService()
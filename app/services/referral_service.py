@@ -10,23 +10,36 @@ from typing import Optional, List, Dict, Any
 from decimal import Decimal
 
 from sqlalchemy import select, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import selectinload
 
 from app.database.models.user import User
-from app.database.models.referral import Referral, ReferralSettings
+from app.database.models.referral import Referral, ReferralCode, ReferralSettings
 from app.database.models.subscription import Subscription
 from app.database.models.payment import Payment
 from app.config.database import AsyncSessionLocal
+from app.utils.cache import TTLCache
 from app.utils.logger import get_logger
 
 logger = get_logger("services.referral")
 
+# Время жизни закэшированной статистики реферера (секунды)
+REFERRAL_STATS_CACHE_TTL = 10
+
+# Статистика по ID реферера, общая для всех экземпляров сервиса
+_referral_stats_cache = TTLCache(ttl=REFERRAL_STATS_CACHE_TTL, maxsize=10_000)
+
 
 class ReferralService:
     """Сервис для управления реферальной системой"""
     
-    def __init__(self):
-        self.session_factory = AsyncSessionLocal
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        """
+        Args:
+            session_factory: Фабрика сессий (по умолчанию общий пул приложения)
+        """
+        self.session_factory = session_factory
     
     async def get_referral_settings(self) -> Optional[ReferralSettings]:
         """Получение настроек реферальной системы"""
@@ -90,6 +103,71 @@ class ReferralService:
         alphabet = string.ascii_uppercase + string.digits
         return ''.join(secrets.choice(alphabet) for _ in range(length))
     
+    async def create_referral_code(self, referrer_id: int) -> str:
+        """
+        Получение реферального кода пользователя.
+        
+        Код сохраняется в таблице referral_codes при первом запросе,
+        повторные запросы возвращают тот же код.
+        
+        Args:
+            referrer_id: Telegram ID реферера
+        
+        Returns:
+            str: Реферальный код
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(ReferralCode.code).where(ReferralCode.referrer_id == referrer_id)
+            )
+            code = result.scalar_one_or_none()
+            if code:
+                return code
+            
+            # Повторяем генерацию, если код случайно совпал с существующим
+            for _ in range(10):
+                code = self.generate_referral_code()
+                exists = await session.execute(
+                    select(ReferralCode.code).where(ReferralCode.code == code)
+                )
+                if exists.scalar_one_or_none() is None:
+                    break
+            else:
+                raise RuntimeError("Не удалось сгенерировать уникальный реферальный код")
+            
+            session.add(ReferralCode(code=code, referrer_id=referrer_id))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Параллельный запрос уже сохранил код этого пользователя
+                await session.rollback()
+                result = await session.execute(
+                    select(ReferralCode.code).where(ReferralCode.referrer_id == referrer_id)
+                )
+                stored_code = result.scalar_one_or_none()
+                if stored_code is None:
+                    raise
+                return stored_code
+            
+            logger.info(f"Создан реферальный код {code} для пользователя {referrer_id}")
+            return code
+    
+    async def resolve_referral_code(self, code: str) -> Optional[int]:
+        """
+        Поиск реферера по реферальному коду.
+        
+        Args:
+            code: Реферальный код
+        
+        Returns:
+            Optional[int]: Telegram ID реферера или None
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(ReferralCode.referrer_id).where(ReferralCode.code == code)
+            )
+            return result.scalar_one_or_none()
+    
     async def create_referral(
         self,
         referrer_id: int,
@@ -146,17 +224,21 @@ class ReferralService:
             session.add(referral)
             await session.commit()
             await session.refresh(referral)
+            _referral_stats_cache.invalidate(referrer_id)
             
             logger.info(f"Создан новый реферал: {referral}")
             return referral
     
     async def get_referral_by_code(self, referral_code: str) -> Optional[Referral]:
-        """Получение реферала по коду"""
+        """Получение первого реферала по коду (один код используется многими рефералами)"""
         async with self.session_factory() as session:
             result = await session.execute(
-                select(Referral).where(Referral.referral_code == referral_code)
+                select(Referral)
+                .where(Referral.referral_code == referral_code)
+                .order_by(Referral.id)
+                .limit(1)
             )
-            return result.scalar_one_or_none()
+            return result.scalars().first()
     
     async def get_referral_by_referred_id(self, referred_id: int) -> Optional[Referral]:
         """Получение реферала по ID приглашенного пользователя"""
@@ -179,7 +261,9 @@ class ReferralService:
             if status:
                 query = query.where(Referral.status == status)
             
-            query = query.limit(limit).options(
+            # Новые рефералы первыми, приглашенные пользователи подгружаются
+            # одним дополнительным запросом вместо запроса на каждую строку
+            query = query.order_by(Referral.created_at.desc()).limit(limit).options(
                 selectinload(Referral.referred)
             )
             
@@ -228,6 +312,7 @@ class ReferralService:
             
             await session.commit()
             await session.refresh(referral)
+            _referral_stats_cache.invalidate(referral.referrer_id)
             
             logger.info(f"Реферал подтвержден: {referral}, вознаграждение: {reward_amount}")
             return referral
@@ -260,12 +345,24 @@ class ReferralService:
             
             await session.commit()
             await session.refresh(referral)
+            _referral_stats_cache.invalidate(referral.referrer_id)
             
             logger.info(f"Вознаграждение выплачено для реферала: {referral}")
             return referral
     
     async def get_referral_stats(self, referrer_id: int) -> Dict[str, Any]:
-        """Получение статистики по рефералам пользователя"""
+        """
+        Получение статистики по рефералам пользователя.
+        
+        Результат кэшируется на REFERRAL_STATS_CACHE_TTL секунд, чтобы
+        повторные нажатия "Обновить" не пересчитывали агрегаты.
+        """
+        return await _referral_stats_cache.get_or_set(
+            referrer_id, lambda: self._load_referral_stats(referrer_id)
+        )
+    
+    async def _load_referral_stats(self, referrer_id: int) -> Dict[str, Any]:
+        """Подсчет статистики по рефералам пользователя"""
         async with self.session_factory() as session:
             # Общее количество рефералов
             total_result = await session.execute(
@@ -367,4 +464,8 @@ class ReferralService:
                 "paid_rewards": paid_rewards,
                 "pending_rewards": total_rewards - paid_rewards,
                 "top_referrers": top_referrers
-            } 
\ No newline at end of file
+            }
+
+
+# Глобальный экземпляр реферального сервиса
+referral_service = ReferralService()
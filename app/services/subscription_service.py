@@ -40,7 +40,8 @@ class SubscriptionService:
         channel_id: int,
         duration_days: int,
         price: Decimal,
-        payment_id: Optional[int] = None
+        payment_id: Optional[int] = None,
+        activate: bool = False
     ) -> Subscription:
         """
         Создание новой подписки.
@@ -51,6 +52,7 @@ class SubscriptionService:
             duration_days: Длительность подписки в днях
             price: Стоимость подписки
             payment_id: ID связанного платежа
+            activate: Создать подписку сразу активной (без отдельного activate_subscription)
             
         Returns:
             Subscription: Созданная подписка
@@ -78,11 +80,13 @@ class SubscriptionService:
             subscription = Subscription(
                 user_id=user_id,
                 channel_id=channel_id,
-                status=SubscriptionStatus.PENDING,
+                status=SubscriptionStatus.ACTIVE if activate else SubscriptionStatus.PENDING,
                 price=price,
                 duration_days=duration_days,
                 starts_at=now,
                 expires_at=expires_at,
+                is_active=activate,
+                activated_at=now if activate else None,
                 payment_id=payment_id,
                 created_at=now,
                 updated_at=now
@@ -98,7 +102,8 @@ class SubscriptionService:
                 user_id=user_id,
                 channel_id=channel_id,
                 duration_days=duration_days,
-                price=float(price)
+                price=float(price),
+                activated=activate
             )
             
             return subscription
@@ -230,6 +235,57 @@ class SubscriptionService:
             result = await session.execute(stmt)
             return result.scalars().all()
     
+    async def count_user_subscriptions(self, user_id: int, active_only: bool = True) -> int:
+        """
+        Получение количества подписок пользователя без загрузки самих подписок.
+        
+        Args:
+            user_id: ID пользователя
+            active_only: Только активные подписки
+            
+        Returns:
+            int: Количество подписок
+        """
+        counts = await self.get_subscription_counts([user_id], active_only=active_only)
+        return counts.get(user_id, 0)
+    
+    async def get_subscription_counts(
+        self,
+        user_ids: List[int],
+        active_only: bool = True
+    ) -> Dict[int, int]:
+        """
+        Получение количества подписок для нескольких пользователей одним запросом.
+        
+        Args:
+            user_ids: Список ID пользователей
+            active_only: Только активные подписки
+            
+        Returns:
+            Dict[int, int]: Количество подписок по ID пользователя
+            (пользователи без подписок в словарь не попадают)
+        """
+        if not user_ids:
+            return {}
+        
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(Subscription.user_id, func.count(Subscription.id))
+                .where(Subscription.user_id.in_(user_ids))
+                .group_by(Subscription.user_id)
+            )
+            
+            if active_only:
+                stmt = stmt.where(
+                    and_(
+                        Subscription.is_active == True,
+                        Subscription.expires_at > datetime.utcnow()
+                    )
+                )
+            
+            result = await session.execute(stmt)
+            return {user_id: count for user_id, count in result.all()}
+    
     async def check_subscription_access(self, user_id: int, channel_id: int) -> bool:
         """
         Проверка доступа пользователя к каналу.
@@ -642,4 +698,8 @@ class SubscriptionService:
             except Exception as e:
                 self.logger.error("Ошибка удаления подписки", error=str(e))
                 await session.rollback()
-                return False 
\ No newline at end of file
+                return False
+
+
+# Глобальный экземпляр сервиса подписок
+subscription_service = SubscriptionService()
@@ -3,19 +3,34 @@
 Управляет регистрацией, обновлением и получением данных пользователей.
 """
 
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, update, and_, or_, true
 from sqlalchemy.sql import func
 from sqlalchemy.types import String
 
 from app.database.models.user import User
 from app.database.models.subscription import Subscription
+from app.database.models.payment import Payment, PaymentStatus
 from app.config.database import AsyncSessionLocal
 from app.utils.logger import get_logger
 from app.utils.crypto import encrypt_data, decrypt_data
+from app.utils.cache import TTLCache
+
+
+# Кэш статистики админ-дашборда (общий для всех экземпляров сервиса)
+DASHBOARD_STATS_TTL = 30
+_dashboard_stats_cache = TTLCache(ttl=DASHBOARD_STATS_TTL)
+
+# Кэш результатов поиска пользователей в админ-панели
+USER_LOOKUP_TTL = 60
+_user_lookup_cache = TTLCache(ttl=USER_LOOKUP_TTL, maxsize=256)
+
+# Кэш статуса блокировки, проверяемого при каждом /start
+BAN_STATUS_TTL = 60
+_ban_status_cache = TTLCache(ttl=BAN_STATUS_TTL, maxsize=10_000)
 
 
 class UserService:
@@ -29,8 +44,13 @@ class UserService:
     - Управление правами доступа
     """
     
-    def __init__(self):
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        """
+        Args:
+            session_factory: Фабрика сессий (по умолчанию общий пул приложения)
+        """
         self.logger = get_logger("services.user")
+        self.session_factory = session_factory
     
     async def get_or_create_user(
         self,
@@ -53,7 +73,37 @@ class UserService:
         Returns:
             User: Объект пользователя
         """
-        async with AsyncSessionLocal() as session:
+        user, _ = await self.create_or_update_user(
+            telegram_id=telegram_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            language_code=language_code
+        )
+        return user
+    
+    async def create_or_update_user(
+        self,
+        telegram_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        language_code: Optional[str] = None
+    ) -> Tuple[User, bool]:
+        """
+        Создание нового или обновление данных существующего пользователя.
+        
+        Args:
+            telegram_id: ID пользователя в Telegram
+            username: Имя пользователя в Telegram (без @)
+            first_name: Имя пользователя
+            last_name: Фамилия пользователя
+            language_code: Код языка пользователя
+            
+        Returns:
+            Tuple[User, bool]: Объект пользователя и признак того, что он только что создан
+        """
+        async with self.session_factory() as session:
             # Пытаемся найти существующего пользователя
             stmt = select(User).where(User.telegram_id == telegram_id)
             result = await session.execute(stmt)
@@ -88,7 +138,7 @@ class UserService:
                         username=username
                     )
                 
-                return user
+                return user, False
             
             # Создаем нового пользователя
             user = User(
@@ -112,7 +162,7 @@ class UserService:
                 username=username
             )
             
-            return user
+            return user, True
     
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         """
@@ -124,11 +174,35 @@ class UserService:
         Returns:
             Optional[User]: Пользователь или None
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = select(User).where(User.telegram_id == telegram_id)
             result = await session.execute(stmt)
             return result.scalar_one_or_none()
     
+    async def is_user_banned(self, telegram_id: int) -> bool:
+        """
+        Проверка блокировки пользователя.
+        
+        Результат кэшируется на BAN_STATUS_TTL секунд и сбрасывается
+        при изменении статуса через update_user_ban_status.
+        
+        Args:
+            telegram_id: ID пользователя в Telegram
+            
+        Returns:
+            bool: True если пользователь заблокирован
+        """
+        return await _ban_status_cache.get_or_set(
+            telegram_id, lambda: self._load_ban_status(telegram_id)
+        )
+    
+    async def _load_ban_status(self, telegram_id: int) -> bool:
+        """Чтение статуса блокировки из базы данных"""
+        async with self.session_factory() as session:
+            stmt = select(User.is_banned).where(User.telegram_id == telegram_id)
+            result = await session.execute(stmt)
+            return bool(result.scalar_one_or_none())
+    
     async def get_user_with_active_subscription(self, telegram_id: int) -> Optional[User]:
         """
         Получение пользователя с активной подпиской.
@@ -139,7 +213,7 @@ class UserService:
         Returns:
             Optional[User]: Пользователь с активной подпиской или None
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 select(User)
                 .join(Subscription)
@@ -161,7 +235,7 @@ class UserService:
         Args:
             telegram_id: ID пользователя в Telegram
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 update(User)
                 .where(User.telegram_id == telegram_id)
@@ -183,7 +257,7 @@ class UserService:
         Returns:
             bool: True если пользователь деактивирован
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 update(User)
                 .where(User.telegram_id == telegram_id)
@@ -195,6 +269,9 @@ class UserService:
             result = await session.execute(stmt)
             await session.commit()
             
+            # Сбрасываем закэшированные результаты поиска
+            _user_lookup_cache.invalidate()
+            
             if result.rowcount > 0:
                 self.logger.info("Пользователь деактивирован", user_id=telegram_id)
                 return True
@@ -211,7 +288,7 @@ class UserService:
         Returns:
             bool: True если пользователь активирован
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 update(User)
                 .where(User.telegram_id == telegram_id)
@@ -223,6 +300,9 @@ class UserService:
             result = await session.execute(stmt)
             await session.commit()
             
+            # Сбрасываем закэшированные результаты поиска
+            _user_lookup_cache.invalidate()
+            
             if result.rowcount > 0:
                 self.logger.info("Пользователь активирован", user_id=telegram_id)
                 return True
@@ -248,7 +328,7 @@ class UserService:
         Returns:
             List[User]: Список пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = select(User)
             
             if active_only:
@@ -285,7 +365,7 @@ class UserService:
         Returns:
             int: Количество пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = select(User.id)
             
             if active_only:
@@ -317,7 +397,7 @@ class UserService:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 select(User)
                 .where(
@@ -370,7 +450,7 @@ class UserService:
 
     async def get_user_by_username(self, username: str) -> Optional[User]:
         """
-        Получение пользователя по username.
+        Получение пользователя по username (без учета регистра).
         
         Args:
             username: Имя пользователя (без @)
@@ -378,10 +458,49 @@ class UserService:
         Returns:
             Optional[User]: Пользователь или None
         """
-        async with AsyncSessionLocal() as session:
-            stmt = select(User).where(User.username == username)
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none()
+        async with self.session_factory() as session:
+            # Сравнение по lower() использует индекс ix_users_username_lower
+            stmt = select(User).where(func.lower(User.username) == username.lower())
+            return await session.scalar(stmt)
+
+    async def get_user_by_telegram_id_cached(self, telegram_id: int) -> Optional[User]:
+        """
+        Получение пользователя по Telegram ID с кэшированием.
+        
+        Найденные пользователи хранятся в кэше USER_LOOKUP_TTL секунд,
+        отсутствие пользователя не кэшируется.
+        
+        Args:
+            telegram_id: ID пользователя в Telegram
+            
+        Returns:
+            Optional[User]: Пользователь или None
+        """
+        key = ("id", telegram_id)
+        user = _user_lookup_cache.get(key)
+        if user is None:
+            user = await self.get_user_by_telegram_id(telegram_id)
+            if user:
+                _user_lookup_cache.set(key, user)
+        return user
+
+    async def get_user_by_username_cached(self, username: str) -> Optional[User]:
+        """
+        Получение пользователя по username с кэшированием.
+        
+        Args:
+            username: Имя пользователя (без @)
+            
+        Returns:
+            Optional[User]: Пользователь или None
+        """
+        key = ("username", username.lower())
+        user = _user_lookup_cache.get(key)
+        if user is None:
+            user = await self.get_user_by_username(username)
+            if user:
+                _user_lookup_cache.set(key, user)
+        return user
 
     async def get_recent_users(self, limit: int = 10) -> List[User]:
         """
@@ -393,7 +512,7 @@ class UserService:
         Returns:
             List[User]: Список пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 select(User)
                 .order_by(User.created_at.desc())
@@ -402,6 +521,36 @@ class UserService:
             result = await session.execute(stmt)
             return list(result.scalars().all())
 
+    async def get_recent_users_summary(
+        self,
+        limit: int = 10
+    ) -> List[Tuple[Optional[str], Optional[str], int, datetime, bool]]:
+        """
+        Получение краткой информации о последних зарегистрированных пользователях.
+        
+        Выбираются только нужные для списка колонки, без создания ORM-объектов.
+        
+        Args:
+            limit: Максимальное количество пользователей
+            
+        Returns:
+            List[Tuple]: Кортежи (first_name, username, telegram_id, created_at, is_active)
+        """
+        async with self.session_factory() as session:
+            stmt = (
+                select(
+                    User.first_name,
+                    User.username,
+                    User.telegram_id,
+                    User.created_at,
+                    User.is_active
+                )
+                .order_by(User.created_at.desc())
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            return list(result.tuples().all())
+
     async def get_active_users_count(self, days: int = 7) -> int:
         """
         Получение количества активных пользователей за период.
@@ -412,7 +561,7 @@ class UserService:
         Returns:
             int: Количество активных пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             since_date = datetime.utcnow() - timedelta(days=days)
             stmt = (
                 select(User)
@@ -437,7 +586,7 @@ class UserService:
         Returns:
             int: Количество новых пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             since_date = datetime.utcnow() - timedelta(days=days)
             stmt = (
                 select(User)
@@ -447,6 +596,142 @@ class UserService:
             users = result.scalars().all()
             return len(list(users))
 
+    async def get_dashboard_stats(self) -> Dict[str, Any]:
+        """
+        Получение всех счетчиков админ-дашборда одним запросом.
+        
+        Каждая таблица сканируется один раз в своем CTE, а условия
+        считаются агрегатами с FILTER, поэтому вся статистика
+        собирается за один round-trip к базе данных.
+        
+        Returns:
+            Dict[str, Any]: Статистика пользователей, подписок и платежей
+        """
+        now = datetime.utcnow()
+        day_ago = now - timedelta(days=1)
+        week_ago = now - timedelta(days=7)
+        month_ago = now - timedelta(days=30)
+        
+        users_cte = (
+            select(
+                func.count().filter(User.is_active == True).label("total_users"),
+                func.count().filter(
+                    and_(
+                        User.is_active == True,
+                        User.last_activity_at >= week_ago
+                    )
+                ).label("active_users"),
+                func.count().filter(User.created_at >= day_ago).label("new_users_today"),
+            )
+            .cte("u")
+        )
+        
+        subscriptions_cte = (
+            select(
+                func.count().filter(
+                    and_(
+                        Subscription.is_active == True,
+                        Subscription.expires_at > now
+                    )
+                ).label("active_subscriptions"),
+                func.count().filter(
+                    or_(
+                        Subscription.is_active == False,
+                        Subscription.expires_at <= now
+                    )
+                ).label("expired_subscriptions"),
+            )
+            .cte("s")
+        )
+        
+        payments_cte = (
+            select(
+                func.count().filter(Payment.created_at >= day_ago).label("payments_today"),
+                func.coalesce(
+                    func.sum(Payment.amount).filter(Payment.created_at >= day_ago), 0
+                ).label("revenue_today"),
+                func.count().label("payments_month"),
+                func.coalesce(func.sum(Payment.amount), 0).label("revenue_month"),
+            )
+            .where(
+                and_(
+                    Payment.status == PaymentStatus.COMPLETED,
+                    Payment.created_at >= month_ago
+                )
+            )
+            .cte("p")
+        )
+        
+        # Каждый CTE возвращает ровно одну строку, соединяем их без условий
+        stmt = select(users_cte, subscriptions_cte, payments_cte).select_from(
+            users_cte.join(subscriptions_cte, true()).join(payments_cte, true())
+        )
+        
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            row = result.mappings().one()
+        
+        return {
+            "total_users": row["total_users"] or 0,
+            "active_users": row["active_users"] or 0,
+            "new_users_today": row["new_users_today"] or 0,
+            "active_subscriptions": row["active_subscriptions"] or 0,
+            "expired_subscriptions": row["expired_subscriptions"] or 0,
+            "payments_today": row["payments_today"] or 0,
+            "revenue_today": float(row["revenue_today"] or 0),
+            "payments_month": row["payments_month"] or 0,
+            "revenue_month": float(row["revenue_month"] or 0),
+        }
+
+    async def get_dashboard_stats_cached(self) -> Dict[str, Any]:
+        """
+        Получение статистики админ-дашборда с кэшированием.
+        
+        Повторные запросы в течение DASHBOARD_STATS_TTL секунд
+        обслуживаются из памяти без обращения к базе данных.
+        
+        Returns:
+            Dict[str, Any]: Статистика пользователей, подписок и платежей
+        """
+        return await _dashboard_stats_cache.get_or_set(
+            "dashboard", self.get_dashboard_stats
+        )
+
+    async def count_active_users(self) -> int:
+        """
+        Получение количества активных пользователей.
+        
+        Returns:
+            int: Количество активных пользователей
+        """
+        async with self.session_factory() as session:
+            stmt = select(func.count(User.telegram_id)).where(User.is_active == True)
+            result = await session.execute(stmt)
+            return result.scalar() or 0
+
+    async def iter_active_users(self, batch_size: int = 500) -> AsyncIterator[User]:
+        """
+        Потоковое получение активных пользователей.
+        
+        Строки читаются курсором порциями по batch_size, поэтому в памяти
+        одновременно находится не больше одной порции пользователей.
+        
+        Args:
+            batch_size: Размер порции, загружаемой из базы данных
+            
+        Yields:
+            User: Активный пользователь
+        """
+        async with self.session_factory() as session:
+            stmt = (
+                select(User)
+                .where(User.is_active == True)
+                .execution_options(yield_per=batch_size)
+            )
+            result = await session.stream_scalars(stmt)
+            async for user in result:
+                yield user
+
     async def get_all_active_users(self) -> List[User]:
         """
         Получение всех активных пользователей.
@@ -454,7 +739,7 @@ class UserService:
         Returns:
             List[User]: Список всех активных пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = select(User).where(User.is_active == True)
             result = await session.execute(stmt)
             return list(result.scalars().all())
@@ -470,7 +755,7 @@ class UserService:
         Returns:
             bool: True если статус изменен
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 update(User)
                 .where(User.telegram_id == telegram_id)
@@ -482,6 +767,10 @@ class UserService:
             result = await session.execute(stmt)
             await session.commit()
             
+            # Сбрасываем закэшированные результаты поиска
+            _user_lookup_cache.invalidate()
+            _ban_status_cache.invalidate(telegram_id)
+            
             if result.rowcount > 0:
                 action = "заблокирован" if is_banned else "разблокирован"
                 self.logger.info(f"Пользователь {action}", user_id=telegram_id)
@@ -500,7 +789,7 @@ class UserService:
         Returns:
             List[User]: Список пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             stmt = (
                 select(User)
                 .order_by(User.created_at.desc())
@@ -522,7 +811,7 @@ class UserService:
         Returns:
             List[User]: Список найденных пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             search_pattern = f"%{search_query}%"
             stmt = (
                 select(User)
@@ -551,7 +840,7 @@ class UserService:
         Returns:
             int: Количество найденных пользователей
         """
-        async with AsyncSessionLocal() as session:
+        async with self.session_factory() as session:
             search_pattern = f"%{search_query}%"
             stmt = (
                 select(func.count(User.id))
@@ -565,4 +854,8 @@ class UserService:
                 )
             )
             result = await session.execute(stmt)
-            return result.scalar() or 0 
\ No newline at end of file
+            return result.scalar() or 0
+
+
+# Глобальный экземпляр сервиса пользователей
+user_service = UserService()
@@ -0,0 +1,110 @@
+"""
+Кэширование в памяти процесса для PaidSubscribeBot.
+Используется для результатов дорогих запросов, которые меняются медленно.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+# Маркер отсутствующего значения (None тоже может быть закэширован)
+_MISSING = object()
+
+class TTLCache:
+    """
+    Асинхронный кэш с ограниченным временем жизни записей.
+    
+    Значения хранятся в памяти процесса вместе с моментом сохранения
+    (по time.monotonic). Конкурентные промахи по одному ключу
+    сериализуются через asyncio.Lock, поэтому дорогая фабрика
+    вызывается один раз, а остальные корутины получают готовое значение.
+    """
+    
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        """
+        Args:
+            ttl: Время жизни записи в секундах
+            maxsize: Максимальное количество записей
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получение значения, если оно еще не устарело.
+        
+        Args:
+            key: Ключ записи
+            default: Значение, возвращаемое при промахе
+        
+        Returns:
+            Any: Сохраненное значение или default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            self._data.pop(key, None)
+            return default
+        
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Сохранение значения.
+        
+        Args:
+            key: Ключ записи
+            value: Значение
+        """
+        self._data.pop(key, None)
+        if len(self._data) >= self.maxsize:
+            # Словарь хранит порядок вставки, первой идет самая старая запись
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic(), value)
+    
+    async def get_or_set(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Получение значения из кэша или вычисление его через фабрику.
+        
+        Args:
+            key: Ключ записи
+            factory: Корутинная функция для вычисления значения
+        
+        Returns:
+            Any: Значение из кэша или результат фабрики
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Значение могло появиться, пока мы ждали блокировку
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            
+            try:
+                value = await factory()
+                self.set(key, value)
+            finally:
+                self._locks.pop(key, None)
+            return value
+    
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Сброс записи или всего кэша.
+        
+        Args:
+            key: Ключ записи (если не указан, очищается весь кэш)
+        """
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
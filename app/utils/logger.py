@@ -3,11 +3,14 @@
 Настройка структурированного логирования с поддержкой различных уровней.
 """
 
+import asyncio
+import functools
 import logging
 import logging.handlers
 import sys
+import traceback
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 import structlog
 from colorlog import ColoredFormatter
@@ -120,17 +123,21 @@ def setup_logging() -> structlog.stdlib.BoundLogger:
     return logger
 
 
-def get_logger(name: str = "PaidSubscribeBot") -> structlog.stdlib.BoundLogger:
+def get_logger(name: str = "PaidSubscribeBot", **initial_values: Any) -> structlog.stdlib.BoundLogger:
     """
     Получение логгера для модуля.
     
+    Логгер создается лениво, поэтому его можно получать при импорте
+    модуля до вызова setup_logging.
+    
     Args:
         name: Имя логгера
+        **initial_values: Постоянный контекст, добавляемый к каждой записи
         
     Returns:
         structlog.stdlib.BoundLogger: Логгер
     """
-    return structlog.get_logger(name)
+    return structlog.get_logger(name, **initial_values)
 
 
 def log_user_action(user_id: int, action: str, **kwargs: Any) -> None:
@@ -184,4 +191,37 @@ def log_admin_action(admin_id: int, action: str, target_user_id: int = None, **k
         action=action,
         target_user_id=target_user_id,
         **kwargs
-    ) 
\ No newline at end of file
+    )
+
+
+def _on_background_log_done(future: asyncio.Future) -> None:
+    """Вывод в stderr ошибки фоновой записи лога (логгер здесь использовать нельзя)"""
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        print("Ошибка фоновой записи лога:", file=sys.stderr)
+        traceback.print_exception(exc, file=sys.stderr)
+
+
+def log_in_background(log_func: Callable[..., None], *args: Any, **kwargs: Any) -> None:
+    """
+    Выполнение функции логирования в пуле потоков без ожидания результата.
+    
+    Файловые обработчики пишут на диск синхронно, поэтому в обработчиках
+    событий запись переносится из event loop в executor. Вне event loop
+    функция вызывается напрямую.
+    
+    Args:
+        log_func: Функция логирования (например, log_admin_action)
+        *args: Позиционные аргументы функции
+        **kwargs: Именованные аргументы функции
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        log_func(*args, **kwargs)
+        return
+    
+    future = loop.run_in_executor(None, functools.partial(log_func, *args, **kwargs))
+    future.add_done_callback(_on_background_log_done)
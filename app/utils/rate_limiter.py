@@ -0,0 +1,47 @@
+"""
+Ограничение частоты запросов для PaidSubscribeBot.
+Используется для соблюдения лимитов Telegram Bot API при массовых отправках.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Асинхронный ограничитель частоты по алгоритму token bucket.
+    
+    Корзина пополняется со скоростью rate токенов в секунду и вмещает
+    не более capacity токенов. Каждый вызов acquire() забирает один
+    токен, при пустой корзине корутина ждет следующего пополнения.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        """
+        Args:
+            rate: Количество операций в секунду
+            capacity: Размер корзины (по умолчанию равен rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Ожидание разрешения на выполнение одной операции"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -0,0 +1,41 @@
+"""
+Фоновые задачи для PaidSubscribeBot.
+Запуск корутин без ожидания результата с логированием ошибок.
+"""
+
+import asyncio
+from typing import Any, Coroutine, Set
+
+from app.utils.logger import get_logger
+
+logger = get_logger("utils.tasks")
+
+# Ссылки на запущенные задачи, чтобы их не собрал GC
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    """Удаление завершенной задачи и логирование ее ошибки с трассировкой"""
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Ошибка фоновой задачи", task=task.get_name(), exc_info=exc)
+
+
+def spawn_background(coro: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+    """
+    Запуск корутины в фоновой задаче.
+
+    Args:
+        coro: Корутина для выполнения
+        name: Имя задачи (попадает в лог при ошибке)
+
+    Returns:
+        asyncio.Task: Запущенная задача
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
@@ -221,16 +221,20 @@ async def api_export_data(
         
         # Выполняем экспорт
         if data_type == "users":
-            data = await export_service.export_users(format_type, start_dt, end_dt)
+            export_file = await export_service.export_users(format_type, start_dt, end_dt)
         elif data_type == "subscriptions":
-            data = await export_service.export_subscriptions(format_type, start_dt, end_dt)
+            export_file = await export_service.export_subscriptions(format_type, start_dt, end_dt)
         elif data_type == "payments":
-            data = await export_service.export_payments(format_type, start_dt, end_dt)
+            export_file = await export_service.export_payments(format_type, start_dt, end_dt)
         elif data_type == "analytics":
-            data = await export_service.export_analytics(format_type, start_dt, end_dt)
+            export_file = await export_service.export_analytics(format_type, start_dt, end_dt)
         else:
             raise HTTPException(status_code=400, detail="Неизвестный тип данных")
         
+        # Данные возвращаются в JSON-ответе, поэтому читаем файл целиком
+        with export_file:
+            data = export_file.read()
+        
         # Определяем MIME тип
         if format_type == "csv":
             media_type = "text/csv"
@@ -249,8 +253,8 @@ async def api_export_data(
             content={
                 "success": True,
                 "filename": filename,
-                "data": data if isinstance(data, str) else data.decode('utf-8') if format_type != "excel" else None,
-                "size": len(data) if isinstance(data, (str, bytes)) else 0
+                "data": data.decode('utf-8') if format_type in ("csv", "json") else None,
+                "size": len(data)
             }
         )
         